@@ -11,4 +11,7 @@ class CartAdmin(admin.ModelAdmin):
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('product', 'cart', 'quantity', 'total_price')
     list_filter = ('cart',)
-    search_fields = ('product__name', 'cart__user__username')
\ No newline at end of file
+    search_fields = ('product__name', 'cart__user__username')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_line_totals()
\ No newline at end of file
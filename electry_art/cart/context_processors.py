@@ -1,21 +1,14 @@
-from electry_art.cart.models import Cart
-from electry_art.cart.utils import SessionCart
+from electry_art.cart.utils import SessionCart, get_cart_count
 
 
 def cart_badge(request):
     """
     Adds `cart_count` to every template context.
-    - logged user: count from DB cart items quantities
+    - logged user: cached sum of the DB cart quantities (see cart.utils)
     - guest: count from session cart quantities
     """
     if getattr(request, "user", None) and request.user.is_authenticated:
-        cart = Cart.objects.filter(user=request.user).first()
-        if not cart:
-            return {"cart_count": 0}
-
-        # Sum quantities (not number of rows)
-        total_qty = sum(item.quantity for item in cart.items.all())
-        return {"cart_count": total_qty}
+        return {"cart_count": get_cart_count(request.user.pk)}
 
     session_cart = SessionCart(request)
-    return {"cart_count": len(session_cart)}
\ No newline at end of file
+    return {"cart_count": len(session_cart)}
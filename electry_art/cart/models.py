@@ -1,8 +1,29 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
 from electry_art.products.models import Product
 from electry_art.user_profiles.models import UserProfile
 
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+# product price * quantity; a deleted product (product=NULL) counts as 0
+LINE_TOTAL = ExpressionWrapper(Coalesce(F('product__price'), Value(Decimal('0.00'))) * F('quantity'), output_field=MONEY)
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_line_totals(self):
+        """
+        Rows with their product and `line_total` (read by CartItem.total_price), one query.
+        """
+        return self.select_related('product').annotate(line_total=LINE_TOTAL)
+
+    def total(self):
+        return self.aggregate(total=Coalesce(Sum(LINE_TOTAL), Value(Decimal('0.00')), output_field=MONEY))['total']
+
+
 class Cart(models.Model):
     user = models.OneToOneField(
         UserProfile,
@@ -16,7 +37,7 @@ class Cart(models.Model):
 
     @property
     def total_price(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.items.total()
 
 
 class CartItem(models.Model):
@@ -36,6 +57,8 @@ class CartItem(models.Model):
         default=1
     )
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         """unique_together = ('cart', 'product')"""
         constraints = [
@@ -47,4 +70,6 @@ class CartItem(models.Model):
 
     @property
     def total_price(self):
+        if hasattr(self, 'line_total'):
+            return self.line_total
         return self.product.price * self.quantity
@@ -1,8 +1,11 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
 from django.utils import timezone
 
-from electry_art.products.models import Product, ProductType
+from electry_art.products.models import Product, ProductType, ProductMaterial, ProductColor
+from electry_art.cart.context_processors import cart_badge
 from electry_art.cart.models import Cart, CartItem
 
 User = get_user_model()
@@ -51,3 +54,45 @@ class CartModelTests(TestCase):
         with self.assertRaises(Exception):
             CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
 
+
+
+class CartBadgeCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='badgeuser', email='badge@example.com', password='pass12345')
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        self.product = Product.objects.create(
+            name='Badge Lamp', serial_number='BADGE01', type=product_type, material=material, color=color,
+            size='10x10', weight=1.0, price=10, quantity=5,
+        )
+        self.client.force_login(self.user)
+
+    def badge(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return cart_badge(request)['cart_count']
+
+    def test_views_write_the_count_through(self):
+        self.client.post(reverse('add_to_cart', kwargs={'pk': self.product.pk}))
+        self.client.post(reverse('add_to_cart', kwargs={'pk': self.product.pk}))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badge(), 2)
+
+        self.client.post(reverse('update_cart_item', kwargs={'pk': self.product.pk}), {'quantity': 4})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badge(), 4)
+
+        self.client.post(reverse('remove_from_cart', kwargs={'pk': self.product.pk}))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badge(), 0)
+
+    def test_cache_miss_recomputes(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=3)
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.badge(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badge(), 3)
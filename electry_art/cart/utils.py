@@ -1,3 +1,34 @@
+from django.core.cache import cache
+from django.db.models import Sum
+
+from electry_art.cart.models import CartItem
+
+# Badge count of a logged user's DB cart, cached so cart_badge (every page)
+# costs no queries. Written through by the cart views and the Stripe webhook
+# cart clear; a miss (expired / evicted) is recomputed with one aggregate.
+CART_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def cart_count_key(user_id):
+    return f'cart:count:{user_id}'
+
+
+def refresh_cart_count(user_id):
+    count = CartItem.objects.filter(cart__user_id=user_id).aggregate(total=Sum('quantity'))['total'] or 0
+    cache.set(cart_count_key(user_id), count, CART_COUNT_TIMEOUT)
+    return count
+
+
+def set_cart_count(user_id, count):
+    cache.set(cart_count_key(user_id), count, CART_COUNT_TIMEOUT)
+
+
+def get_cart_count(user_id):
+    count = cache.get(cart_count_key(user_id))
+    if count is None:
+        count = refresh_cart_count(user_id)
+    return count
+
 
 class SessionCart:
     SESSION_KEY = 'cart'
@@ -1,7 +1,7 @@
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
 from electry_art.cart.models import Cart, CartItem
-from electry_art.cart.utils import SessionCart
+from electry_art.cart.utils import SessionCart, refresh_cart_count
 from electry_art.products.models import Product
 from django.contrib import messages
 
@@ -88,6 +88,7 @@ class AddToCartView(View):
             if not created:
                 cart_item.quantity += 1
                 cart_item.save()
+            refresh_cart_count(request.user.pk)
         else:
             SessionCart(request).add(pk)
 
@@ -103,6 +104,7 @@ class RemoveFromCartView(View):
         if request.user.is_authenticated:
             cart, _ = Cart.objects.get_or_create(user=request.user)
             CartItem.objects.filter(cart=cart, product_id=pk).delete()
+            refresh_cart_count(request.user.pk)
         else:
             SessionCart(request).remove(pk)
 
@@ -131,6 +133,7 @@ class UpdateCartItemView(View):
 
             if quantity == 0:
                 item.delete()
+                refresh_cart_count(request.user.pk)
                 return redirect("cart_view")
 
             # Проверка за наличност (важното)
@@ -140,6 +143,7 @@ class UpdateCartItemView(View):
             if available <= 0:
                 # Няма наличност -> махаме артикула
                 item.delete()
+                refresh_cart_count(request.user.pk)
                 messages.error(request, f"Product '{product.name}' is out of stock and was removed from your cart.")
                 return redirect("cart_view")
 
@@ -147,6 +151,7 @@ class UpdateCartItemView(View):
                 # Cap до наличното
                 item.quantity = available
                 item.save(update_fields=["quantity"])
+                refresh_cart_count(request.user.pk)
                 messages.error(
                     request,
                     f"Not enough stock for '{product.name}'. Updated quantity to {available}."
@@ -156,6 +161,7 @@ class UpdateCartItemView(View):
             # OK
             item.quantity = quantity
             item.save(update_fields=["quantity"])
+            refresh_cart_count(request.user.pk)
 
         else:
             # Guest: трябва да знаем наличността от Product
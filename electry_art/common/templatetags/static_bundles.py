@@ -0,0 +1,28 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from electry_art.core.static_storage import bundle_path, css_bundles
+
+register = template.Library()
+
+
+def bundle_built(name):
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    return hashed_files is None or bundle_path(name) in hashed_files
+
+
+@register.simple_tag
+def css_bundle(name):
+    """
+    <link>s of a STATIC_CSS_BUNDLES entry: the single built bundle when
+    STATIC_CSS_BUNDLING is on and collectstatic has written it, else the
+    source files.
+    """
+    if getattr(settings, 'STATIC_CSS_BUNDLING', False) and bundle_built(name):
+        urls = [static(bundle_path(name))]
+    else:
+        urls = [static(source) for source in css_bundles()[name]]
+    return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in urls))
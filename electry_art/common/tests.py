@@ -1,3 +1,100 @@
-from django.test import TestCase
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from electry_art.core.static_middleware import IMMUTABLE_CACHE_CONTROL, StaticAssetsMiddleware
+
+BUNDLES = {'base': ['css/first.css', 'css/second.css']}
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.source = Path(tempfile.mkdtemp())
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+        (self.source / 'css').mkdir()
+        (self.source / 'css' / 'first.css').write_text('.first { color: red; }\n' * 60)
+        (self.source / 'css' / 'second.css').write_text('.second { color: blue; }\n' * 60)
+
+        settings_override = override_settings(
+            DEBUG=False,
+            STATIC_MANIFEST=True,
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'electry_art.core.static_storage.CompressedManifestStaticFilesStorage'},
+            },
+            STATIC_CSS_BUNDLES=BUNDLES,
+            STATIC_CSS_BUNDLING=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_bundle_is_hashed_and_precompressed(self):
+        hashed = staticfiles_storage.hashed_files['css/bundles/base.css']
+        self.assertNotEqual(hashed, 'css/bundles/base.css')
+
+        content = gzip.decompress((self.root / f'{hashed}.gz').read_bytes()).decode()
+        self.assertIn('.first', content)
+        self.assertIn('.second', content)
+
+        html = Template("{% load static_bundles %}{% css_bundle 'base' %}").render(Context())
+        self.assertEqual(html.count('<link'), 1)
+        self.assertIn(hashed, html)
+
+    def test_unbundled_links_point_at_sources(self):
+        with override_settings(STATIC_CSS_BUNDLING=False):
+            html = Template("{% load static_bundles %}{% css_bundle 'base' %}").render(Context())
+        self.assertEqual(html.count('<link'), 2)
+        self.assertIn(staticfiles_storage.hashed_files['css/first.css'], html)
+
+    def test_middleware_serves_compressed_immutable_files(self):
+        middleware = StaticAssetsMiddleware(lambda request: HttpResponse('app'))
+        hashed = staticfiles_storage.hashed_files['css/bundles/base.css']
+        factory = RequestFactory()
+
+        response = middleware(factory.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertIn(b'.second', body)
+
+        plain = middleware(factory.get('/static/css/first.css'))
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', plain['Cache-Control'])
+        plain.close()
+
+        for path in ('/static/missing.css', '/static/../manage.py', '/products/'):
+            self.assertEqual(middleware(factory.get(path)).content, b'app')
+
+
+class StaticWithoutBuildTests(SimpleTestCase):
+    def test_manifest_storage_without_collectstatic_still_renders(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        with override_settings(
+            STATIC_MANIFEST=True,
+            STATIC_ROOT=root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'electry_art.core.static_storage.CompressedManifestStaticFilesStorage'},
+            },
+            STATIC_CSS_BUNDLES=BUNDLES,
+            STATIC_CSS_BUNDLING=True,
+        ):
+            html = Template("{% load static static_bundles %}{% css_bundle 'base' %}{% static 'css/reset.css' %}").render(Context())
+        self.assertIn('css/first.css', html)
+        self.assertIn('css/reset.css', html)
@@ -0,0 +1,95 @@
+import mimetypes
+import posixpath
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from electry_art.core.static_storage import COMPRESSIBLE_EXTENSIONS
+
+# hashed names never change content -> cached "forever" by browsers and CDNs
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# anything requested by its plain name (old links, favicon scrapers)
+DEFAULT_CACHE_CONTROL = f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 60 * 60)}"
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for token in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = token.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetsMiddleware:
+    """
+    Serves STATIC_ROOT (the collectstatic output) in production, before the
+    session / auth middleware runs: hashed files with far-future immutable
+    headers, and the pre-compressed .br / .gz sibling when the client accepts it.
+    Only used with STATIC_MANIFEST (runserver's staticfiles handler serves the
+    sources in development); a front web server aliasing /static/ can
+    replicate the same headers instead.
+    """
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not getattr(settings, 'STATIC_MANIFEST', False) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = Path(settings.STATIC_ROOT).resolve()
+        self.immutable_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def resolve(self, name):
+        if name.startswith('..') or name in ('', '.'):
+            return None
+        path = (self.root / name).resolve()
+        if self.root not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def serve(self, request, name):
+        name = posixpath.normpath(name).lstrip('/')
+        path = self.resolve(name)
+        if path is None:
+            return None
+
+        content_type, _ = mimetypes.guess_type(path.name)
+        accepted = accepted_encodings(request)
+        encoding = None
+        for coding, suffix in ENCODINGS:
+            candidate = path.with_name(path.name + suffix)
+            if coding in accepted and candidate.is_file():
+                path, encoding = candidate, coding
+                break
+
+        stat = path.stat()
+        cache_control = IMMUTABLE_CACHE_CONTROL if name in self.immutable_names else DEFAULT_CACHE_CONTROL
+
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if since is not None and int(stat.st_mtime) <= since:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(path.open('rb'), content_type=content_type or 'application/octet-stream')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        response.headers['Cache-Control'] = cache_control
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,98 @@
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+# Text assets get pre-compressed siblings (app.3f2a9c.css.gz / .br) next to the
+# hashed file; StaticAssetsMiddleware (or the front web server) picks one by
+# Accept-Encoding, so nothing is compressed per request.
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.map', '.html')
+MIN_COMPRESS_SIZE = 512  # bytes; below this the headers cost more than the savings
+
+BUNDLE_DIR = 'css/bundles'
+
+
+def css_bundles():
+    """
+    {'base': ['css/reset.css', ...]} from settings.STATIC_CSS_BUNDLES.
+    """
+    return getattr(settings, 'STATIC_CSS_BUNDLES', {})
+
+
+def bundle_path(name):
+    return f'{BUNDLE_DIR}/{name}.css'
+
+
+def compressed_variants(data):
+    """
+    [('.gz', bytes), ('.br', bytes)] for the encodings that actually shrink `data`.
+    """
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    return [(suffix, payload) for suffix, payload in variants if len(payload) < len(data)]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic backend for production:
+      1. concatenates STATIC_CSS_BUNDLES into css/bundles/<name>.css,
+      2. content-hashes every file (ManifestStaticFilesStorage),
+      3. writes .gz / .br siblings of the text assets.
+    Bundled sources are concatenated as-is, so they must not use url()s
+    relative to their own directory.
+    Not strict: a file missing from the manifest (collectstatic not re-run
+    after adding it) renders with its plain name instead of a 500.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:  # not in the manifest and not on disk to hash either
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths.update(self.write_bundles())
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            for name, hashed_name in self.hashed_files.items():
+                self.compress(name)
+                self.compress(hashed_name)
+
+    def replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def write_bundles(self):
+        written = {}
+        for bundle, sources in css_bundles().items():
+            parts = []
+            for source in sources:
+                # collectstatic has already copied the sources into STATIC_ROOT
+                with self.open(source) as fh:
+                    parts.append(f"/* {source} */\n{fh.read().decode('utf-8')}")
+            name = bundle_path(bundle)
+            self.replace(name, "\n".join(parts).encode('utf-8'))
+            written[name] = (self, name)
+        return written
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, payload in compressed_variants(data):
+            self.replace(name + suffix, payload)
@@ -1,16 +1,51 @@
 from django.contrib import admin
 
 from electry_art.orders.models import Order, OrderItem
+from electry_art.orders.rollups import ORDER_FIELDS, refresh_order_day
+from electry_art.products.ranking import record_unpaid_order
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'full_name', 'user', 'created_at', 'total_price')
+    list_display = ('id', 'full_name', 'user', 'created_at', 'total_amount', 'item_count')
     search_fields = ('full_name', 'user__username')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'total_amount', 'item_count')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if set(form.changed_data) & set(ORDER_FIELDS):
+            refresh_order_day(obj)
+        if change and 'is_paid' in form.changed_data and not obj.is_paid:
+            # marked unpaid (refunded): the sales leave the product rankings
+            record_unpaid_order(obj, form.initial.get('paid_at') or obj.paid_at)
+
+    def delete_model(self, request, obj):
+        refresh_order_day(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for order in queryset.only('pk', 'created_at'):
+            refresh_order_day(order)
+        super().delete_queryset(request, queryset)
 
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
+    """
+    View only: the order's total_amount / item_count (and the sales rollups)
+    are computed from its lines when it is placed.
+    """
     list_display = ('order', 'product', 'quantity', 'price', 'total_price')
     search_fields = ('order__full_name', 'product__name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_line_totals()
@@ -0,0 +1,125 @@
+import csv
+import re
+
+from django.db.models import Q
+from django.utils import timezone
+
+from electry_art.orders.models import OrderItem, created_between, line_total
+
+# One row per order line; the order columns repeat on every line of the order.
+COLUMNS = (
+    'order_serial_number',
+    'created_at',
+    'paid_at',
+    'full_name',
+    'email',
+    'phone',
+    'address',
+    'is_paid',
+    'is_accepted',
+    'is_sent',
+    'order_total',
+    'order_lines',
+    'product_name',
+    'quantity',
+    'price',
+    'line_total',
+)
+
+SOURCE_FIELDS = (
+    'order__order_serial_number',
+    'order__created_at',
+    'order__paid_at',
+    'order__full_name',
+    'order__user_email',
+    'order__phone',
+    'order__address',
+    'order__is_paid',
+    'order__is_accepted',
+    'order__is_sent',
+    'order__total_amount',
+    'order__item_count',
+    'product_name',
+    'quantity',
+    'price',
+    'export_line_total',
+)
+
+CHUNK_SIZE = 2000
+
+
+def order_filter(date_from=None, date_to=None, paid=None, sent=None):
+    """
+    Q over OrderItem for the export filters; dates are local days, inclusive.
+    """
+    condition = created_between(date_from, date_to, prefix='order__')
+    if paid is not None:
+        condition &= Q(order__is_paid=paid)
+    if sent is not None:
+        condition &= Q(order__is_sent=sent)
+    return condition
+
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+# (=HYPERLINK(...), +cmd|...); customer-entered text is neutralised with a quote.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# ... except international phone numbers ("+359 88 123 4567"): nothing to evaluate
+PHONE_NUMBER = re.compile(r'\+[0-9 ]+')
+
+
+def _text(value):
+    if not value.startswith(FORMULA_PREFIXES) or PHONE_NUMBER.fullmatch(value):
+        return value
+    return "'" + value
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'yes' if value else 'no'
+    if isinstance(value, str):
+        return _text(value)
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def export_rows(condition=Q(), chunk_size=CHUNK_SIZE):
+    """
+    Lists in COLUMNS order, read with a server-side cursor (one query,
+    `chunk_size` rows in memory at a time).
+    """
+    rows = (
+        OrderItem.objects
+        .filter(condition)
+        .annotate(export_line_total=line_total())
+        .order_by('order__created_at', 'order_id', 'pk')
+        .values_list(*SOURCE_FIELDS)
+    )
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield [_cell(value) for value in values]
+
+
+class Echo:
+    """
+    File-like object whose write() returns the line, for csv.writer inside a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, batch=500):
+    """
+    CSV text in blocks of `batch` lines (fewer, larger writes to the client).
+    """
+    writer = csv.writer(Echo())
+    buffer = ['\ufeff' + writer.writerow(COLUMNS)]  # BOM: Excel reads the UTF-8 (Cyrillic) correctly
+    for row in rows:
+        buffer.append(writer.writerow(row))
+        if len(buffer) >= batch:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -1,4 +1,7 @@
+from datetime import date
+
 from django import forms
+from django.core.validators import MinValueValidator
 
 
 class BaseCheckoutForm(forms.Form):
@@ -29,3 +32,46 @@ class GuestCheckoutForm(BaseCheckoutForm):
     email = forms.EmailField()
 
 
+
+
+class SalesReportForm(forms.Form):
+    # the comparison goes one year back, which year 1 has not got
+    date_from = forms.DateField(
+        validators=[MinValueValidator(date(2, 1, 1))],
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    date_to = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    compare = forms.BooleanField(required=False, label="Compare with the previous year")
+
+    def clean(self):
+        cleaned = super().clean()
+        date_from, date_to = cleaned.get("date_from"), cleaned.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("The start date is after the end date.")
+        return cleaned
+
+
+class OrderExportForm(forms.Form):
+    FLAG_CHOICES = [("", "Any"), ("yes", "Yes"), ("no", "No")]
+    FLAGS = {"": None, "yes": True, "no": False}
+
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    paid = forms.ChoiceField(choices=FLAG_CHOICES, required=False)
+    sent = forms.ChoiceField(choices=FLAG_CHOICES, required=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        date_from, date_to = cleaned.get("date_from"), cleaned.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("The start date is after the end date.")
+        for name in ("paid", "sent"):
+            cleaned[name] = self.FLAGS.get(cleaned.get(name) or "")
+        return cleaned
+
+    def filename(self):
+        parts = ["orders"]
+        for name in ("date_from", "date_to"):
+            if self.cleaned_data.get(name):
+                parts.append(self.cleaned_data[name].isoformat())
+        return "-".join(parts) + ".csv"
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from electry_art.orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Recomputes the stored Order.total_amount / item_count from the order lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('serial_numbers', nargs='*')
+        parser.add_argument(
+            '--mismatched', action='store_true',
+            help='Only rewrite orders whose stored total differs from their lines.',
+        )
+
+    def handle(self, *args, **options):
+        qs = Order.objects.all()
+        if options['serial_numbers']:
+            qs = qs.filter(order_serial_number__in=options['serial_numbers'])
+        if options['mismatched']:
+            qs = qs.with_totals().exclude(total_amount=F('items_total'))
+
+        updated = Order.objects.filter(pk__in=qs.values('pk')).recompute_totals()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed totals of {updated} order(s)."))
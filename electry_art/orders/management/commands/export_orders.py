@@ -0,0 +1,48 @@
+import csv
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from electry_art.orders.exports import CHUNK_SIZE, COLUMNS, export_rows, order_filter
+
+FLAGS = {'yes': True, 'no': False}
+
+
+class Command(BaseCommand):
+    help = "Streams orders and their lines as CSV for accounting (same columns as the staff export)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='YYYY-MM-DD')
+        parser.add_argument('--paid', choices=sorted(FLAGS), help='Only paid (yes) or unpaid (no) orders.')
+        parser.add_argument('--sent', choices=sorted(FLAGS), help='Only sent (yes) or unsent (no) orders.')
+        parser.add_argument('--output', '-o', default='-', help="Target file, '-' for stdout.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start and end and start > end:
+            raise CommandError("--from is after --to.")
+
+        condition = order_filter(
+            date_from=start,
+            date_to=end,
+            paid=FLAGS.get(options['paid']),
+            sent=FLAGS.get(options['sent']),
+        )
+
+        output = options['output']
+        fh = self.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8-sig')
+        count = 0
+        try:
+            writer = csv.writer(fh)
+            writer.writerow(COLUMNS)
+            for row in export_rows(condition, chunk_size=options['chunk_size']):
+                writer.writerow(row)
+                count += 1
+        finally:
+            if fh is not self.stdout:
+                fh.close()
+
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} order line(s) to {output}."))
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from electry_art.orders.models import Order
+from electry_art.orders.rollups import rebuild_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily sales rollups (nightly: the last few days; --all for the whole history)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=3, help='Rebuild the last N days including today.')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='YYYY-MM-DD (default today)')
+        parser.add_argument('--all', action='store_true', help='From the first order until today.')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.localdate()
+        if options['all']:
+            first = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write("No orders.")
+                return
+            start = timezone.localdate(first)
+        elif options['start']:
+            start = options['start']
+        else:
+            start = end - timedelta(days=max(options['days'], 1) - 1)
+
+        if start > end:
+            raise CommandError("--from is after --to.")
+
+        written = 0
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+        while start <= end:
+            chunk_end = min(start + chunk - timedelta(days=1), end)
+            written += rebuild_sales(start, chunk_end)
+            start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily sales: {written} day(s) with orders."))
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:24
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    totals = lines.annotate(
+        total=Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=money)),
+    ).values('total')
+    counts = lines.annotate(total=Count('pk')).values('total')
+
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(totals), Value(Decimal('0.00')), output_field=money),
+        item_count=Coalesce(Subquery(counts), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_remove_inquiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of order lines.'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], include=('total_amount', 'item_count'), name='order_created_totals_idx'),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_total_amount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_created_totals_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], include=('total_amount', 'item_count', 'is_paid', 'is_accepted', 'is_sent'), name='order_created_totals_idx'),
+        ),
+    ]
@@ -1,10 +1,117 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 from electry_art.products.models import Product
 from electry_art.user_profiles.models import UserProfile
 
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def line_total(prefix=''):
+    """
+    price * quantity of an OrderItem in SQL; `prefix` for lookups through a relation ('items__').
+    """
+    return ExpressionWrapper(F(f'{prefix}price') * F(f'{prefix}quantity'), output_field=MONEY)
+
+
+def created_between(start=None, end=None, prefix=''):
+    """
+    Q for orders created on the local days [start, end] as aware bounds on
+    created_at, which order_created_totals_idx serves (a __date lookup casts
+    the column and cannot use it). `prefix` as in line_total().
+    """
+    condition = Q()
+    if start:
+        condition &= Q(**{f'{prefix}created_at__gte': _day_start(start)})
+    if end:
+        condition &= Q(**{f'{prefix}created_at__lt': _day_start(end + timedelta(days=1))})
+    return condition
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def order_items_subquery(aggregate):
+    """
+    Correlated subquery of one aggregate over the OrderItems of the outer Order.
+    """
+    return Subquery(
+        OrderItem.objects
+        .filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+# staff dashboard breakdowns, see OrderQuerySet.revenue_summary()
+REVENUE_BREAKDOWNS = {
+    'total': None,
+    'paid': Q(is_paid=True),
+    'unpaid': Q(is_paid=False),
+    'accepted': Q(is_accepted=True),
+    'sent': Q(is_sent=True),
+}
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotates `items_total` recomputed from the lines (no join, so it
+        combines with any filter / pagination); Order.total_price reads it.
+        Listings use the stored total_amount instead.
+        """
+        return self.annotate(
+            items_total=Coalesce(order_items_subquery(Sum(line_total())), Value(Decimal('0.00')), output_field=MONEY),
+        )
+
+    def recompute_totals(self):
+        """
+        Rewrites total_amount / item_count from the lines in one UPDATE (backfill, repairs).
+        """
+        return self.update(
+            total_amount=Coalesce(order_items_subquery(Sum(line_total())), Value(Decimal('0.00')), output_field=MONEY),
+            item_count=Coalesce(order_items_subquery(Count('pk')), Value(0)),
+        )
+
+    def revenue(self):
+        """
+        Sum of the stored totals of the orders in this queryset, one query.
+        """
+        return self.aggregate(
+            total=Coalesce(Sum('total_amount'), Value(Decimal('0.00')), output_field=MONEY),
+        )['total']
+
+    def revenue_summary(self):
+        """
+        One aggregate over the stored totals:
+        {'total': {'count': n, 'revenue': Decimal}, 'paid': {...}, 'unpaid': ..., 'accepted': ..., 'sent': ...}
+        """
+        aggregates = {}
+        for name, condition in REVENUE_BREAKDOWNS.items():
+            aggregates[f'{name}_count'] = Count('pk', filter=condition)
+            aggregates[f'{name}_revenue'] = Coalesce(
+                Sum('total_amount', filter=condition), Value(Decimal('0.00')), output_field=MONEY,
+            )
+        row = self.order_by().aggregate(**aggregates)
+        return {
+            name: {'count': row[f'{name}_count'], 'revenue': row[f'{name}_revenue']}
+            for name in REVENUE_BREAKDOWNS
+        }
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_line_totals(self):
+        return self.annotate(line_total=line_total())
+
+
 class Order(models.Model):
     user = models.ForeignKey(
         UserProfile,
@@ -78,16 +185,50 @@ class Order(models.Model):
         db_index=True
     )
 
+    # written once in the checkout transaction (lines never change afterwards);
+    # Order.objects.recompute_totals() / `backfill_order_totals` rebuild them
+    total_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+
+    item_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of order lines.",
+    )
+
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # period listings / revenue summaries read the totals and flags straight from the index
+            models.Index(
+                fields=['created_at'],
+                include=['total_amount', 'item_count', 'is_paid', 'is_accepted', 'is_sent'],
+                name='order_created_totals_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.order_serial_number} by {self.full_name}"
 
     @property
     def total_price(self):
-        # Decimal safe
-        return sum((item.total_price for item in self.items.all()), Decimal('0.00'))
+        # annotated by Order.objects.with_totals(); otherwise the stored checkout total
+        if hasattr(self, 'items_total'):
+            return self.items_total
+        return self.total_amount
+
+    def record_totals(self, lines):
+        """
+        Stores total_amount / item_count from (price, quantity) pairs; called in the checkout transaction.
+        """
+        lines = list(lines)
+        self.total_amount = sum((price * quantity for price, quantity in lines), Decimal('0.00'))
+        self.item_count = len(lines)
+        self.save(update_fields=['total_amount', 'item_count'])
 
 
 class OrderItem(models.Model):
@@ -118,10 +259,69 @@ class OrderItem(models.Model):
         validators=[MinValueValidator(0.01)],
     )
 
+    objects = OrderItemQuerySet.as_manager()
+
     def __str__(self):
         name = self.product_name or (self.product.name if self.product else "Deleted product")
         return f"{name} x {self.quantity}"
 
     @property
     def total_price(self):
+        if hasattr(self, 'line_total'):
+            return self.line_total
         return self.price * self.quantity
+
+
+class SalesRollup(models.Model):
+    """
+    Order figures of one day (by order creation date, local time); rebuilt
+    from the orders by electry_art.orders.rollups, never edited by hand.
+    """
+    day = models.DateField()
+
+    orders_count = models.PositiveIntegerField(default=0)
+    paid_count = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+
+    paid_revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollup):
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day'], name='unique_daily_sales_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.revenue}"
+
+
+class DailyProductTypeSales(SalesRollup):
+    product_type = models.ForeignKey(
+        'products.ProductType',
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+    )
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product_type'], name='unique_daily_type_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.product_type}: {self.revenue}"
@@ -38,7 +38,7 @@ def send_order_confirmation_on_checkout(sender, order=None, user=None, request_i
 
 Сериен номер: {order.order_serial_number}
 Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}
-Обща сума: {order.total_price} лв.
+Обща сума: {order.total_amount} лв.
 """
 
     if is_registered_user:
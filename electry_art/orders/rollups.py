@@ -0,0 +1,140 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from electry_art.orders.models import MONEY, DailyProductTypeSales, DailySales, OrderItem, created_between, line_total
+from electry_art.products.models import ProductType
+
+log = logging.getLogger("electryart.orders")
+
+# DailySales / DailyProductTypeSales hold one row per day (and product type).
+# A day is always rebuilt as a whole from its order lines, so refreshing it
+# again (webhook retries, the nightly reconcile) can never double count.
+ROLLUP_FIELDS = ('orders_count', 'paid_count', 'units', 'revenue', 'paid_revenue')
+# the Order fields the rows are computed from: editing one needs refresh_order_day
+ORDER_FIELDS = ('is_paid', 'created_at')
+
+
+def _money(expression):
+    return Coalesce(expression, Value(Decimal('0.00')), output_field=MONEY)
+
+
+def _line_aggregates():
+    paid = Q(order__is_paid=True)
+    return {
+        'orders_count': Count('order', distinct=True),
+        'paid_count': Count('order', distinct=True, filter=paid),
+        'units': Coalesce(Sum('quantity'), Value(0)),
+        'revenue': _money(Sum(line_total())),
+        'paid_revenue': _money(Sum(line_total(), filter=paid)),
+    }
+
+
+def rebuild_sales(start, end):
+    """
+    Recomputes the rollup rows of every day in [start, end]: two grouped
+    queries over the order lines, then delete + insert. Returns the number
+    of day rows written.
+    """
+    lines = (
+        OrderItem.objects
+        .filter(created_between(start, end, prefix='order__'))
+        .annotate(day=TruncDate('order__created_at'))
+        .order_by()
+    )
+    day_rows = lines.values('day').annotate(**_line_aggregates())
+    type_rows = (
+        lines
+        .filter(product__type__isnull=False)
+        .values('day', 'product__type')
+        .annotate(**_line_aggregates())
+    )
+
+    with transaction.atomic():
+        # one rebuild at a time; readers are not blocked
+        with connection.cursor() as cursor:
+            for model in (DailySales, DailyProductTypeSales):
+                cursor.execute(f"LOCK TABLE {model._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+
+        DailySales.objects.filter(day__range=(start, end)).delete()
+        DailyProductTypeSales.objects.filter(day__range=(start, end)).delete()
+
+        days = DailySales.objects.bulk_create(DailySales(**row) for row in day_rows)
+        DailyProductTypeSales.objects.bulk_create(
+            DailyProductTypeSales(product_type_id=row.pop('product__type'), **row) for row in type_rows
+        )
+    return len(days)
+
+
+def order_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def refresh_order_day(order):
+    """
+    Schedules the rebuild of the order's day after the current transaction
+    commits (checkout, Stripe payment confirmation, staff edits of one of
+    ORDER_FIELDS, deleted orders). A failure is only
+    logged: the nightly `reconcile_daily_sales` repairs the day.
+    """
+    day = order_day(order)
+
+    def refresh():
+        try:
+            rebuild_sales(day, day)
+        except Exception:  # noqa: BLE001
+            log.exception("DAILY_SALES_REFRESH_FAILED day=%s order_id=%s", day, order.pk)
+
+    transaction.on_commit(refresh)
+
+
+def year_earlier(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def range_totals(start, end):
+    """
+    {'orders_count': .., 'paid_count': .., 'units': .., 'revenue': .., 'paid_revenue': ..}
+    summed over the day rows of [start, end].
+    """
+    return DailySales.objects.filter(day__range=(start, end)).aggregate(
+        orders_count=Coalesce(Sum('orders_count'), Value(0)),
+        paid_count=Coalesce(Sum('paid_count'), Value(0)),
+        units=Coalesce(Sum('units'), Value(0)),
+        revenue=_money(Sum('revenue')),
+        paid_revenue=_money(Sum('paid_revenue')),
+    )
+
+
+def range_by_type(start, end):
+    """
+    Per product type sums for [start, end], biggest revenue first.
+    """
+    rows = list(
+        DailyProductTypeSales.objects
+        .filter(day__range=(start, end))
+        .values('product_type')
+        .annotate(**{field: Sum(field) for field in ROLLUP_FIELDS})
+        .order_by('-revenue')
+    )
+    types = ProductType.objects.in_bulk([row['product_type'] for row in rows])
+    for row in rows:
+        row['product_type'] = types.get(row['product_type'])
+    return rows
+
+
+def range_days(start, end):
+    return list(DailySales.objects.filter(day__range=(start, end)).values('day', *ROLLUP_FIELDS))
+
+
+def default_range(days=30):
+    end = timezone.localdate()
+    return end - timedelta(days=days - 1), end
@@ -1,3 +1,323 @@
-from django.test import TestCase
+import csv
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from electry_art.cart.models import Cart, CartItem
+from electry_art.orders.models import DailyProductTypeSales, DailySales, Order, OrderItem
+from electry_art.orders.rollups import rebuild_sales
+from electry_art.products.models import Product, ProductType, ProductMaterial, ProductColor
+
+
+class OrderTestData:
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_user(
+            username='staffer', email='staff@example.com', password='pass12345', is_staff=True,
+        )
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        self.products = [
+            Product.objects.create(
+                name=f'Total {i}', serial_number=f'TOTAL0{i}', type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=Decimal('12.50') * (i + 1), quantity=10,
+            )
+            for i in range(3)
+        ]
+        self.client.force_login(self.staff)
+
+    def make_order(self, number, lines=2):
+        order = Order.objects.create(
+            user=self.staff, order_serial_number=f'ORDTOTAL{number}', full_name='Buyer', address='Street 1',
+            phone='123',
+        )
+        for product in self.products[:lines]:
+            OrderItem.objects.create(order=order, product=product, product_name=product.name, quantity=2,
+                                     price=product.price)
+        Order.objects.filter(pk=order.pk).recompute_totals()
+        return order
+
+    def count_queries(self, url):
+        self.client.get(url)  # warm the per-user caches (cart badge)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+
+class OrderTotalsTests(OrderTestData, TestCase):
+    def test_staff_list_queries_do_not_grow_with_orders(self):
+        self.make_order(1)
+        few, _ = self.count_queries(reverse('new order'))
+        for number in range(2, 6):
+            self.make_order(number, lines=3)
+        many, response = self.count_queries(reverse('new order'))
+
+        self.assertEqual(few, many)
+        # 1 order x (25 + 50) + 4 orders x (25 + 50 + 75)
+        self.assertEqual(response.context['total_revenue'], Decimal('675.00'))
+        totals = sorted(order.total_price for order in response.context['orders'])
+        self.assertEqual(totals, [Decimal('75.00')] + [Decimal('150.00')] * 4)
+
+    def test_detail_and_history_use_annotated_totals(self):
+        order = self.make_order(1, lines=3)
+        few, response = self.count_queries(reverse('order_detail', kwargs={'pk': order.pk}))
+        self.assertEqual(response.context['order'].total_price, Decimal('150.00'))
+
+        history_before, _ = self.count_queries(reverse('order_history'))
+        self.make_order(2)
+        history_after, response = self.count_queries(reverse('order_history'))
+        self.assertEqual(history_before, history_after)
+        self.assertEqual(sorted(o.total_price for o in response.context['orders']),
+                         [Decimal('75.00'), Decimal('150.00')])
+
+    def test_checkout_summary_is_one_query(self):
+        cart = Cart.objects.create(user=self.staff)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+        few, _ = self.count_queries(reverse('checkout'))
+        for product in self.products[1:]:
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        many, response = self.count_queries(reverse('checkout'))
+
+        self.assertEqual(few, many)
+        self.assertEqual(response.context['cart_total'], Decimal('137.50'))
+        self.assertEqual(cart.total_price, Decimal('137.50'))
+
+    def test_checkout_stores_total_amount(self):
+        cart = Cart.objects.create(user=self.staff)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=2)
+        CartItem.objects.create(cart=cart, product=self.products[2], quantity=1)
+
+        session = SimpleNamespace(id='cs_test_totals', url='https://stripe.test/pay')
+        with mock.patch('electry_art.orders.views.stripe.checkout.Session.create', return_value=session):
+            self.client.post(reverse('checkout'), {'full_name': 'Buyer', 'phone': '123', 'address': 'Street 1'})
+
+        order = Order.objects.get(stripe_checkout_session_id='cs_test_totals')
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('62.50'), 2))
+
+    def test_backfill_command_repairs_totals(self):
+        order = self.make_order(1, lines=3)
+        Order.objects.filter(pk=order.pk).update(total_amount=0, item_count=0)
+
+        call_command('backfill_order_totals', '--mismatched', stdout=StringIO())
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('150.00'), 3))
+        self.assertEqual(Order.objects.filter(created_at__isnull=False).revenue(), Decimal('150.00'))
+
+    def test_dashboard_summary_breakdowns(self):
+        first = self.make_order(1)
+        second = self.make_order(2, lines=3)
+        self.make_order(3, lines=1)
+        Order.objects.filter(pk=first.pk).update(is_paid=True, is_accepted=True, is_sent=True)
+        Order.objects.filter(pk=second.pk).update(is_paid=True, is_accepted=True)
+
+        with self.assertNumQueries(1):
+            summary = Order.objects.all().revenue_summary()
+        self.assertEqual(summary['total'], {'count': 3, 'revenue': Decimal('250.00')})
+        self.assertEqual(summary['paid'], {'count': 2, 'revenue': Decimal('225.00')})
+        self.assertEqual(summary['unpaid'], {'count': 1, 'revenue': Decimal('25.00')})
+        self.assertEqual(summary['accepted']['count'], 2)
+        self.assertEqual(summary['sent'], {'count': 1, 'revenue': Decimal('75.00')})
+
+        _, response = self.count_queries(reverse('new order'))
+        self.assertEqual(response.context['summary'], summary)
+        self.assertEqual(response.context['total_revenue'], Decimal('250.00'))
+
+
+    def test_order_lines_are_read_only_in_the_admin(self):
+        order = self.make_order(1)
+        self.staff.is_superuser = True
+        self.staff.save()
+        line = order.items.first()
+
+        url = reverse('admin:orders_orderitem_change', args=[line.pk])
+        self.client.post(url, {'order': order.pk, 'product': line.product_id, 'product_name': 'x',
+                               'quantity': 50, 'price': '1.00'})
+        line.refresh_from_db()
+        self.assertEqual(line.quantity, 2)
+        self.assertEqual(self.client.get(reverse('admin:orders_orderitem_add')).status_code, 403)
+
+
+class DailySalesTests(OrderTestData, TestCase):
+    def place(self, number, day, lines=2, paid=False):
+        order = self.make_order(number, lines=lines)
+        created = timezone.make_aware(datetime.combine(day, time(12)))
+        Order.objects.filter(pk=order.pk).update(created_at=created, is_paid=paid)
+        return order
+
+    def test_rebuild_is_idempotent_and_split_by_type(self):
+        day = date(2025, 3, 10)
+        self.place(1, day, lines=2, paid=True)
+        self.place(2, day, lines=1)
+        self.place(3, day + timedelta(days=1), lines=3, paid=True)
+
+        for _ in range(2):
+            self.assertEqual(rebuild_sales(day, day + timedelta(days=1)), 2)
+
+        first = DailySales.objects.get(day=day)
+        self.assertEqual(
+            (first.orders_count, first.paid_count, first.units, first.revenue, first.paid_revenue),
+            (2, 1, 6, Decimal('100.00'), Decimal('75.00')),
+        )
+        by_type = DailyProductTypeSales.objects.get(day=day, product_type=self.products[0].type)
+        self.assertEqual((by_type.orders_count, by_type.units), (2, 6))
+        self.assertEqual(DailySales.objects.count(), 2)
+
+    def test_report_sums_rollups_with_year_over_year(self):
+        self.place(1, date(2024, 2, 29), lines=1, paid=True)
+        self.place(2, date(2025, 2, 28), lines=3, paid=True)
+        self.place(3, date(2025, 3, 1), lines=2)
+        call_command('reconcile_daily_sales', '--from', '2024-01-01', '--to', '2025-12-31', stdout=StringIO())
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('sales_report'), {
+                'date_from': '2025-02-01', 'date_to': '2025-03-31', 'compare': 'on',
+            })
+        # answered from the rollups alone
+        self.assertFalse([q for q in ctx.captured_queries if '"orders_order' in q['sql']])
+        current, previous = response.context['current'], response.context['previous']
+        self.assertEqual(current['totals']['orders_count'], 2)
+        self.assertEqual(current['totals']['revenue'], Decimal('225.00'))
+        self.assertEqual(current['totals']['paid_revenue'], Decimal('150.00'))
+        self.assertEqual(len(current['days']), 2)
+        self.assertEqual(previous['totals']['revenue'], Decimal('25.00'))
+        self.assertEqual(response.context['revenue_change'], Decimal('800.0'))
+
+    def test_days_are_local_and_filtered_on_the_indexed_column(self):
+        from electry_art.orders.exports import order_filter
+
+        day = date(2025, 3, 10)
+        late = self.place(1, day, lines=1)
+        early = self.place(2, day + timedelta(days=1), lines=2)
+        midnight = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        Order.objects.filter(pk=late.pk).update(created_at=midnight - timedelta(minutes=1))
+        Order.objects.filter(pk=early.pk).update(created_at=midnight)
+
+        rebuild_sales(day, day)
+        self.assertEqual(DailySales.objects.get(day=day).orders_count, 1)
+
+        lines = OrderItem.objects.filter(order_filter(date_from=day, date_to=day))
+        self.assertEqual({line.order_id for line in lines}, {late.pk})
+        # a plain range on created_at, no per-row time zone cast
+        self.assertNotIn('AT TIME ZONE', str(lines.query))
+
+    def test_report_rejects_a_range_without_a_previous_year(self):
+        response = self.client.get(reverse('sales_report'), {
+            'date_from': '0001-01-01', 'date_to': '0001-12-31', 'compare': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('date_from', response.context['form'].errors)
+        self.assertNotIn('current', response.context)
+
+    def test_admin_paid_change_and_delete_refresh_the_day(self):
+        day = date(2025, 3, 10)
+        order = self.place(1, day, lines=2)
+        rebuild_sales(day, day)
+        order.refresh_from_db()
+        model_admin = admin.site._registry[Order]
+        request = RequestFactory().post('/')
+        request.user = self.staff
+
+        order.is_paid = True
+        with self.captureOnCommitCallbacks(execute=True):
+            model_admin.save_model(request, order, SimpleNamespace(changed_data=['is_paid']), change=True)
+        self.assertEqual(DailySales.objects.get(day=day).paid_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            model_admin.delete_queryset(request, Order.objects.filter(pk=order.pk))
+        self.assertFalse(DailySales.objects.filter(day=day).exists())
+
+
+class OrderExportTests(OrderTestData, TestCase):
+    def place(self, number, day, lines=2, **flags):
+        order = self.make_order(number, lines=lines)
+        created = timezone.make_aware(datetime.combine(day, time(12)))
+        Order.objects.filter(pk=order.pk).update(created_at=created, **flags)
+        return order
+
+    def export(self, params):
+        response = self.client.get(reverse('orders_export'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+
+    def test_streams_filtered_lines(self):
+        self.place(1, date(2025, 5, 1), lines=2, is_paid=True)
+        self.place(2, date(2025, 5, 2), lines=1)
+        self.place(3, date(2025, 5, 3), lines=3, is_paid=True, is_sent=True)
+        self.place(4, date(2025, 6, 1), lines=1, is_paid=True)
+
+        response, lines = self.export({'date_from': '2025-05-01', 'date_to': '2025-05-31', 'paid': 'yes'})
+        self.assertTrue(response.streaming)
+        self.assertIn('orders-2025-05-01-2025-05-31.csv', response['Content-Disposition'])
+        self.assertEqual(lines[0].split(',')[0], 'order_serial_number')
+
+        rows = [line.split(',') for line in lines[1:]]
+        self.assertEqual([row[0] for row in rows], ['ORDTOTAL1'] * 2 + ['ORDTOTAL3'] * 3)
+        self.assertEqual(rows[0][1], '2025-05-01 12:00:00')
+        self.assertEqual(rows[0][10:], ['75.00', '2', 'Total 0', '2', '12.50', '25.00'])
+
+        _, lines = self.export({'sent': 'no', 'paid': 'no'})
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['ORDTOTAL2'])
+
+    def test_rejects_bad_filters_and_non_staff(self):
+        self.assertEqual(
+            self.client.get(reverse('orders_export'), {'date_from': '2025-05-02', 'date_to': '2025-05-01'}).status_code,
+            400,
+        )
+        self.staff.is_staff = False
+        self.staff.save()
+        self.assertEqual(self.client.get(reverse('orders_export')).status_code, 403)
+
+    def test_command_writes_same_columns(self):
+        self.place(1, date(2025, 5, 1), lines=2, is_paid=True)
+        self.place(2, date(2025, 4, 30), lines=1, is_paid=True)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'orders.csv'
+            call_command('export_orders', '--from', '2025-05-01', '--paid', 'yes', '-o', str(path), stdout=StringIO())
+            lines = path.read_text(encoding='utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['ORDTOTAL1', 'ORDTOTAL1'])
+
+        out = StringIO()
+        call_command('export_orders', '--to', '2025-04-30', stdout=out)
+        self.assertEqual([line.split(',')[0] for line in out.getvalue().splitlines()[1:]], ['ORDTOTAL2'])
+
+    def test_formula_cells_are_neutralised(self):
+        order = self.place(1, date(2025, 5, 1), lines=1)
+        Order.objects.filter(pk=order.pk).update(full_name='=HYPERLINK("http://x.test")', address='@SUM(A1)')
+        OrderItem.objects.filter(order=order).update(product_name='+cmd|calc')
+
+        _, lines = self.export({})
+        row = next(csv.reader(lines[1:]))
+        self.assertEqual(row[3], '\'=HYPERLINK("http://x.test")')
+        self.assertEqual(row[6], "'@SUM(A1)")
+        self.assertEqual(row[12], "'+cmd|calc")
+        self.assertEqual(row[15], '25.00')
+
+    def test_phone_numbers_are_exported_as_typed(self):
+        order = self.place(1, date(2025, 5, 1), lines=1)
+
+        for phone, expected in (
+            ('+359 88 123 4567', '+359 88 123 4567'),
+            ('+359881234567', '+359881234567'),
+            ('+359 88 1+A1', "'+359 88 1+A1"),
+            ('+', "'+"),
+        ):
+            Order.objects.filter(pk=order.pk).update(phone=phone)
+            _, lines = self.export({})
+            self.assertEqual(next(csv.reader(lines[1:]))[5], expected, phone)
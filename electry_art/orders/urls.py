@@ -23,6 +23,8 @@ from .views import (
     PreviousMonthOrdersListView,
     Last7DaysOrdersListView,
     OrdersEditView,
+    SalesReportView,
+    OrderExportView,
 
     # Stripe views
     StripePaymentSuccessView,
@@ -44,6 +46,8 @@ urlpatterns = [
     # order lists
     path('new-orders/', Last7DaysOrdersListView.as_view(), name='new order'),
     path('previous-month-orders/', PreviousMonthOrdersListView.as_view(), name='previous-month-orders'),
+    path('sales-report/', SalesReportView.as_view(), name='sales_report'),
+    path('export/', OrderExportView.as_view(), name='orders_export'),
 
     # STRIPE
     path('stripe/success/', StripePaymentSuccessView.as_view(), name='stripe_payment_success'),
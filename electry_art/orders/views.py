@@ -2,22 +2,24 @@ from datetime import timedelta, date
 from decimal import Decimal
 
 import stripe
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.urls import reverse_lazy, reverse
 from django.views import View, generic
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
 from .models import Order, OrderItem
-from .forms import CheckoutForm, GuestCheckoutForm
+from . import exports, rollups
+from .rollups import refresh_order_day
+from .forms import CheckoutForm, GuestCheckoutForm, OrderExportForm, SalesReportForm
 from electry_art.cart.models import Cart
-from ..cart.utils import SessionCart
+from ..cart.utils import SessionCart, set_cart_count
 from ..products.models import Product
 from electry_art.cart.signals import checkout_completed
 import logging
@@ -28,6 +30,23 @@ log = logging.getLogger("electryart.orders")
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
+def checkout_context(form, cart):
+    """
+    Checkout page context; line totals come annotated from SQL (one query for all lines).
+    """
+    items = list(cart.items.with_line_totals()) if cart else []
+    return {
+        "form": form,
+        "cart": cart,
+        "items": items,
+        "cart_total": sum((item.line_total for item in items), Decimal("0.00")),
+    }
+
+
+def order_items_prefetch():
+    return Prefetch("items", queryset=OrderItem.objects.with_line_totals().select_related("product"))
+
+
 def build_order_serial(order_id):
     # ORD-20260106-000154
     return f"ORD{timezone.now().strftime('%Y%m%d')}{order_id:06d}"
@@ -41,7 +60,7 @@ class CheckoutView(LoginRequiredMixin, View):
             return redirect("cart_view")
 
         form = CheckoutForm(user=request.user)
-        return render(request, "orders/checkout.html", {"form": form, "cart": cart})
+        return render(request, "orders/checkout.html", checkout_context(form, cart))
 
     @staticmethod
     def post(request):
@@ -71,7 +90,7 @@ class CheckoutView(LoginRequiredMixin, View):
                 request_id=rid,
                 extra={"fields": bad_fields},
             )
-            return render(request, "orders/checkout.html", {"form": form, "cart": cart})
+            return render(request, "orders/checkout.html", checkout_context(form, cart))
 
         try:
             stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -156,6 +175,7 @@ class CheckoutView(LoginRequiredMixin, View):
                 order.save(update_fields=["order_serial_number"])
 
                 stripe_line_items = []
+                order_lines = []
 
                 for it in items:
                     product = products_map[it.product_id]
@@ -167,6 +187,7 @@ class CheckoutView(LoginRequiredMixin, View):
                         quantity=it.quantity,
                         price=product.price,
                     )
+                    order_lines.append((product.price, it.quantity))
 
                     stripe_line_items.append(
                         {
@@ -181,6 +202,9 @@ class CheckoutView(LoginRequiredMixin, View):
                         }
                     )
 
+                order.record_totals(order_lines)
+                refresh_order_day(order)
+
                 success_url = request.build_absolute_uri(
                     reverse("stripe_payment_success")
                 ) + "?session_id={CHECKOUT_SESSION_ID}"
@@ -231,7 +255,7 @@ class CheckoutView(LoginRequiredMixin, View):
 
         except ValidationError as exc:
             form.add_error(None, str(exc))
-            return render(request, "orders/checkout.html", {"form": form, "cart": cart})
+            return render(request, "orders/checkout.html", checkout_context(form, cart))
 
         except stripe.error.StripeError as exc:
 
@@ -248,7 +272,7 @@ class CheckoutView(LoginRequiredMixin, View):
                 extra={"error": str(exc)},
             )
             form.add_error(None, f"Stripe error: {exc}")
-            return render(request, "orders/checkout.html", {"form": form, "cart": cart})
+            return render(request, "orders/checkout.html", checkout_context(form, cart))
 
 
         except Exception:  # noqa: BLE001
@@ -265,10 +289,10 @@ class OrderSuccessView(generic.DetailView):
     context_object_name = 'order'
 
     def get_object(self, queryset=None):
-        return Order.objects.get(pk=self.kwargs['order_id'])
+        return self.get_queryset().get(pk=self.kwargs['order_id'])
 
     def get_queryset(self):
-        return Order.objects.prefetch_related("items__product")
+        return Order.objects.prefetch_related(order_items_prefetch())
 
 
 class OrderHistoryView(LoginRequiredMixin, generic.ListView):
@@ -279,7 +303,6 @@ class OrderHistoryView(LoginRequiredMixin, generic.ListView):
     def get_queryset(self):
         return (Order.objects
                 .filter(user=self.request.user)
-                .prefetch_related("items__product")
                 .order_by("-created_at")[:10]
         )
 
@@ -290,7 +313,7 @@ class OrderDetailView(LoginRequiredMixin, generic.DetailView):
     context_object_name = "order"
 
     def get_queryset(self):
-        qs = (super().get_queryset().prefetch_related("items__product"))
+        qs = (super().get_queryset().prefetch_related(order_items_prefetch()))
 
         """Staff/superuser can see all orders"""
         if self.request.user.is_staff or self.request.user.is_superuser:
@@ -470,6 +493,7 @@ class GuestCheckoutView(View):
 
                 items_count = 0
                 stripe_line_items = []
+                order_lines = []
 
                 BGN_TO_EUR = Decimal("0.51129")
 
@@ -488,6 +512,7 @@ class GuestCheckoutView(View):
                         quantity=quantity,
                         price=product.price,
                     )
+                    order_lines.append((product.price, quantity))
                     items_count += 1
 
                     price_eur = (product.price * BGN_TO_EUR).quantize(Decimal("0.01"))
@@ -506,6 +531,9 @@ class GuestCheckoutView(View):
                         }
                     )
 
+                order.record_totals(order_lines)
+                refresh_order_day(order)
+
                 success_url = request.build_absolute_uri(
                     reverse("stripe_payment_success")
                 ) + "?session_id={CHECKOUT_SESSION_ID}"
@@ -616,7 +644,6 @@ class Last7DaysOrdersListView(LoginRequiredMixin, UserPassesTestMixin, generic.L
             Order.objects
             .filter(created_at__gte=seven_days_ago)
             .select_related("user")
-            .prefetch_related("items__product")
             .order_by("-created_at")
         )
 
@@ -629,10 +656,10 @@ class Last7DaysOrdersListView(LoginRequiredMixin, UserPassesTestMixin, generic.L
         context["from_date"] = seven_days_ago.date()
         context["to_date"] = now.date()
 
-        # Total sum for all orders in this period
-        all_orders = self.get_queryset()
-        total_revenue = sum(order.total_price for order in all_orders)
-        context["total_revenue"] = total_revenue
+        # Total sum for all orders in this period + status breakdowns, one aggregate query
+        summary = self.object_list.revenue_summary()
+        context["summary"] = summary
+        context["total_revenue"] = summary["total"]["revenue"]
 
         return context
 
@@ -677,7 +704,6 @@ class PreviousMonthOrdersListView(LoginRequiredMixin, UserPassesTestMixin, gener
             Order.objects
             .filter(created_at__year=year, created_at__month=month)
             .select_related("user")
-            .prefetch_related("items__product")
             .order_by("-created_at")
         )
 
@@ -692,14 +718,89 @@ class PreviousMonthOrdersListView(LoginRequiredMixin, UserPassesTestMixin, gener
         context["from_date"] = from_date
         context["to_date"] = to_date
 
-        # Total sum for all orders from last month
-        all_orders = self.get_queryset()
-        total_revenue = sum(order.total_price for order in all_orders)
-        context["total_revenue"] = total_revenue
+        # Total sum for all orders from last month + status breakdowns, one aggregate query
+        summary = self.object_list.revenue_summary()
+        context["summary"] = summary
+        context["total_revenue"] = summary["total"]["revenue"]
 
         return context
 
 
+class SalesReportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Any date range (optionally against the same range a year earlier),
+    summed from the daily sales rollups: a few hundred rows at most,
+    whatever the order volume.
+    """
+    template_name = "orders/sales_report.html"
+
+    def test_func(self):
+        return self.request.user.is_staff or self.request.user.is_superuser
+
+    @staticmethod
+    def period(start, end, with_days=False):
+        period = {
+            "start": start,
+            "end": end,
+            "totals": rollups.range_totals(start, end),
+            "by_type": rollups.range_by_type(start, end),
+        }
+        if with_days:
+            period["days"] = rollups.range_days(start, end)
+        return period
+
+    def get(self, request, *args, **kwargs):
+        start, end = rollups.default_range()
+        form = SalesReportForm(request.GET or {"date_from": start, "date_to": end})
+
+        context = {"form": form}
+        if form.is_valid():
+            start, end = form.cleaned_data["date_from"], form.cleaned_data["date_to"]
+            context["current"] = self.period(start, end, with_days=True)
+
+            if form.cleaned_data["compare"]:
+                previous = self.period(rollups.year_earlier(start), rollups.year_earlier(end))
+                context["previous"] = previous
+                before = previous["totals"]["revenue"]
+                if before:
+                    change = (context["current"]["totals"]["revenue"] - before) / before * 100
+                    context["revenue_change"] = change.quantize(Decimal("0.1"))
+
+        return render(request, self.template_name, context)
+
+
+class OrderExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Orders and their lines as CSV for accounting, filtered by date range and
+    paid / sent status. Streamed from a server-side cursor, so memory stays
+    flat however many orders the range holds.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff or self.request.user.is_superuser
+
+    def get(self, request, *args, **kwargs):
+        form = OrderExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+
+        condition = exports.order_filter(
+            date_from=form.cleaned_data["date_from"],
+            date_to=form.cleaned_data["date_to"],
+            paid=form.cleaned_data["paid"],
+            sent=form.cleaned_data["sent"],
+        )
+        response = StreamingHttpResponse(
+            exports.stream_csv(exports.export_rows(condition)),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{form.filename()}"'
+        response["Cache-Control"] = "private, no-store"
+
+        log.info("ORDERS_EXPORT user_id=%s filters=%s", request.user.pk, request.GET.urlencode())
+        return response
+
+
 class OrdersEditView(LoginRequiredMixin, UserPassesTestMixin, generic.UpdateView):
     model = Order
     template_name = "orders/order_edit.html"
@@ -736,6 +837,8 @@ class OrdersEditView(LoginRequiredMixin, UserPassesTestMixin, generic.UpdateView
             form.instance.is_accepted = True
 
         response = super().form_valid(form)
+        if set(form.changed_data) & set(rollups.ORDER_FIELDS):
+            refresh_order_day(self.object)
 
         # snapshot AFTER (self.object е вече saved)
         after = f"accepted={self.object.is_accepted},sent={self.object.is_sent}"
@@ -1217,11 +1320,15 @@ class StripeWebhookView(View):
                         ]
                     )
 
+                    refresh_order_day(order)
+
                     # clear cart after successful payment
                     if order.user_id:
                         cart = Cart.objects.filter(user=order.user).first()
                         if cart:
                             cart.items.all().delete()
+                        user_id = order.user_id
+                        transaction.on_commit(lambda: set_cart_count(user_id, 0))
 
                     log.info(
                         "STRIPE_PAYMENT_CONFIRMED order_id=%s serial=%s session_id=%s payment_intent_id=%s request_id=%s",
@@ -0,0 +1,166 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.urls import reverse
+from django.utils.http import quote_etag, urlencode
+
+from electry_art.products.cache import catalog_version
+from electry_art.products.likes import likes_count_version
+from electry_art.products.models import Product
+from electry_art.products.product_mixins.keyset_pagination import paginate_keyset
+from electry_art.products.product_mixins.sorting_filtering import apply_filters, apply_sort, get_sort_key
+from electry_art.products.taxonomy import taxonomy_version
+
+# Read-only JSON catalog (views.CatalogApiView / ProductApiDetailView).
+# Rows come from a .values() projection of only the requested fields; the
+# encoded body + its ETag are cached per (catalog version, language, query),
+# so a warm request costs one cache get and no queries.
+API_CACHE_TIMEOUT = 60
+API_DEFAULT_LIMIT = 24
+API_MAX_LIMIT = 100
+
+DEFAULT_FIELDS = ('id', 'name', 'slug', 'price', 'is_available', 'image', 'url')
+
+# always selected: the keyset cursor is built from the sort columns
+SORT_COLUMNS = ('pk', 'date_created', 'price', 'popularity_score', 'trending_score')
+
+URL_SLUG_PLACEHOLDER = 'api-slug'
+
+
+def _translated(field, language):
+    # modeltranslation columns; empty Bulgarian text falls back to English
+    return Coalesce(NullIf(F(f'{field}_{language}'), Value('')), F(f'{field}_en'), output_field=TextField())
+
+
+def field_expressions(language):
+    return {
+        'id': F('pk'),
+        'serial_number': F('serial_number'),
+        'slug': F('slug'),
+        'name': _translated('name', language),
+        'description': _translated('description', language),
+        'price': F('price'),
+        'quantity': F('quantity'),
+        'is_available': F('is_available'),
+        'likes_count': F('likes_count'),
+        'date_created': F('date_created'),
+        'updated_on': F('updated_on'),
+        'size': F('size'),
+        'weight': F('weight'),
+        'type': F('type__slug'),
+        'type_name': _translated('type__name', language),
+        'material': _translated('material__name', language),
+        'color': _translated('color__name', language),
+        'image': F('product_image'),
+        'url': F('slug'),
+    }
+
+
+ALLOWED_FIELDS = tuple(field_expressions('en'))
+
+
+def parse_fields(raw):
+    """
+    "id,name,price" -> ('id', 'name', 'price'); ValueError on unknown names.
+    """
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in ALLOWED_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}; allowed: {', '.join(ALLOWED_FIELDS)}")
+    return fields or DEFAULT_FIELDS
+
+
+def parse_limit(raw):
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        return API_DEFAULT_LIMIT
+    return max(1, min(limit, API_MAX_LIMIT))
+
+
+def project(queryset, fields, language):
+    """
+    .values() with `api_<field>` aliases (a plain alias like `name` would
+    clash with the model field) plus the sort columns for the cursor.
+    """
+    expressions = field_expressions(language)
+    return queryset.values(*SORT_COLUMNS, **{f'api_{name}': expressions[name] for name in fields})
+
+
+def serialize(rows, fields):
+    url_template = reverse('product details', kwargs={'slug': URL_SLUG_PLACEHOLDER})
+    result = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = row[f'api_{name}']
+            if name == 'image':
+                value = default_storage.url(value) if value else None
+            elif name == 'url':
+                value = url_template.replace(URL_SLUG_PLACEHOLDER, value) if value else None
+            item[name] = value
+        result.append(item)
+    return result
+
+
+def encode(data):
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = quote_etag(hashlib.md5(body, usedforsecurity=False).hexdigest())
+    return etag, body
+
+
+def cache_key(kind, language, params, fields=DEFAULT_FIELDS):
+    query = urlencode(sorted((key, value) for key in params for value in params.getlist(key)))
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    # likes do not move the catalog version; only responses showing the counts follow them
+    likes = likes_count_version() if 'likes_count' in fields else 0
+    return f'products:api:{kind}:{catalog_version()}:{taxonomy_version()}:{likes}:{language}:{digest}'
+
+
+def _page_link(path, params, cursor):
+    if cursor is None:
+        return None
+    query = params.copy()
+    query['cursor'] = cursor
+    return f"{path}?{query.urlencode()}"
+
+
+def build_list(path, params, fields, language):
+    """
+    (etag, body) of one catalog page.
+    """
+    sort = get_sort_key(params.get('sort'))
+    qs = apply_sort(apply_filters(Product.objects.all(), params), sort)
+
+    page = paginate_keyset(project(qs, fields, language), sort, params.get('cursor'), parse_limit(params.get('limit')))
+    return encode({
+        'results': serialize(page.object_list, fields),
+        'next': _page_link(path, params, page.next_cursor),
+        'previous': _page_link(path, params, page.previous_cursor),
+    })
+
+
+def build_detail(slug, fields, language):
+    """
+    (etag, body) of one product, or None.
+    """
+    row = project(Product.objects.filter(slug=slug), fields, language).first()
+    if row is None:
+        return None
+    return encode(serialize([row], fields)[0])
+
+
+def cached_response_parts(key, builder):
+    parts = cache.get(key)
+    if parts is None:
+        parts = builder()
+        if parts is not None:
+            cache.set(key, parts, API_CACHE_TIMEOUT)
+    return parts
@@ -6,4 +6,5 @@ class ProductsConfig(AppConfig):
     name = 'electry_art.products'
 
     def ready(self):
-        import electry_art.products.translation
\ No newline at end of file
+        import electry_art.products.translation
+        import electry_art.products.receivers
\ No newline at end of file
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils import timezone
+
+from electry_art.products import sitemaps
+from electry_art.products.models import Product
+
+# {% cache %} fragment names used for product cards, see
+# get_all_products.html, wishlist.html and index_1_0.html.
+# Keys are versioned with (pk, updated_on, language), so a saved product simply
+# renders under a new key; stale entries expire on their own.
+PRODUCT_CARD_FRAGMENTS = (
+    'product_card',
+    'product_card_wishlist',
+    'product_card_index',
+)
+
+
+def product_card_keys(product):
+    if product.updated_on is None:
+        return []
+    timestamp = product.updated_on.timestamp()
+    return [
+        make_template_fragment_key(fragment, [product.pk, timestamp, language])
+        for fragment in PRODUCT_CARD_FRAGMENTS
+        for language, _ in settings.LANGUAGES
+    ]
+
+
+def invalidate_product_cards(product):
+    cache.delete_many(product_card_keys(product))
+
+
+def touch_product(product_id):
+    """
+    Bumps `updated_on` without a full save (no signals, no slug logic),
+    so every versioned cache / validator built on it moves forward, and
+    drops the sitemap file showing the old `lastmod` once committed.
+    """
+    Product.objects.filter(pk=product_id).update(updated_on=timezone.now())
+    bump_catalog_version()
+    transaction.on_commit(lambda: sitemaps.invalidate_product(product_id))
+
+
+# Catalog-wide version for caches keyed on "any product changed"
+# (JSON API responses); bumped from products/receivers.py.
+CATALOG_VERSION_KEY = 'products:catalog:version'
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # time based seed, like the taxonomy version
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,272 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from electry_art.products import sitemaps
+from electry_art.products.cache import bump_catalog_version
+from electry_art.products.models import Product, ProductType, ProductMaterial, ProductColor
+from electry_art.products.related import queue_refresh
+from electry_art.products.slugs import SlugBatch, slug_base
+
+# Column order of export_products / accepted columns of import_products.
+# type / material / color are names (English or Bulgarian).
+COLUMNS = (
+    'serial_number',
+    'name_en',
+    'name_bg',
+    'description_en',
+    'description_bg',
+    'type',
+    'material',
+    'color',
+    'size',
+    'weight',
+    'price',
+    'quantity',
+    'url_link',
+)
+
+REQUIRED_COLUMNS = ('serial_number', 'name_en', 'type', 'material', 'color', 'size', 'weight', 'price')
+
+TAXONOMY_COLUMNS = {
+    'type': ('type_id', ProductType),
+    'material': ('material_id', ProductMaterial),
+    'color': ('color_id', ProductColor),
+}
+
+# written on update; slug / images / counters are never touched by an import
+UPDATE_FIELDS = (
+    'name_en', 'name_bg', 'description_en', 'description_bg', 'type', 'material', 'color',
+    'size', 'weight', 'price', 'quantity', 'is_available', 'url_link', 'updated_on',
+)
+
+
+class RowError(Exception):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def iter_rows(fh, fmt):
+    """
+    (line number, dict) per record; reads the file lazily.
+    """
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, RowError(f"invalid JSON: {exc.msg}")
+    else:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def taxonomy_maps():
+    """
+    {'type': {'lamps': 3, 'лампи': 3, ...}, 'material': {...}, 'color': {...}}
+    Case-insensitive, both translation columns.
+    """
+    maps = {}
+    for column, (_, model) in TAXONOMY_COLUMNS.items():
+        lookup = {}
+        for pk, name_en, name_bg in model.objects.values_list('pk', 'name_en', 'name_bg'):
+            for name in (name_en, name_bg):
+                if name:
+                    lookup.setdefault(name.strip().casefold(), pk)
+        maps[column] = lookup
+    return maps
+
+
+def _text(row, column):
+    value = row.get(column)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _decimal(row, column):
+    try:
+        value = Decimal(_text(row, column))
+    except InvalidOperation:
+        raise RowError(f"{column}: not a number")
+    if not value.is_finite():
+        # NaN / Infinity would only blow up later, in the validators
+        raise RowError(f"{column}: not a number")
+    return value
+
+
+def parse_row(row, maps):
+    """
+    Validated field dict for Product, or RowError.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if not _text(row, column)]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+
+    values = {
+        'serial_number': _text(row, 'serial_number'),
+        'name_en': _text(row, 'name_en'),
+        'name_bg': _text(row, 'name_bg') or None,
+        'description_en': _text(row, 'description_en') or None,
+        'description_bg': _text(row, 'description_bg') or None,
+        'size': _text(row, 'size'),
+        'weight': _decimal(row, 'weight'),
+        'price': _decimal(row, 'price'),
+        'url_link': _text(row, 'url_link') or None,
+    }
+
+    try:
+        values['quantity'] = int(_text(row, 'quantity') or 0)
+    except ValueError:
+        raise RowError("quantity: not an integer")
+    values['is_available'] = values['quantity'] > 0
+
+    for column, (field, _) in TAXONOMY_COLUMNS.items():
+        pk = maps[column].get(_text(row, column).casefold())
+        if pk is None:
+            raise RowError(f"{column}: unknown '{_text(row, column)}'")
+        values[field] = pk
+
+    # field validators (lengths, MinValueValidator, URL) without the unique checks
+    try:
+        Product(**values).clean_fields(exclude=['slug', 'search_vector', 'product_image', 'likes_count'])
+    except ValidationError as exc:
+        raise RowError("; ".join(f"{field}: {' '.join(errors)}" for field, errors in exc.message_dict.items()))
+
+    return values
+
+
+class ProductImporter:
+    """
+    Upserts products by serial_number, one transaction per batch:
+    one SELECT for the existing rows, one bulk_create, one bulk_update.
+    Memory is bounded by the batch size.
+    """
+
+    def __init__(self, batch_size=500, dry_run=False, update_existing=True, on_error=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.update_existing = update_existing
+        self.on_error = on_error or (lambda line_no, serial, message: None)
+        self.maps = taxonomy_maps()
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+        self.written = []
+
+    def error(self, line_no, serial, message):
+        self.stats['failed'] += 1
+        self.on_error(line_no, serial, message)
+
+    def run(self, rows):
+        batch = {}
+        for line_no, row in rows:
+            if isinstance(row, RowError):
+                self.error(line_no, '', str(row))
+                continue
+            try:
+                values = parse_row(row, self.maps)
+            except RowError as exc:
+                self.error(line_no, _text(row, 'serial_number'), str(exc))
+                continue
+
+            serial = values['serial_number']
+            if serial in batch:
+                self.error(batch[serial][0], serial, f"duplicate serial_number, superseded by line {line_no}")
+            batch[serial] = (line_no, values)
+
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = {}
+
+        if batch:
+            self.flush(batch)
+        if self.written:
+            self.invalidate()
+        return self.stats
+
+    def invalidate(self):
+        """
+        Bulk writes send no signals: once per import, drop the sitemap files,
+        move the catalog version and queue the written products for the
+        related-products lists (`rebuild_related_products --queued`).
+        """
+        for pk in {sitemaps.chunk_for_pk(pk): pk for pk in self.written}.values():
+            sitemaps.invalidate_product(pk)
+        bump_catalog_version()
+        queue_refresh(self.written)
+
+    def flush(self, batch):
+        try:
+            with transaction.atomic():
+                created, updated, skipped, written = self.write(batch)
+                if self.dry_run:
+                    transaction.set_rollback(True)
+        except DatabaseError as exc:
+            for serial, (line_no, _) in batch.items():
+                self.error(line_no, serial, f"batch failed: {exc}")
+            return
+
+        if not self.dry_run:
+            self.written.extend(written)
+
+        self.stats['created'] += created
+        self.stats['updated'] += updated
+        self.stats['skipped'] += skipped
+
+    def write(self, batch):
+        existing = Product.objects.in_bulk(batch.keys(), field_name='serial_number')
+        now = timezone.now()
+        to_create, to_update, skipped = [], [], 0
+
+        for serial, (_, values) in batch.items():
+            product = existing.get(serial)
+            if product is None:
+                to_create.append(Product(**values))
+            elif self.update_existing:
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_on = now
+                to_update.append(product)
+            else:
+                skipped += 1
+
+        if to_create:
+            # bulk_create skips Product.save -> allocate slugs for the whole batch here
+            allocator = SlugBatch(Product)
+            allocator.lock_table()
+            for product in to_create:
+                product.slug = allocator.allocate(slug_base(product, 'product'))
+            Product.objects.bulk_create(to_create)
+
+        if to_update:
+            Product.objects.bulk_update(to_update, UPDATE_FIELDS)
+
+        written = [product.pk for product in to_create + to_update]
+        return len(to_create), len(to_update), skipped, written
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Dicts in COLUMNS order, streamed from the database with a server-side cursor.
+    """
+    rows = queryset.order_by('pk').values_list(
+        'serial_number', 'name_en', 'name_bg', 'description_en', 'description_bg',
+        'type__name_en', 'material__name_en', 'color__name_en',
+        'size', 'weight', 'price', 'quantity', 'url_link',
+    )
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield {
+            column: '' if value is None else str(value)
+            for column, value in zip(COLUMNS, values)
+        }
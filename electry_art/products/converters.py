@@ -0,0 +1,13 @@
+class UnicodeSlugConverter:
+    """
+    Like the built-in `slug` converter, but also accepts the lowercase
+    Cyrillic slugs slugify(..., allow_unicode=True) produces for Bulgarian names.
+    Uppercase / spaced values still fall through to the legacy routes.
+    """
+    regex = '[-a-z0-9_а-яѐ-џ]+'
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+from django.db.models import Count, Q
+
+from electry_art.products.product_mixins.sorting_filtering import apply_filters, parse_filters
+
+# (min_price, max_price) - max is exclusive, None = open end
+PRICE_BUCKETS = (
+    (None, Decimal("20")),
+    (Decimal("20"), Decimal("50")),
+    (Decimal("50"), Decimal("100")),
+    (Decimal("100"), None),
+)
+
+
+def _price_q(min_price, max_price, inclusive_max=True):
+    q = Q()
+    if min_price is not None:
+        q &= Q(price__gte=min_price)
+    if max_price is not None:
+        q &= Q(price__lte=max_price) if inclusive_max else Q(price__lt=max_price)
+    return q
+
+
+def _bucket_label(min_price, max_price):
+    if min_price is None:
+        return f"< {max_price}"
+    if max_price is None:
+        return f"{min_price}+"
+    return f"{min_price} - {max_price}"
+
+
+def compute_facets(qs, params, materials, colors, types=(), locked_type_slug=None):
+    """
+    Per-material / per-color / per-type / price-bucket product counts for the
+    active filter set, in ONE aggregate query (conditional COUNTs).
+
+    Each facet is counted with every active filter except its own, so the counts
+    answer "how many results if I pick this value instead". `materials`, `colors`
+    and `types` are the taxonomy rows the page already renders.
+    """
+    filters = parse_filters(params)
+
+    # search, availability and a locked category narrow every facet
+    base = apply_filters(
+        qs,
+        {"q": filters["q"], "available": "1" if filters["available"] else ""},
+        locked_type_slug=locked_type_slug,
+    )
+
+    type_ids = {t.slug: t.pk for t in types}
+    count_types = bool(types) and not locked_type_slug
+
+    material_q = Q(material_id=filters["material"]) if filters["material"] is not None else Q()
+    color_q = Q(color_id=filters["color"]) if filters["color"] is not None else Q()
+    price_q = _price_q(filters["min_price"], filters["max_price"])
+    type_q = Q()
+    if filters["type"] and not locked_type_slug:
+        type_q = Q(type_id=type_ids.get(filters["type"], 0))
+
+    aggregates = {"total": Count("pk", filter=material_q & color_q & price_q & type_q)}
+
+    for material in materials:
+        aggregates[f"material_{material.pk}"] = Count(
+            "pk", filter=Q(material_id=material.pk) & color_q & price_q & type_q
+        )
+    for color in colors:
+        aggregates[f"color_{color.pk}"] = Count(
+            "pk", filter=Q(color_id=color.pk) & material_q & price_q & type_q
+        )
+    if count_types:
+        for product_type in types:
+            aggregates[f"type_{product_type.pk}"] = Count(
+                "pk", filter=Q(type_id=product_type.pk) & material_q & color_q & price_q
+            )
+    for i, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f"price_{i}"] = Count(
+            "pk", filter=_price_q(low, high, inclusive_max=False) & material_q & color_q & type_q
+        )
+
+    counts = base.order_by().aggregate(**aggregates)
+
+    return {
+        "total": counts["total"],
+        "materials": [
+            {"obj": m, "count": counts[f"material_{m.pk}"], "selected": m.pk == filters["material"]}
+            for m in materials
+        ],
+        "colors": [
+            {"obj": c, "count": counts[f"color_{c.pk}"], "selected": c.pk == filters["color"]}
+            for c in colors
+        ],
+        "types": [
+            {"obj": t, "count": counts[f"type_{t.pk}"], "selected": t.slug == filters["type"]}
+            for t in types
+        ] if count_types else [],
+        "price_buckets": [
+            {
+                "label": _bucket_label(low, high),
+                "min_price": "" if low is None else str(low),
+                "max_price": "" if high is None else str(high - Decimal("0.01")),
+                "count": counts[f"price_{i}"],
+            }
+            for i, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
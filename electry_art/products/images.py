@@ -0,0 +1,232 @@
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+
+log = logging.getLogger("electryart")
+
+# Fixed widths generated for every product image (original aspect ratio kept).
+DERIVATIVE_WIDTHS = (160, 320, 640, 1024)
+DERIVATIVES_DIR = 'derivatives'
+DERIVATIVE_FORMATS = ('jpeg', 'webp')
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Which derivatives exist, per image, so rendering a card never stats storage.
+# Written by the parent process once a job finishes; a miss scans storage once.
+# An image with nothing generated yet is re-scanned sooner.
+DERIVATIVES_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+PENDING_CACHE_TIMEOUT = 60 * 5
+
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)  # rotated by 90 degrees: width and height swap
+
+_executor = None
+
+
+def derivative_name(name, width, fmt):
+    """
+    products/abc.jpg, 320, 'webp' -> derivatives/products/abc-320w.webp
+    """
+    stem, _ = posixpath.splitext(name)
+    ext = 'webp' if fmt == 'webp' else 'jpg'
+    return posixpath.join(DERIVATIVES_DIR, f"{stem}-{width}w.{ext}")
+
+
+def _widths_key(name):
+    return 'images:derivatives:' + hashlib.md5(name.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def scan_derivatives(name):
+    """
+    {'jpeg': [160, 320], 'webp': [160, 320]} from storage (8 exists() calls).
+    """
+    return {
+        fmt: [width for width in DERIVATIVE_WIDTHS if default_storage.exists(derivative_name(name, width, fmt))]
+        for fmt in DERIVATIVE_FORMATS
+    }
+
+
+def record_derivatives(name):
+    widths = scan_derivatives(name)
+    timeout = DERIVATIVES_CACHE_TIMEOUT if any(widths.values()) else PENDING_CACHE_TIMEOUT
+    cache.set(_widths_key(name), widths, timeout)
+    return widths
+
+
+def derivative_widths(name):
+    widths = cache.get(_widths_key(name))
+    if widths is None:
+        widths = record_derivatives(name)
+    return widths
+
+
+def available_derivatives(name, fmt):
+    """
+    [(width, url), ...] for the derivatives that exist (cached, see record_derivatives).
+    """
+    if not name:
+        return []
+    return [(width, default_storage.url(derivative_name(name, width, fmt))) for width in derivative_widths(name)[fmt]]
+
+
+def _target_widths(source):
+    """
+    Widths to generate for an opened (not yet decoded) image: every width
+    below the upright source width, never upscaled.
+    """
+    width, height = source.size
+    if source.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+        width = height
+    return [w for w in DERIVATIVE_WIDTHS if w < width]
+
+
+def generate_derivatives(name, force=False):
+    """
+    Creates the JPEG + WebP derivatives of one stored image and returns the
+    list of files written. Runs inside the worker pool and touches storage
+    only (the database is left to the parent, see derivatives_done).
+
+    Without `force` the image header is read first and nothing is decoded
+    when every derivative already exists.
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    with default_storage.open(name, 'rb') as fh:
+        with Image.open(fh) as source:
+            widths = _target_widths(source)
+            if not force:
+                widths = [
+                    width for width in widths
+                    if not all(default_storage.exists(derivative_name(name, width, fmt)) for fmt in DERIVATIVE_FORMATS)
+                ]
+            if not widths:
+                return written
+
+            source = ImageOps.exif_transpose(source)
+            if source.mode not in ('RGB', 'RGBA'):
+                source = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+
+            for width in widths:
+                height = round(source.height * width / source.width)
+                resized = None
+
+                for fmt in DERIVATIVE_FORMATS:
+                    target = derivative_name(name, width, fmt)
+                    if not force and default_storage.exists(target):
+                        continue
+
+                    if resized is None:
+                        resized = source.resize((width, height), Image.Resampling.LANCZOS)
+
+                    buffer = BytesIO()
+                    if fmt == 'jpeg':
+                        resized.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    else:
+                        resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+
+                    if force and default_storage.exists(target):
+                        default_storage.delete(target)
+                    default_storage.save(target, ContentFile(buffer.getvalue()))
+                    written.append(target)
+
+    return written
+
+
+def derivatives_done(name, written, product_id=None):
+    """
+    Parent-side bookkeeping of a finished job: refreshes the cached widths
+    and, when new files exist, touches the product so cached cards / ETags
+    (rendered before the derivatives were there) pick up the srcset.
+    """
+    # imported here: spawned workers import this module before django.setup()
+    from electry_art.products.cache import touch_product
+
+    record_derivatives(name)
+    if written and product_id is not None:
+        touch_product(product_id)
+
+
+def delete_derivatives(name):
+    for width in DERIVATIVE_WIDTHS:
+        for fmt in DERIVATIVE_FORMATS:
+            target = derivative_name(name, width, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+    cache.delete(_widths_key(name))
+
+
+def _init_worker():
+    # spawned child: boots Django itself and never inherits the parent's DB sockets
+    import django
+    django.setup()
+
+
+def make_pool(workers):
+    """
+    Worker processes started with `spawn`, never `fork`: a forked child would
+    share the parent's open database connection (and a server-side cursor in
+    the middle of iteration).
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = make_pool(settings.IMAGE_DERIVATIVE_WORKERS)
+        atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
+def _job_finished(name, product_id, submitter, future):
+    exc = future.exception()
+    if exc is not None:
+        log.error("IMAGE_DERIVATIVES_FAILED name=%s error=%s", name, exc)
+        return
+    try:
+        derivatives_done(name, future.result(), product_id)
+    except Exception as exc:  # noqa: BLE001
+        log.error("IMAGE_DERIVATIVES_FAILED name=%s error=%s", name, exc)
+    finally:
+        if threading.get_ident() != submitter:
+            # the executor's management thread: do not leave its connection open
+            connections.close_all()
+
+
+def schedule_derivatives(name, force=False, product_id=None):
+    """
+    Queues derivative generation for an uploaded image, so the upload request
+    does not wait for Pillow. IMAGE_DERIVATIVES_ASYNC = False runs it inline.
+    """
+    if not name:
+        return None
+
+    if not settings.IMAGE_DERIVATIVES_ASYNC:
+        try:
+            written = generate_derivatives(name, force=force)
+            derivatives_done(name, written, product_id)
+            return written
+        except Exception as exc:  # noqa: BLE001 - a broken upload must not break the save
+            log.error("IMAGE_DERIVATIVES_FAILED name=%s error=%s", name, exc)
+            return None
+
+    future = get_executor().submit(generate_derivatives, name, force)
+    submitter = threading.get_ident()
+    future.add_done_callback(lambda f: _job_finished(name, product_id, submitter, f))
+    return future
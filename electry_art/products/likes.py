@@ -0,0 +1,258 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from electry_art.products.models import Like, Product, RankingEvent, RankingRemoval
+from electry_art.products.ranking import LIKE_WEIGHT
+
+
+def _tables():
+    return Like._meta.db_table, Product._meta.db_table
+
+
+def _removal_sql():
+    """
+    CTE logging the `deleted` likes for the next ranking refresh (raw DELETEs
+    send no post_delete).
+    """
+    return f"""
+        removal AS (
+            INSERT INTO {RankingRemoval._meta.db_table} (kind, source_id, product_id, weight, happened_at)
+            SELECT '{RankingEvent.KIND_LIKE}', id, product_id, %(like_weight)s, created_at FROM deleted
+        )
+    """
+
+
+def toggle_like(user, product):
+    """
+    Likes / unlikes `product` for `user` and keeps `Product.likes_count` in sync.
+    Returns (liked, likes_count) after the toggle.
+
+    One statement: DELETE the like if it exists, otherwise INSERT it, and move
+    the counter by the result (data-modifying CTEs). The counter UPDATE does
+    not touch `updated_on`. If a concurrent request inserted the same like
+    first, neither CTE changes a row and the state is read back afterwards.
+    """
+    like_table, product_table = _tables()
+    sql = f"""
+        WITH deleted AS (
+            DELETE FROM {like_table} WHERE user_id = %(user)s AND product_id = %(product)s
+            RETURNING id, product_id, created_at
+        ),
+        {_removal_sql()},
+        inserted AS (
+            INSERT INTO {like_table} (user_id, product_id, created_at)
+            SELECT %(user)s, %(product)s, now()
+            WHERE NOT EXISTS (SELECT 1 FROM deleted)
+            ON CONFLICT (user_id, product_id) DO NOTHING
+            RETURNING product_id
+        ),
+        counter AS (
+            UPDATE {product_table}
+            SET likes_count = GREATEST(
+                likes_count + (SELECT count(*) FROM inserted) - (SELECT count(*) FROM deleted), 0
+            )
+            WHERE id = %(product)s
+            RETURNING likes_count
+        )
+        SELECT EXISTS (SELECT 1 FROM inserted), EXISTS (SELECT 1 FROM deleted),
+               (SELECT likes_count FROM counter)
+    """
+    params = {'user': user.pk, 'product': product.pk}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {**params, 'like_weight': LIKE_WEIGHT})
+        liked, unliked, likes_count = cursor.fetchone()
+        if not liked and not unliked:
+            # lost the race (ON CONFLICT DO NOTHING): the new statement sees the winner's row
+            cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {like_table} WHERE user_id = %(user)s AND product_id = %(product)s),"
+                f" (SELECT likes_count FROM {product_table} WHERE id = %(product)s)",
+                params,
+            )
+            liked, likes_count = cursor.fetchone()
+
+    # a spurious bump (rolled back outer transaction) only costs one re-render.
+    # Not the catalog version: listings fetch their counts from like_counts()
+    bump_user_likes_version(user.pk)
+    bump_likes_count_version()
+    return liked, likes_count
+
+
+def set_likes(user, states):
+    """
+    Applies a batch of desired like states {product_id: bool} for `user` in
+    one statement: INSERT ... ON CONFLICT DO NOTHING for the liked ids, DELETE
+    for the rest, counters moved by what actually changed.
+    Returns {product_id: (liked, likes_count)} for the existing products.
+    """
+    like_ids = [pk for pk, liked in states.items() if liked]
+    unlike_ids = [pk for pk, liked in states.items() if not liked]
+    if not states:
+        return {}
+
+    like_table, product_table = _tables()
+    sql = f"""
+        WITH inserted AS (
+            INSERT INTO {like_table} (user_id, product_id, created_at)
+            SELECT %(user)s, id, now() FROM {product_table} WHERE id = ANY(%(like)s)
+            ON CONFLICT (user_id, product_id) DO NOTHING
+            RETURNING product_id
+        ),
+        deleted AS (
+            DELETE FROM {like_table} WHERE user_id = %(user)s AND product_id = ANY(%(unlike)s)
+            RETURNING id, product_id, created_at
+        ),
+        {_removal_sql()},
+        changes AS (
+            SELECT product_id, sum(delta) AS delta FROM (
+                SELECT product_id, 1 AS delta FROM inserted
+                UNION ALL
+                SELECT product_id, -1 FROM deleted
+            ) AS moved
+            GROUP BY product_id
+        ),
+        counter AS (
+            UPDATE {product_table} AS p
+            SET likes_count = GREATEST(p.likes_count + changes.delta, 0)
+            FROM changes
+            WHERE p.id = changes.product_id
+            RETURNING p.id, p.likes_count
+        )
+        SELECT p.id, COALESCE(counter.likes_count, p.likes_count)
+        FROM {product_table} AS p
+        LEFT JOIN counter ON counter.id = p.id
+        WHERE p.id = ANY(%(all)s)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {
+            'user': user.pk,
+            'like': like_ids,
+            'unlike': unlike_ids,
+            'all': like_ids + unlike_ids,
+            'like_weight': LIKE_WEIGHT,
+        })
+        rows = cursor.fetchall()
+
+    bump_user_likes_version(user.pk)
+    bump_likes_count_version()
+    return {pk: (bool(states[pk]), likes_count) for pk, likes_count in rows}
+
+
+def likes_count_subquery():
+    """
+    Real number of likes per product, as a correlated subquery over `Like`.
+    """
+    counts = (
+        Like.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def recount_likes(queryset=None):
+    """
+    Recomputes `likes_count` from the Like table in one UPDATE.
+    Returns the number of products that were out of sync (and got fixed).
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    drifted = (
+        queryset
+        .annotate(real_likes=likes_count_subquery())
+        .exclude(likes_count=F('real_likes'))
+        .values_list('pk', flat=True)
+    )
+    drifted_ids = list(drifted)
+
+    if drifted_ids:
+        Product.objects.filter(pk__in=drifted_ids).update(likes_count=likes_count_subquery())
+        bump_likes_count_version()
+
+    return len(drifted_ids)
+
+
+def like_counts(product_ids):
+    """
+    {product_id: likes_count} for a page of products, in one query. Pages
+    patch their counts from this (LikeCountsView), so a like does not
+    invalidate every cached / validated listing.
+    """
+    product_ids = [pk for pk in product_ids if pk is not None]
+    if not product_ids:
+        return {}
+    return dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'likes_count'))
+
+
+# Only for caches that include the counts (the API's opt-in `likes_count`
+# field); nothing catalog-wide moves on a like.
+LIKES_COUNT_VERSION_KEY = 'products:likes:counts:version'
+
+
+def likes_count_version():
+    version = cache.get(LIKES_COUNT_VERSION_KEY)
+    if version is None:
+        cache.add(LIKES_COUNT_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(LIKES_COUNT_VERSION_KEY)
+    return version
+
+
+def bump_likes_count_version():
+    try:
+        cache.incr(LIKES_COUNT_VERSION_KEY)
+    except ValueError:
+        cache.set(LIKES_COUNT_VERSION_KEY, time.time_ns(), None)
+
+
+# Liked state shared by the listing, detail and wishlist pages: always asked
+# for a known, bounded set of product ids, never "everything the user liked".
+
+def liked_product_ids(user, product_ids):
+    """
+    The subset of `product_ids` that `user` likes, in one IN query
+    (none for anonymous users or an empty page).
+    """
+    product_ids = [pk for pk in product_ids if pk is not None]
+    if not product_ids or not getattr(user, 'is_authenticated', False):
+        return set()
+    return set(
+        Like.objects
+        .filter(user=user, product_id__in=product_ids)
+        .values_list('product_id', flat=True)
+    )
+
+
+def is_liked(user, product):
+    return product.pk in liked_product_ids(user, [product.pk])
+
+
+def _likes_version_key(user_id):
+    return f'products:likes:version:{user_id}'
+
+
+def user_likes_version(user):
+    """
+    Changes whenever `user` likes / unlikes something; used in page validators
+    instead of aggregating the user's whole Like history.
+    """
+    key = _likes_version_key(user.pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_likes_version(user_id):
+    key = _likes_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from electry_art.products import sitemaps
+
+
+class Command(BaseCommand):
+    help = "Pre-generates the sitemap index and every sitemap file into SITEMAP_CACHE_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-only', action='store_true', help='Only rebuild missing / expired files.')
+
+    def handle(self, *args, **options):
+        jobs = [(sitemaps.INDEX_FILENAME, sitemaps.iter_index)]
+        chunks = list(sitemaps.product_buckets())
+        for language in sitemaps.languages():
+            jobs.append((sitemaps.section_filename('pages', language), lambda lang=language: sitemaps.iter_pages(lang)))
+            for chunk in chunks:
+                jobs.append((
+                    sitemaps.section_filename('products', language, chunk),
+                    lambda lang=language, c=chunk: sitemaps.iter_products(lang, c),
+                ))
+
+        built = 0
+        for filename, parts in jobs:
+            if options['stale_only'] and sitemaps.cached_file(filename) is not None:
+                continue
+            sitemaps.build(filename, parts())
+            built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{built} sitemap file(s) written to {sitemaps.SITEMAP_CACHE_DIR}."))
@@ -0,0 +1,86 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from electry_art.products.models import Product, ProductType, ProductMaterial, ProductColor
+from electry_art.products.product_mixins.sorting_filtering import apply_filters, apply_sort, SORT_MAP
+
+SEQ_SCAN = re.compile(r"Seq Scan on products_product\b")
+INDEX_USED = re.compile(r"Index(?: Only)? Scan(?: Backward)? using (\w+)|Bitmap Index Scan on (\w+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN on the canonical catalog filter/sort combinations "
+        "and reports which ones still fall back to a sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE (executes the queries).')
+        parser.add_argument(
+            '--no-seqscan',
+            action='store_true',
+            help='SET enable_seqscan = off, to check index usability on a small (dev) catalog.',
+        )
+        parser.add_argument('--page-size', type=int, default=12)
+        parser.add_argument('--show-plans', action='store_true')
+
+    def get_combinations(self):
+        product_type = ProductType.objects.order_by('pk').first()
+        material = ProductMaterial.objects.order_by('pk').first()
+        color = ProductColor.objects.order_by('pk').first()
+
+        filter_sets = [
+            {},
+            {'available': '1'},
+            {'min_price': '10', 'max_price': '50'},
+        ]
+        if material:
+            filter_sets.append({'material': str(material.pk)})
+        if color:
+            filter_sets.append({'color': str(color.pk)})
+        if material and color:
+            filter_sets.append({'material': str(material.pk), 'color': str(color.pk), 'available': '1'})
+
+        scopes = [None]
+        if product_type and product_type.slug:
+            scopes.append(product_type.slug)
+
+        for type_slug in scopes:
+            for params in filter_sets:
+                for sort in SORT_MAP:
+                    yield type_slug, params, sort
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        seq_scans = 0
+        total = 0
+
+        with transaction.atomic():
+            if options['no_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for type_slug, params, sort in self.get_combinations():
+                qs = apply_filters(Product.objects.all(), params, locked_type_slug=type_slug)
+                qs = apply_sort(qs, sort)[:page_size]
+                plan = qs.explain(analyze=options['analyze'])
+
+                total += 1
+                label = f"type={type_slug or '*'} sort={sort} " + " ".join(
+                    f"{key}={value}" for key, value in params.items()
+                )
+
+                if SEQ_SCAN.search(plan):
+                    seq_scans += 1
+                    self.stdout.write(self.style.WARNING(f"SEQ   {label}"))
+                else:
+                    used = {a or b for a, b in INDEX_USED.findall(plan)}
+                    self.stdout.write(f"INDEX {label} -> {', '.join(sorted(used)) or '?'}")
+
+                if options['show_plans']:
+                    self.stdout.write(plan + "\n")
+
+        style = self.style.WARNING if seq_scans else self.style.SUCCESS
+        self.stdout.write(style(f"{seq_scans}/{total} combination(s) use a sequential scan on products_product."))
@@ -0,0 +1,45 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from electry_art.products.catalog_io import COLUMNS, detect_format, export_rows
+from electry_art.products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Streams the catalog as CSV or JSONL, in the format import_products reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="Target file, '-' for stdout.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Default: from the file extension, else csv.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--available', action='store_true', help='Only products in stock.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = detect_format(output, options['format'])
+
+        qs = Product.objects.all()
+        if options['available']:
+            qs = qs.filter(is_available=True, quantity__gt=0)
+
+        fh = self.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+        count = 0
+        try:
+            if fmt == 'jsonl':
+                for row in export_rows(qs, chunk_size=options['chunk_size']):
+                    fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    count += 1
+            else:
+                writer = csv.DictWriter(fh, fieldnames=COLUMNS)
+                writer.writeheader()
+                for row in export_rows(qs, chunk_size=options['chunk_size']):
+                    writer.writerow(row)
+                    count += 1
+        finally:
+            if fh is not self.stdout:
+                fh.close()
+
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} product(s) to {output}."))
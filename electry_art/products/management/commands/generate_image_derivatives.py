@@ -0,0 +1,54 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from electry_art.products.images import derivatives_done, generate_derivatives, make_pool
+from electry_art.products.models import Product, ProductPhoto
+
+
+class Command(BaseCommand):
+    help = "Backfills thumbnail / WebP derivatives for every product image and photo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate existing derivatives.')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes (1 = inline).')
+
+    def get_jobs(self):
+        """
+        [(image name, product id), ...], read completely before any worker
+        starts, so no cursor is open while jobs are handed out.
+        """
+        jobs = list(Product.objects.filter(product_image__gt='').values_list('product_image', 'pk'))
+        jobs += ProductPhoto.objects.filter(product_image__gt='').values_list('product_image', 'product_id')
+        return jobs
+
+    def handle(self, *args, **options):
+        force = options['force']
+        written = failed = 0
+        jobs = self.get_jobs()
+
+        if options['workers'] <= 1:
+            for name, product_id in jobs:
+                try:
+                    files = generate_derivatives(name, force)
+                    derivatives_done(name, files, product_id)
+                    written += len(files)
+                except Exception as exc:  # noqa: BLE001 - report and keep going
+                    failed += 1
+                    self.stderr.write(f"{name}: {exc}")
+        else:
+            with make_pool(options['workers']) as pool:
+                futures = {pool.submit(generate_derivatives, name, force): (name, product_id) for name, product_id in jobs}
+                for future in as_completed(futures):
+                    name, product_id = futures[future]
+                    try:
+                        files = future.result()
+                        # database writes stay in this process
+                        derivatives_done(name, files, product_id)
+                        written += len(files)
+                    except Exception as exc:  # noqa: BLE001
+                        failed += 1
+                        self.stderr.write(f"{name}: {exc}")
+
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"{written} derivative file(s) written, {failed} image(s) failed."))
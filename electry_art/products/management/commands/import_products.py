@@ -0,0 +1,63 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from electry_art.products.catalog_io import ProductImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates / updates products (matched by serial_number) from a CSV or JSONL file, "
+        "in batches. type, material and color are given by name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Default: from the file extension.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and write, then roll back.')
+        parser.add_argument('--no-update', action='store_true', help='Skip rows whose serial_number exists.')
+        parser.add_argument('--errors', help='Write the per-row error report (CSV) to this file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+
+        report_file = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        report = csv.writer(report_file) if report_file else None
+        if report:
+            report.writerow(['line', 'serial_number', 'error'])
+
+        def on_error(line_no, serial, message):
+            if report:
+                report.writerow([line_no, serial, message])
+            else:
+                self.stderr.write(f"line {line_no} [{serial or '?'}]: {message}")
+
+        importer = ProductImporter(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            update_existing=not options['no_update'],
+            on_error=on_error,
+        )
+
+        try:
+            fh = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        try:
+            stats = importer.run(iter_rows(fh, fmt))
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+            if report_file:
+                report_file.close()
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        style = self.style.WARNING if stats['failed'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{prefix}{stats['created']} created, {stats['updated']} updated, "
+            f"{stats['skipped']} skipped, {stats['failed']} failed."
+        ))
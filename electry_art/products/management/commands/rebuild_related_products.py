@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from electry_art.products.models import Product
+from electry_art.products.related import RELATED_PRODUCTS_LIMIT, process_queue, refresh_related
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the precomputed related-products lists (all products, or the given serial numbers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('serial_numbers', nargs='*')
+        parser.add_argument('--limit', type=int, default=RELATED_PRODUCTS_LIMIT, help='Products stored per list.')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--queued', action='store_true',
+            help='Only the products queued by saves / deletes (run it every few minutes).',
+        )
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            refreshed = process_queue(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Refreshed related products for {refreshed} queued product(s)."))
+            return
+
+        qs = Product.objects.order_by('pk')
+        if options['serial_numbers']:
+            qs = qs.filter(serial_number__in=options['serial_numbers'])
+
+        ids = list(qs.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        refreshed = 0
+
+        for start in range(0, len(ids), batch_size):
+            refreshed += refresh_related(ids[start:start + batch_size], limit=options['limit'])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt related products for {refreshed} product(s)."))
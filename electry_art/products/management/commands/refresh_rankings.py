@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from electry_art.products.ranking import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = "Decays and updates the popular / trending scores (incremental since the last run unless --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every score from all likes and sales.')
+
+    def handle(self, *args, **options):
+        run = refresh_rankings(full=options['full'])
+        kind = 'Full' if run.full else 'Incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind} ranking refresh up to {run.events_until:%Y-%m-%d %H:%M:%S}: "
+            f"{run.products_updated} product(s) gained score."
+        ))
@@ -0,0 +1,107 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from electry_art.products import sitemaps
+from electry_art.products.cache import bump_catalog_version
+from electry_art.products.models import Product, ProductType
+from electry_art.products.slugs import SlugBatch, slug_base
+from electry_art.products.taxonomy import invalidate_taxonomy
+
+MODELS = {
+    'product': (Product, 'product'),
+    'type': (ProductType, 'type'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills empty slugs from the current (translated) names, in batches. "
+        "--stale also regenerates slugs that no longer match their name "
+        "(base or base-N); their old URLs stop resolving."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append', help='Default: all.')
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Also rewrite live slugs that no longer match the name (breaks their old URLs).',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    @staticmethod
+    def is_current(slug, base):
+        return bool(slug) and (slug == base or re.fullmatch(re.escape(base) + r'-[0-9]+', slug) is not None)
+
+    def reslug(self, model, fallback, options):
+        qs = model.objects.order_by('pk')
+        if not options['stale']:
+            qs = qs.filter(slug__isnull=True) | qs.filter(slug='')
+
+        last_pk = 0
+        changed = 0
+
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            with transaction.atomic():
+                allocator = SlugBatch(model)
+                # writers wait for the batch; readers are not blocked
+                allocator.lock_table()
+
+                bases = {obj.pk: slug_base(obj, fallback) for obj in batch}
+                stale = [obj for obj in batch if not self.is_current(obj.slug, bases[obj.pk])]
+                allocator.load(bases[obj.pk] for obj in stale)
+
+                for obj in stale:
+                    new_slug = allocator.allocate(bases[obj.pk])
+                    self.stdout.write(f"{model.__name__} #{obj.pk}: {obj.slug or '-'} -> {new_slug}")
+                    obj.slug = new_slug
+
+                if stale and not options['dry_run']:
+                    if model is Product:
+                        # bulk_update skips auto_now: move updated_on so card
+                        # caches and page ETags stop linking the old slug
+                        now = timezone.now()
+                        for obj in stale:
+                            obj.updated_on = now
+                        model.objects.bulk_update(stale, ['slug', 'updated_on'])
+                    else:
+                        model.objects.bulk_update(stale, ['slug'])
+                    self.changed_pks.extend(obj.pk for obj in stale)
+                changed += len(stale)
+
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+
+        return changed
+
+    @staticmethod
+    def invalidate(model, pks):
+        """
+        bulk_update sends no signals: drop what the receivers would have.
+        """
+        if model is Product:
+            chunks = {sitemaps.chunk_for_pk(pk): pk for pk in pks}
+            for pk in chunks.values():
+                sitemaps.invalidate_product(pk)
+            bump_catalog_version()
+        else:
+            sitemaps.invalidate_pages()
+            invalidate_taxonomy()
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(MODELS):
+            model, fallback = MODELS[name]
+            self.changed_pks = []
+            changed = self.reslug(model, fallback, options)
+            if self.changed_pks:
+                self.invalidate(model, self.changed_pks)
+            verb = 'would change' if options['dry_run'] else 'changed'
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {changed} slug(s) {verb}."))
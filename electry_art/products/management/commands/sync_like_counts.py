@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from electry_art.products.likes import likes_count_subquery, recount_likes
+from electry_art.products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Backfills / reconciles Product.likes_count against the Like table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report products whose counter is out of sync.',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            drifted = (
+                Product.objects
+                .annotate(real_likes=likes_count_subquery())
+                .exclude(likes_count=F('real_likes'))
+                .values_list('serial_number', 'likes_count', 'real_likes')
+            )
+            total = 0
+            for serial, stored, real in drifted.iterator():
+                total += 1
+                self.stdout.write(f"{serial}: stored={stored} real={real}")
+
+            self.stdout.write(self.style.WARNING(f"{total} product(s) out of sync."))
+            return
+
+        fixed = recount_likes()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled likes_count, {fixed} product(s) updated."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Like = apps.get_model('products', 'Like')
+
+    counts = (
+        Like.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Product.objects.update(likes_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_alter_product_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# There is no stock Bulgarian dictionary in PostgreSQL. `bulgarian` starts as a
+# copy of `simple` (lower-casing, no stemming); a hunspell dictionary can be
+# attached to it later without touching the application code.
+CREATE_BULGARIAN_CONFIG = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'bulgarian') THEN
+        CREATE TEXT SEARCH CONFIGURATION bulgarian (COPY = pg_catalog.simple);
+    END IF;
+END
+$$;
+"""
+
+CREATE_SEARCH_TRIGGER = """
+CREATE OR REPLACE FUNCTION products_product_search_document(
+    serial_number text, name_en text, name_bg text, description_en text, description_bg text
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('simple', coalesce(serial_number, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(name_en, '')), 'A') ||
+        setweight(to_tsvector('bulgarian', coalesce(name_bg, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description_en, '')), 'B') ||
+        setweight(to_tsvector('bulgarian', coalesce(description_bg, '')), 'B');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION products_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := products_product_search_document(
+        NEW.serial_number, NEW.name_en, NEW.name_bg, NEW.description_en, NEW.description_bg
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF serial_number, name_en, name_bg, description_en, description_bg
+    ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+
+UPDATE products_product SET search_vector = products_product_search_document(
+    serial_number, name_en, name_bg, description_en, description_bg
+);
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;
+DROP FUNCTION IF EXISTS products_product_search_vector_update();
+DROP FUNCTION IF EXISTS products_product_search_document(text, text, text, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_product_likes_count'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_BULGARIAN_CONFIG, migrations.RunSQL.noop),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.RunSQL(CREATE_SEARCH_TRIGGER, DROP_SEARCH_TRIGGER),
+    ]
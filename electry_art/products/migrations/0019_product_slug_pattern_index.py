@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_related_products'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['slug'], name='product_slug_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
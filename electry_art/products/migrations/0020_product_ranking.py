@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_product_slug_pattern_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('events_until', models.DateTimeField()),
+                ('full', models.BooleanField(default=False)),
+                ('products_updated', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-events_until'],
+                'get_latest_by': 'events_until',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='popularity_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-popularity_score', '-id'], name='product_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-trending_score', '-id'], name='product_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def restart_rankings(apps, schema_editor):
+    # scores computed before the ledger existed: the next refresh has to be a full one
+    apps.get_model('products', 'RankingRefresh').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_product_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Like'), ('sale', 'Sale')], max_length=4)),
+                ('source_id', models.BigIntegerField()),
+                ('weight', models.FloatField()),
+                ('happened_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source_id'), name='ranking_event_source_uniq')],
+            },
+        ),
+        migrations.RunPython(restart_rankings, migrations.RunPython.noop),
+    ]
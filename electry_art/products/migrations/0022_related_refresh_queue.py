@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_ranking_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedRefreshQueue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queued_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'ordering': ['queued_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def restart_rankings(apps, schema_editor):
+    # removals before this one were never logged: the next refresh has to be a full one
+    apps.get_model('products', 'RankingRefresh').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_related_refresh_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingRemoval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Like'), ('sale', 'Sale')], max_length=4)),
+                ('source_id', models.BigIntegerField()),
+                ('weight', models.FloatField()),
+                ('happened_at', models.DateTimeField()),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.product')),
+            ],
+        ),
+        migrations.RunPython(restart_rankings, migrations.RunPython.noop),
+    ]
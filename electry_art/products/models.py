@@ -1,7 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinLengthValidator, MinValueValidator
 from django.conf import settings
-from django.db import models
-from django.utils.text import slugify
+from django.db import models, transaction
+
+from electry_art.products.slugs import assign_slug
 
 
 class BaseModel(models.Model):
@@ -41,14 +44,10 @@ class ProductType(ProductTypeMaterialColor):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_name = getattr(self, 'name_en', None) or self.name
-            base = slugify(base_name, allow_unicode=True) or "type"
-            slug = base
-            i = 1
-            while ProductType.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                i += 1
-                slug = f"{base}-{i}"
-            self.slug = slug
+            with transaction.atomic():
+                assign_slug(self, 'type')
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
 
@@ -166,26 +165,77 @@ class Product(BaseModel):
         allow_unicode=True,
     )
 
+    # Denormalized Like counter, kept in sync by electry_art.products.likes
+    # and reconciled by the `sync_like_counts` management command.
+    likes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    # Time-decayed ranking from likes and paid sales, materialized here (like
+    # likes_count) so "popular" / "trending" sorts are an indexed ORDER BY.
+    # Refreshed by the `refresh_rankings` command, see products/ranking.py.
+    popularity_score = models.FloatField(
+        default=0,
+        editable=False,
+    )
+
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+    )
+
+    # Full-text document over the translated name/description columns.
+    # Maintained by a database trigger (see migration 0015), never written from Python.
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
     class Meta:
         verbose_name_plural = 'Products'
         ordering = ['-date_created']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            # autocomplete (products/search.py -> suggest)
+            GinIndex(fields=['name_en'], opclasses=['gin_trgm_ops'], name='product_name_en_trgm'),
+            GinIndex(fields=['name_bg'], opclasses=['gin_trgm_ops'], name='product_name_bg_trgm'),
+            models.Index(fields=['serial_number'], opclasses=['varchar_pattern_ops'], name='product_serial_pattern_idx'),
+            # slug allocation: base-N prefix lookups (products/slugs.py)
+            models.Index(fields=['slug'], opclasses=['varchar_pattern_ops'], name='product_slug_pattern_idx'),
+            # catalog filter/sort matrix (apply_filters / apply_sort),
+            # check with `manage.py explain_catalog_queries`
+            models.Index(fields=['-date_created', '-id'], name='product_created_idx'),
+            models.Index(fields=['price', '-id'], name='product_price_idx'),
+            models.Index(fields=['type', '-date_created', '-id'], name='product_type_created_idx'),
+            models.Index(fields=['type', 'price', '-id'], name='product_type_price_idx'),
+            models.Index(fields=['-popularity_score', '-id'], name='product_popularity_idx'),
+            models.Index(fields=['-trending_score', '-id'], name='product_trending_idx'),
+            models.Index(
+                fields=['-date_created', '-id'],
+                condition=models.Q(is_available=True, quantity__gt=0),
+                name='product_stock_created_idx',
+            ),
+            models.Index(
+                fields=['type', 'price', '-id'],
+                condition=models.Q(is_available=True, quantity__gt=0),
+                name='product_stock_type_price_idx',
+            ),
+        ]
 
     @property
     def like_count(self):
-        return self.likes.count()
+        return self.likes_count
 
     def save(self, *args, **kwargs):
         self.is_available = self.quantity > 0
 
         if not self.slug:
-            base_name = getattr(self, 'name_en', None) or self.name
-            base = slugify(base_name, allow_unicode=True) or "product"
-            slug = base
-            i = 1
-            while Product.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                i += 1
-                slug = f"{base}-{i}"
-            self.slug = slug
+            # see products/slugs.py: one query per allocation, locked per base name
+            with transaction.atomic():
+                assign_slug(self, 'product')
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
     def is_liked_by(self, user):
@@ -235,3 +285,148 @@ class Like(models.Model):
 
     def __str__(self):
         return f"{self.user.username} likes {self.product.name}"
+
+
+class RelatedProduct(models.Model):
+    """
+    Precomputed "you may also like" list: the top-K most similar products per
+    product, rebuilt by electry_art.products.related.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='related_entries'
+    )
+
+    related = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='recommended_for'
+    )
+
+    position = models.PositiveSmallIntegerField()
+
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['product', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'position'], name='related_product_position_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.score:.2f})"
+
+
+class RelatedRefreshQueue(models.Model):
+    """
+    Products whose related lists have to be refreshed (created / similarity
+    fields edited / a listed product deleted); drained by
+    `rebuild_related_products --queued`, off the saving request.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['queued_at']
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.queued_at}"
+
+
+class RankingRefresh(models.Model):
+    """
+    One row per `refresh_rankings` run; `events_until` is the watermark the
+    next incremental run continues from.
+    """
+    started_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    events_until = models.DateTimeField()
+
+    full = models.BooleanField(
+        default=False
+    )
+
+    products_updated = models.PositiveIntegerField(
+        default=0
+    )
+
+    class Meta:
+        ordering = ['-events_until']
+        get_latest_by = 'events_until'
+
+    def __str__(self):
+        return f"{'full' if self.full else 'incremental'} ranking refresh up to {self.events_until}"
+
+
+class RankingEvent(models.Model):
+    """
+    A like or a paid order line already added to the ranking scores, so a
+    refresh can re-read its overlap window without counting it twice. Only
+    the window is kept; older rows are pruned by every refresh.
+    """
+    KIND_LIKE = 'like'
+    KIND_SALE = 'sale'
+    KIND_CHOICES = [(KIND_LIKE, 'Like'), (KIND_SALE, 'Sale')]
+
+    kind = models.CharField(
+        max_length=4,
+        choices=KIND_CHOICES
+    )
+
+    # Like.pk / OrderItem.pk
+    source_id = models.BigIntegerField()
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    weight = models.FloatField()
+
+    happened_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'source_id'], name='ranking_event_source_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.source_id} -> {self.product_id}"
+
+
+class RankingRemoval(models.Model):
+    """
+    A like removed / a paid order line deleted or refunded, logged when it
+    happens; the next `refresh_rankings` subtracts it (if it had been
+    counted) and deletes the row, so it never scans the whole history.
+    """
+    kind = models.CharField(
+        max_length=4,
+        choices=RankingEvent.KIND_CHOICES
+    )
+
+    source_id = models.BigIntegerField()
+
+    # no constraint: logged while the product itself may be being deleted
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+
+    weight = models.FloatField()
+
+    happened_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"-{self.kind} #{self.source_id} -> {self.product_id}"
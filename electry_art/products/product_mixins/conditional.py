@@ -0,0 +1,75 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
+
+from electry_art.cart.context_processors import cart_badge
+from electry_art.products.likes import user_likes_version
+
+
+class ConditionalGetMixin:
+    """
+    ETag support for GET: a validator is computed from a few cheap queries
+    *before* rendering; a matching If-None-Match answers 304 and the template
+    is never rendered.
+
+    Subclasses return the page-specific parts from `get_validator_parts()`
+    (e.g. updated_on, stock). The language, the user, their liked state, the
+    cart badge and the CSRF cookie are always part of the ETag, since every
+    page renders them. No Last-Modified: stock and like writes do not move
+    any date, so If-Modified-Since alone would revalidate stale pages.
+    """
+    anonymous_max_age = getattr(settings, 'PRODUCT_PAGES_MAX_AGE', 60)
+
+    def get_validator_parts(self):
+        return []
+
+    def get_visitor_parts(self):
+        user = self.request.user
+        parts = [
+            get_language(),
+            cart_badge(self.request)['cart_count'],
+            # forms on the page embed a token derived from it
+            self.request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+        if user.is_authenticated:
+            parts += [user.pk, user_likes_version(user)]
+        return parts
+
+    def get_etag(self):
+        """
+        None skips conditional handling.
+        """
+        if self.request.user.is_authenticated and not settings.SHARED_CACHE:
+            # the liked-state version lives in the cache: per process without Redis
+            return None
+        parts = self.get_validator_parts()
+        if parts is None:
+            return None
+
+        raw = "|".join(str(part) for part in [self.request.get_full_path(), *self.get_visitor_parts(), *parts])
+        return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+
+        response = None
+        if etag:
+            response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if etag and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            self.patch_cache_headers(response)
+        return response
+
+    def patch_cache_headers(self, response):
+        patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+        if self.request.user.is_authenticated:
+            # personal page: keep it out of shared caches, but always revalidate (cheap 304)
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, max_age=self.anonymous_max_age, must_revalidate=True)
@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+from electry_art.products.product_mixins.sorting_filtering import get_ordering, get_sort_key
+
+NEXT = "n"
+PREV = "p"
+
+
+def encode_cursor(sort, values, direction):
+    payload = json.dumps({"s": sort, "v": values, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Returns (sort, values, direction) or None for a missing / tampered token.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort, values, direction = data["s"], data["v"], data["d"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+
+    if direction not in (NEXT, PREV) or not isinstance(values, list):
+        return None
+    return sort, values, direction
+
+
+def _parse_ordering(ordering):
+    """("-price", "-pk") -> [("price", True), ("pk", True)]"""
+    return [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+
+
+def _seek_filter(columns, values, forward=True):
+    """
+    Row-value comparison spelled out as OR-ed prefixes, so mixed ASC/DESC
+    orderings work:  (a > x) OR (a = x AND b < y) ...
+    """
+    condition = Q()
+    for i, (name, descending) in enumerate(columns):
+        after_desc = descending if forward else not descending
+        lookup = "lt" if after_desc else "gt"
+
+        term = Q(**{f"{name}__{lookup}": values[i]})
+        for j in range(i):
+            term &= Q(**{columns[j][0]: values[j]})
+        condition |= term
+    return condition
+
+
+def approximate_count(queryset):
+    """
+    Planner row estimate for `queryset` (EXPLAIN, no table scan).
+    Good enough for "~N products"; never use it for anything exact.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor, approximate_count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_count = approximate_count
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _row_values(row, columns):
+    values = []
+    for name, _ in columns:
+        # model instances (ListViews) or .values() dicts (JSON API)
+        value = row[name] if isinstance(row, dict) else getattr(row, name)
+        values.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+    return values
+
+
+def _python_values(queryset, columns, raw_values):
+    meta = queryset.model._meta
+    values = []
+    for (name, _), raw in zip(columns, raw_values):
+        field = meta.pk if name == "pk" else meta.get_field(name)
+        values.append(field.to_python(raw))
+    return values
+
+
+def paginate_keyset(queryset, sort, token, page_size, with_approximate_count=False):
+    """
+    One page of `queryset` (already ordered by get_ordering(sort)) after /
+    before the position encoded in `token`. A missing, foreign or tampered
+    token gives the first page.
+    """
+    columns = _parse_ordering(get_ordering(sort))
+
+    cursor = decode_cursor(token)
+    if cursor and (cursor[0] != sort or len(cursor[1]) != len(columns)):
+        cursor = None
+
+    total = approximate_count(queryset) if with_approximate_count else None
+
+    direction = cursor[2] if cursor else NEXT
+    page_qs = queryset
+    if cursor:
+        try:
+            values = _python_values(queryset, columns, cursor[1])
+        except (ValidationError, TypeError, ValueError):
+            # tampered token -> first page
+            values, direction, cursor = None, NEXT, None
+        if values is not None:
+            page_qs = page_qs.filter(_seek_filter(columns, values, forward=direction == NEXT))
+
+    if direction == PREV:
+        page_qs = page_qs.order_by(*[(name if desc else f"-{name}") for name, desc in columns])
+
+    rows = list(page_qs[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if direction == PREV:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(sort, _row_values(rows[-1], columns), NEXT)
+    if rows and has_previous:
+        previous_cursor = encode_cursor(sort, _row_values(rows[0], columns), PREV)
+
+    return KeysetPage(rows, next_cursor, previous_cursor, approximate_count=total)
+
+
+class KeysetPaginationMixin:
+    """
+    Cursor (seek) pagination for ListViews ordered by `apply_sort`.
+
+    Pages are addressed with an opaque `?cursor=` token instead of `?page=N`,
+    so page 50 costs the same index range scan as page 1 and no COUNT(*) runs.
+    A plain `?page=N` request (old links) still goes through the default
+    OFFSET paginator.
+    """
+    cursor_kwarg = "cursor"
+    keyset_approximate_count = False
+
+    def get_sort_value(self):
+        return get_sort_key(self.request.GET.get("sort"))
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET and self.cursor_kwarg not in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        page = paginate_keyset(
+            queryset,
+            self.get_sort_value(),
+            self.request.GET.get(self.cursor_kwarg),
+            page_size,
+            with_approximate_count=self.keyset_approximate_count,
+        )
+        return None, page, page.object_list, page.has_other_pages()
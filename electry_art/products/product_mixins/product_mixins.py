@@ -1,7 +1,7 @@
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import Http404
 
-from electry_art.products.models import Like
+from electry_art.products.likes import liked_product_ids
 
 
 class SuperuserRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
@@ -38,17 +38,13 @@ class PropsContextMixin:
 
 class LikedIdsContextMixin:
     """
-    Adds `liked_ids` (set of product IDs liked by the current user) to the context.
+    Adds `liked_ids` (which of the products on the current page the user likes)
+    to the context. One IN query bounded by the page size, see products/likes.py.
     """
-    def get_liked_ids(self):
-        user = self.request.user
-        if user.is_authenticated:
-            return set(
-                Like.objects.filter(user=user).values_list('product_id', flat=True)
-            )
-        return set()
+    def get_liked_ids(self, products):
+        return liked_product_ids(self.request.user, [product.pk for product in products])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["liked_ids"] = self.get_liked_ids()
-        return context
\ No newline at end of file
+        context["liked_ids"] = self.get_liked_ids(context.get("object_list") or [])
+        return context
@@ -1,5 +1,7 @@
 from decimal import Decimal, InvalidOperation
-from django.db.models import Q
+
+from electry_art.products.search import search_products
+from electry_art.products.taxonomy import get_taxonomy
 
 
 def _to_decimal(value: str):
@@ -15,59 +17,90 @@ def _to_decimal(value: str):
         return None
 
 
-def apply_filters(qs, params, locked_type_slug=None):
-    q = (params.get("q") or "").strip()
-    type_slug = (params.get("type") or "").strip()
+def parse_filters(params):
+    """
+    Normalized filter values from a querystring (QueryDict or plain dict).
+    Shared by apply_filters and the facet counts (products/facets.py).
+    """
     material = (params.get("material") or "").strip()
     color = (params.get("color") or "").strip()
     min_price = _to_decimal(params.get("min_price"))
     max_price = _to_decimal(params.get("max_price"))
-    available = (params.get("available") or "").strip()
 
+    if min_price is not None and max_price is not None:
+        if min_price > max_price:
+            min_price, max_price = max_price, min_price
 
-    if locked_type_slug:
-        qs = qs.filter(type__slug=locked_type_slug)
-    elif type_slug:
-        qs = qs.filter(type__slug=type_slug)
+    return {
+        "q": (params.get("q") or "").strip(),
+        "type": (params.get("type") or "").strip(),
+        "material": int(material) if material.isdigit() else None,
+        "color": int(color) if color.isdigit() else None,
+        "min_price": min_price,
+        "max_price": max_price,
+        "available": (params.get("available") or "").strip() == "1",
+    }
 
-    # search
-    if q:
-        qs = qs.filter(
-            Q(name__icontains=q) |
-            Q(description__icontains=q) |
-            Q(serial_number__icontains=q)
-        )
 
-    if material.isdigit():
-        qs = qs.filter(material_id=int(material))
+def apply_filters(qs, params, locked_type_slug=None):
+    filters = parse_filters(params)
 
-    if color.isdigit():
-        qs = qs.filter(color_id=int(color))
+    type_slug = locked_type_slug or filters["type"]
+    if type_slug:
+        # slug -> id from the cached taxonomy, so the (type, ...) indexes apply without a join
+        product_type = get_taxonomy().type_by_slug.get(type_slug)
+        if product_type is not None:
+            qs = qs.filter(type_id=product_type.pk)
+        else:
+            qs = qs.filter(type__slug=type_slug)
 
-    if min_price is not None and max_price is not None:
-        if min_price > max_price:
-            min_price, max_price = max_price, min_price
+    # search (full-text index, see products/search.py)
+    if filters["q"]:
+        qs = search_products(qs, filters["q"])
 
-    if min_price is not None:
-        qs = qs.filter(price__gte=min_price)
+    if filters["material"] is not None:
+        qs = qs.filter(material_id=filters["material"])
 
-    if max_price is not None:
-        qs = qs.filter(price__lte=max_price)
+    if filters["color"] is not None:
+        qs = qs.filter(color_id=filters["color"])
 
-    if available == "1":
+    if filters["min_price"] is not None:
+        qs = qs.filter(price__gte=filters["min_price"])
+
+    if filters["max_price"] is not None:
+        qs = qs.filter(price__lte=filters["max_price"])
+
+    if filters["available"]:
         qs = qs.filter(is_available=True, quantity__gt=0)
 
     return qs
 
 
-def apply_sort(qs, sort):
-    sort = (sort or "new").strip()
+SORT_MAP = {
+    "new": ("-date_created", "-pk"),
+    "old": ("pk",),
+    "price_asc": ("price", "-pk"),
+    # the tie-breaker runs against the price: a backward scan of the (price, -id) indexes
+    "price_desc": ("-price", "pk"),
+    # materialized by products/ranking.py (refresh_rankings)
+    "popular": ("-popularity_score", "-pk"),
+    "trending": ("-trending_score", "-pk"),
+}
+DEFAULT_SORT = "new"
 
-    sort_map = {
-        "new": ("-date_created",),
-        "old": ("pk",),
-        "price_asc": ("price", "-pk"),
-        "price_desc": ("-price", "-pk"),
-    }
-    ordering = sort_map.get(sort, sort_map["new"])
-    return qs.order_by(*ordering)
+
+def get_sort_key(sort):
+    sort = (sort or DEFAULT_SORT).strip()
+    return sort if sort in SORT_MAP else DEFAULT_SORT
+
+
+def get_ordering(sort):
+    """
+    Ordering tuple for a `sort` querystring value. Every ordering ends on a unique
+    column (pk), which keyset pagination relies on.
+    """
+    return SORT_MAP[get_sort_key(sort)]
+
+
+def apply_sort(qs, sort):
+    return qs.order_by(*get_ordering(sort))
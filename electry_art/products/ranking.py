@@ -0,0 +1,212 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.utils import timezone
+
+from electry_art.products.cache import bump_catalog_version
+from electry_art.products.models import Like, Product, RankingEvent, RankingRefresh, RankingRemoval
+
+# Every like and every sold unit (paid orders) adds weight to the product's
+# scores; the weight halves every *_HALF_LIFE. Because exponential decay is
+# multiplicative, a refresh only has to decay the stored scores by the time
+# since the previous run, add the new events and subtract the removed ones.
+# RankingEvent holds the events of the re-read window (no double counting),
+# RankingRemoval the removals logged since the previous run; neither grows
+# with the history.
+LIKE_WEIGHT = 1.0
+SALE_WEIGHT = 3.0  # per unit sold
+
+POPULARITY_HALF_LIFE = 60 * 60 * 24 * 90  # seconds
+TRENDING_HALF_LIFE = 60 * 60 * 24 * 7
+
+# Incremental runs re-read this much before the watermark: an event stamped
+# before the previous run but committed after its snapshot is picked up late
+# instead of never (already counted events are skipped by RankingEvent).
+EVENT_OVERLAP = timedelta(minutes=10)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# decayed below this -> stored as 0, so idle products drop out of the decay UPDATE
+SCORE_FLOOR = 1e-4
+
+
+def decay_factor(seconds, half_life):
+    return 0.5 ** (max(seconds, 0) / half_life)
+
+
+def _tables():
+    order_item = apps.get_model('orders', 'OrderItem')
+    order = apps.get_model('orders', 'Order')
+    return {
+        'product': Product._meta.db_table,
+        'like': Like._meta.db_table,
+        'item': order_item._meta.db_table,
+        'order': order._meta.db_table,
+        'event': RankingEvent._meta.db_table,
+        'removal': RankingRemoval._meta.db_table,
+    }
+
+
+def _apply_sql(tables, changed, sign):
+    """
+    UPDATE adding (sign '+') / subtracting (sign '-') the decayed weights of the
+    event rows the `changed` CTE returns (product_id, weight, happened_at).
+    """
+    return f"""
+        WITH {changed},
+        totals AS (
+            SELECT product_id,
+                   sum(weight * power(0.5, extract(epoch FROM (%(until)s - happened_at)) / %(popularity_half_life)s)) AS popularity,
+                   sum(weight * power(0.5, extract(epoch FROM (%(until)s - happened_at)) / %(trending_half_life)s)) AS trending
+            FROM changed
+            GROUP BY product_id
+        )
+        UPDATE {tables['product']} AS p SET
+            popularity_score = GREATEST(p.popularity_score {sign} totals.popularity, 0),
+            trending_score = GREATEST(p.trending_score {sign} totals.trending, 0)
+        FROM totals
+        WHERE p.id = totals.product_id
+    """
+
+
+def _added_sql(tables):
+    """
+    Events in (since, until] not in RankingEvent yet: recorded and returned.
+    """
+    return f"""
+        changed AS (
+            INSERT INTO {tables['event']} (kind, source_id, product_id, weight, happened_at)
+            SELECT '{RankingEvent.KIND_LIKE}', id, product_id, %(like_weight)s, created_at
+            FROM {tables['like']}
+            WHERE created_at > %(since)s AND created_at <= %(until)s
+            UNION ALL
+            SELECT '{RankingEvent.KIND_SALE}', item.id, item.product_id, item.quantity * %(sale_weight)s, o.paid_at
+            FROM {tables['item']} AS item
+            JOIN {tables['order']} AS o ON o.id = item.order_id
+            WHERE o.is_paid AND item.product_id IS NOT NULL
+              AND o.paid_at > %(since)s AND o.paid_at <= %(until)s
+            ON CONFLICT (kind, source_id) DO NOTHING
+            RETURNING product_id, weight, happened_at
+        )
+    """
+
+
+def _removed_sql(tables):
+    """
+    Logged removals, consumed; returned when they had been counted: already
+    pruned from RankingEvent (older than the window) or still in it.
+    """
+    return f"""
+        removed AS (
+            DELETE FROM {tables['removal']}
+            RETURNING kind, source_id, product_id, weight, happened_at
+        ),
+        forgotten AS (
+            DELETE FROM {tables['event']} AS e
+            USING removed AS r
+            WHERE e.kind = r.kind AND e.source_id = r.source_id
+            RETURNING e.kind, e.source_id
+        ),
+        changed AS (
+            SELECT r.product_id, r.weight, r.happened_at
+            FROM removed AS r
+            WHERE r.happened_at <= %(window_start)s
+               OR EXISTS (SELECT 1 FROM forgotten AS f WHERE f.kind = r.kind AND f.source_id = r.source_id)
+        )
+    """
+
+
+def record_removals(kind, rows):
+    """
+    Logs removed events, [(source_id, product_id, weight, happened_at), ...],
+    for the next refresh. For deletes that bypass the Like / OrderItem
+    signals, toggle_like / set_likes log theirs in their own statement.
+    """
+    RankingRemoval.objects.bulk_create(
+        RankingRemoval(kind=kind, source_id=source_id, product_id=product_id, weight=weight, happened_at=happened_at)
+        for source_id, product_id, weight, happened_at in rows
+        if happened_at is not None
+    )
+
+
+def record_unpaid_order(order, paid_at):
+    """
+    A paid order (paid at `paid_at`) was refunded / marked unpaid: its lines
+    leave the scores.
+    """
+    order_item = apps.get_model('orders', 'OrderItem')
+    record_removals(RankingEvent.KIND_SALE, [
+        (pk, product_id, quantity * SALE_WEIGHT, paid_at)
+        for pk, product_id, quantity in (
+            order_item.objects.filter(order=order, product__isnull=False).values_list('pk', 'product_id', 'quantity')
+        )
+    ])
+
+
+def refresh_rankings(full=False, now=None):
+    """
+    Brings Product.popularity_score / trending_score up to `now`.
+    Incremental unless `full` (or there is no previous run): one UPDATE
+    decaying the non-zero scores, one subtracting the logged removals and
+    one adding the new events. Returns the RankingRefresh row.
+    """
+    now = now or timezone.now()
+    tables = _tables()
+    params = {
+        'until': now,
+        'like_weight': LIKE_WEIGHT,
+        'sale_weight': SALE_WEIGHT,
+        'popularity_half_life': POPULARITY_HALF_LIFE,
+        'trending_half_life': TRENDING_HALF_LIFE,
+    }
+
+    with transaction.atomic():
+        # one refresh at a time; a second runner waits and then continues from its watermark
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {RankingRefresh._meta.db_table} IN EXCLUSIVE MODE")
+
+        previous = None if full else RankingRefresh.objects.order_by('-events_until').first()
+        if previous is not None and previous.events_until >= now:
+            return previous
+
+        updated = 0
+        with connection.cursor() as cursor:
+            if previous is None:
+                full = True
+                since = EPOCH
+                cursor.execute(f"UPDATE {tables['product']} SET popularity_score = 0, trending_score = 0 "
+                               f"WHERE popularity_score <> 0 OR trending_score <> 0")
+                cursor.execute(f"DELETE FROM {tables['event']}")
+                cursor.execute(f"DELETE FROM {tables['removal']}")
+            else:
+                since = previous.events_until - EVENT_OVERLAP
+                elapsed = (now - previous.events_until).total_seconds()
+                cursor.execute(
+                    f"""
+                    UPDATE {tables['product']} SET
+                        popularity_score = CASE WHEN popularity_score * %(popularity)s < %(floor)s
+                                                THEN 0 ELSE popularity_score * %(popularity)s END,
+                        trending_score = CASE WHEN trending_score * %(trending)s < %(floor)s
+                                              THEN 0 ELSE trending_score * %(trending)s END
+                    WHERE popularity_score <> 0 OR trending_score <> 0
+                    """,
+                    {
+                        'popularity': decay_factor(elapsed, POPULARITY_HALF_LIFE),
+                        'trending': decay_factor(elapsed, TRENDING_HALF_LIFE),
+                        'floor': SCORE_FLOOR,
+                    },
+                )
+                cursor.execute(_apply_sql(tables, _removed_sql(tables), '-'), {**params, 'window_start': since})
+                updated += cursor.rowcount
+
+            cursor.execute(_apply_sql(tables, _added_sql(tables), '+'), {**params, 'since': since})
+            updated += cursor.rowcount
+
+            # the next run re-reads from now - EVENT_OVERLAP; older events are never re-read
+            cursor.execute(f"DELETE FROM {tables['event']} WHERE happened_at <= %s", [now - EVENT_OVERLAP])
+
+        run = RankingRefresh.objects.create(events_until=now, full=full, products_updated=updated)
+
+    bump_catalog_version()
+    return run
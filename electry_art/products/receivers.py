@@ -0,0 +1,159 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from electry_art.cart.signals import checkout_completed
+from electry_art.products.cache import bump_catalog_version, invalidate_product_cards, touch_product
+from electry_art.products.images import delete_derivatives, schedule_derivatives
+from electry_art.products.likes import bump_user_likes_version
+from electry_art.products.models import (
+    Like, Product, ProductPhoto, ProductType, ProductMaterial, ProductColor, RankingEvent,
+)
+from electry_art.products.ranking import LIKE_WEIGHT, SALE_WEIGHT, record_removals
+from electry_art.products.related import SIMILARITY_FIELDS, queue_refresh, refresh_for_order
+from electry_art.products.sitemaps import invalidate_pages, invalidate_product
+from electry_art.products.taxonomy import invalidate_taxonomy
+
+
+@receiver(post_delete, sender=Product)
+def drop_product_cards_on_delete(sender, instance=None, **kwargs):
+    invalidate_product_cards(instance)
+
+
+@receiver(post_save, sender=ProductPhoto)
+@receiver(post_delete, sender=ProductPhoto)
+def touch_product_on_photo_change(sender, instance=None, **kwargs):
+    """
+    Photos are part of what a product page shows -> new card / page version.
+    """
+    if instance is not None and instance.product_id:
+        touch_product(instance.product_id)
+
+
+@receiver(post_save, sender=ProductType)
+@receiver(post_delete, sender=ProductType)
+@receiver(post_save, sender=ProductMaterial)
+@receiver(post_delete, sender=ProductMaterial)
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def invalidate_taxonomy_on_change(sender, **kwargs):
+    # after commit: a reader between the bump and the commit would cache the old rows under the new version
+    transaction.on_commit(invalidate_taxonomy)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductPhoto)
+def generate_image_derivatives(sender, instance=None, update_fields=None, **kwargs):
+    """
+    Thumbnails + WebP for a (re)uploaded image, in the worker pool after commit.
+    Existing derivatives are skipped before anything is decoded, so unrelated
+    saves cost an image header read and a few stat() calls in the worker.
+    """
+    if update_fields is not None and 'product_image' not in update_fields:
+        return
+    name = instance.product_image.name if instance.product_image else None
+    if name:
+        product_id = instance.pk if sender is Product else instance.product_id
+        transaction.on_commit(lambda: schedule_derivatives(name, product_id=product_id))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductPhoto)
+def delete_image_derivatives(sender, instance=None, **kwargs):
+    name = instance.product_image.name if instance.product_image else None
+    if name:
+        transaction.on_commit(lambda: delete_derivatives(name))
+
+
+@receiver(post_save, sender=Product)
+def refresh_related_on_product_change(sender, instance=None, created=False, update_fields=None, **kwargs):
+    """
+    Queued in the saving transaction (one INSERT); the scoring runs in
+    `rebuild_related_products --queued`, not in the request.
+    """
+    if not created and update_fields is not None and not SIMILARITY_FIELDS.intersection(update_fields):
+        return
+    queue_refresh([instance.pk])
+
+
+@receiver(pre_delete, sender=Product)
+def refresh_related_on_product_delete(sender, instance=None, **kwargs):
+    # the rows pointing at the product are cascaded away -> refill those lists
+    referrers = list(instance.recommended_for.values_list('product_id', flat=True))
+    if referrers:
+        queue_refresh(referrers)
+
+
+@receiver(checkout_completed)
+def refresh_related_on_checkout(sender, order=None, **kwargs):
+    """
+    A paid order adds co-purchase pairs between its products; only those
+    pairs are rescored.
+    """
+    if order is None:
+        return
+    product_ids = [pk for pk in order.items.values_list('product_id', flat=True) if pk]
+    if len(product_ids) > 1:
+        refresh_for_order(product_ids)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def drop_sitemap_chunk(sender, instance=None, update_fields=None, **kwargs):
+    # slug and updated_on are all a sitemap entry shows
+    if update_fields is not None and not {'slug', 'updated_on'}.intersection(update_fields):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_product(pk))
+
+
+@receiver(post_save, sender=ProductType)
+@receiver(post_delete, sender=ProductType)
+def drop_sitemap_pages(sender, **kwargs):
+    transaction.on_commit(invalidate_pages)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_catalog_version_on_change(sender, **kwargs):
+    # JSON API responses are keyed on it (products/api.py)
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def bump_likes_version_on_change(sender, instance=None, **kwargs):
+    """
+    Likes written through the ORM (admin, cascades when a product or user is
+    deleted); toggle_like / set_likes bump the version themselves.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_user_likes_version(user_id))
+
+
+@receiver(post_delete, sender=Like)
+def record_like_removal(sender, instance=None, **kwargs):
+    # ORM deletes (admin, cascades); the next refresh_rankings subtracts it
+    record_removals(RankingEvent.KIND_LIKE, [
+        (instance.pk, instance.product_id, LIKE_WEIGHT, instance.created_at),
+    ])
+
+
+@receiver(post_delete, sender='orders.OrderItem')
+def record_sale_removal(sender, instance=None, **kwargs):
+    """
+    A line of a paid order deleted (with its order or alone): its units
+    leave the scores. Sent before the cascaded order row itself is deleted.
+    """
+    if not instance.product_id:
+        return
+    paid_at = (
+        apps.get_model('orders', 'Order').objects
+        .filter(pk=instance.order_id, is_paid=True)
+        .values_list('paid_at', flat=True)
+        .first()
+    )
+    record_removals(RankingEvent.KIND_SALE, [
+        (instance.pk, instance.product_id, instance.quantity * SALE_WEIGHT, paid_at),
+    ])
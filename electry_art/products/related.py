@@ -0,0 +1,281 @@
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Abs, Cast, Coalesce, Greatest, Least
+from django.utils import timezone
+
+from electry_art.products.models import Product, RelatedProduct, RelatedRefreshQueue
+
+# Top-K similar products stored per product (RelatedProduct rows).
+RELATED_PRODUCTS_LIMIT = 6
+
+# Similarity weights; the maximum score is their sum.
+TYPE_WEIGHT = 4.0
+MATERIAL_WEIGHT = 2.0
+COLOR_WEIGHT = 1.0
+PRICE_WEIGHT = 2.0
+CO_PURCHASE_WEIGHT = 5.0
+# orders bought together at which the co-purchase signal saturates
+CO_PURCHASE_CAP = 5
+
+# Product fields the score depends on; saves touching none of them
+# (e.g. the webhook's stock decrement) do not trigger a refresh.
+SIMILARITY_FIELDS = frozenset({'type', 'type_id', 'material', 'material_id', 'color', 'color_id', 'price'})
+# what scoring a product (and ordering ties) reads
+SCORED_FIELDS = ('pk', 'type', 'material', 'color', 'price', 'date_created')
+
+
+def _match(field, value, weight):
+    return Case(When(**{field: value}, then=Value(weight)), default=Value(0.0), output_field=FloatField())
+
+
+def _co_purchase_subquery(product_id):
+    """
+    Paid orders containing both `product_id` and the outer product.
+    """
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    together = (
+        OrderItem.objects
+        .filter(product_id=OuterRef('pk'), order__is_paid=True, order__items__product_id=product_id)
+        .order_by()
+        .values('product_id')
+        .annotate(orders=Count('order_id', distinct=True))
+        .values('orders')[:1]
+    )
+    return Coalesce(Subquery(together, output_field=IntegerField()), 0)
+
+
+def score_candidates(product):
+    """
+    Every other product annotated with `similarity`, best first.
+    One query: the weights are CASE expressions, co-purchase a correlated subquery.
+    """
+    price = float(product.price) or 1.0
+
+    price_closeness = Greatest(
+        Value(0.0),
+        Value(1.0) - Cast(Abs(F('price') - product.price), FloatField()) / Value(price),
+    )
+    co_purchase = Cast(Least(_co_purchase_subquery(product.pk), Value(CO_PURCHASE_CAP)), FloatField())
+
+    return (
+        Product.objects
+        .exclude(pk=product.pk)
+        .annotate(
+            similarity=(
+                _match('type_id', product.type_id, TYPE_WEIGHT)
+                + _match('material_id', product.material_id, MATERIAL_WEIGHT)
+                + _match('color_id', product.color_id, COLOR_WEIGHT)
+                + price_closeness * Value(PRICE_WEIGHT)
+                + co_purchase * Value(CO_PURCHASE_WEIGHT / CO_PURCHASE_CAP)
+            )
+        )
+        .order_by('-similarity', '-date_created', '-pk')
+    )
+
+
+def refresh_related(product_ids, limit=RELATED_PRODUCTS_LIMIT):
+    """
+    Recomputes the stored top-K list of each product in `product_ids`.
+    Returns how many products were refreshed.
+    """
+    products = Product.objects.filter(pk__in=set(product_ids)).only('pk', 'type', 'material', 'color', 'price')
+    refreshed = 0
+
+    for product in products:
+        top = score_candidates(product).values_list('pk', 'similarity')[:limit]
+        rows = [
+            RelatedProduct(product=product, related_id=related_id, position=position, score=score)
+            for position, (related_id, score) in enumerate(top)
+        ]
+        with transaction.atomic():
+            # row lock: concurrent refreshes of one product run one after the other
+            Product.objects.select_for_update().filter(pk=product.pk).values_list('pk').first()
+            RelatedProduct.objects.filter(product=product).delete()
+            RelatedProduct.objects.bulk_create(rows)
+        refreshed += 1
+
+    return refreshed
+
+
+def _tables():
+    order_item = apps.get_model('orders', 'OrderItem')
+    order = apps.get_model('orders', 'Order')
+    return {
+        'product': Product._meta.db_table,
+        'related': RelatedProduct._meta.db_table,
+        'item': order_item._meta.db_table,
+        'order': order._meta.db_table,
+    }
+
+
+def _merge_sql(tables, owner_filter):
+    """
+    One statement: `candidate` scored against every list owner (co-purchase
+    counts grouped once, not a subquery per owner), kept only for the owners
+    it is listed by or enters (list not full, or better than its K-th
+    entry), merged with those lists and upserted by (product, position).
+    Similarity as in score_candidates, from the list owner's side: price
+    closeness is relative to the owner's price.
+    """
+    return f"""
+        WITH co_purchase AS (
+            SELECT other.product_id, count(DISTINCT other.order_id) AS orders
+            FROM {tables['item']} AS mine
+            JOIN {tables['order']} AS o ON o.id = mine.order_id AND o.is_paid
+            JOIN {tables['item']} AS other ON other.order_id = mine.order_id
+            WHERE mine.product_id = %(candidate)s AND other.product_id <> %(candidate)s
+            GROUP BY other.product_id
+        ),
+        lists AS (
+            SELECT product_id,
+                   count(*) FILTER (WHERE related_id <> %(candidate)s) AS entries,
+                   min(score) FILTER (WHERE related_id <> %(candidate)s) AS worst,
+                   bool_or(related_id = %(candidate)s) AS listed
+            FROM {tables['related']}
+            GROUP BY product_id
+        ),
+        scored AS (
+            SELECT p.id AS owner_id, l.entries, l.worst, l.listed,
+                   CASE WHEN p.type_id IS NOT DISTINCT FROM %(type)s THEN %(type_weight)s ELSE 0 END
+                   + CASE WHEN p.material_id IS NOT DISTINCT FROM %(material)s THEN %(material_weight)s ELSE 0 END
+                   + CASE WHEN p.color_id IS NOT DISTINCT FROM %(color)s THEN %(color_weight)s ELSE 0 END
+                   + GREATEST(0.0, 1.0 - abs(p.price - %(price)s)::double precision
+                              / CASE WHEN p.price > 0 THEN p.price::double precision ELSE 1.0 END) * %(price_weight)s
+                   + LEAST(COALESCE(co.orders, 0), %(co_purchase_cap)s)::double precision * %(co_purchase_unit)s
+                   AS score
+            FROM {tables['product']} AS p
+            LEFT JOIN co_purchase AS co ON co.product_id = p.id
+            LEFT JOIN lists AS l ON l.product_id = p.id
+            WHERE p.id <> %(candidate)s {owner_filter}
+        ),
+        owners AS (
+            SELECT owner_id, score FROM scored
+            WHERE listed OR COALESCE(entries, 0) < %(limit)s OR score > worst
+        ),
+        merged AS (
+            SELECT r.product_id, r.related_id, r.score
+            FROM {tables['related']} AS r
+            JOIN owners ON owners.owner_id = r.product_id
+            WHERE r.related_id <> %(candidate)s
+            UNION ALL
+            SELECT owner_id, %(candidate)s, score FROM owners
+        ),
+        ranked AS (
+            SELECT m.product_id, m.related_id, m.score,
+                   row_number() OVER (
+                       PARTITION BY m.product_id ORDER BY m.score DESC, p.date_created DESC, m.related_id DESC
+                   ) - 1 AS position
+            FROM merged AS m
+            JOIN {tables['product']} AS p ON p.id = m.related_id
+        ),
+        written AS (
+            INSERT INTO {tables['related']} AS r (product_id, related_id, position, score)
+            SELECT product_id, related_id, position, score FROM ranked WHERE position < %(limit)s
+            ON CONFLICT (product_id, position) DO UPDATE
+                SET related_id = EXCLUDED.related_id, score = EXCLUDED.score
+                WHERE (r.related_id, r.score) IS DISTINCT FROM (EXCLUDED.related_id, EXCLUDED.score)
+            RETURNING product_id
+        )
+        SELECT count(DISTINCT product_id) FROM written
+    """
+
+
+def merge_into_lists(candidate, owner_ids=None, limit=RELATED_PRODUCTS_LIMIT):
+    """
+    Incremental update after `candidate` was added / edited: written only into
+    the lists (of every product, or just `owner_ids`) it enters or is already
+    in, with one set-based statement. Other entries keep their stored scores;
+    an edited product that became less similar keeps its slot at its new
+    score until the next full rebuild_related_products run.
+    Returns how many lists changed.
+    """
+    tables = _tables()
+    owner_filter = 'AND p.id = ANY(%(owners)s)' if owner_ids is not None else ''
+    params = {
+        'candidate': candidate.pk,
+        'type': candidate.type_id,
+        'material': candidate.material_id,
+        'color': candidate.color_id,
+        'price': candidate.price,
+        'type_weight': TYPE_WEIGHT,
+        'material_weight': MATERIAL_WEIGHT,
+        'color_weight': COLOR_WEIGHT,
+        'price_weight': PRICE_WEIGHT,
+        'co_purchase_cap': CO_PURCHASE_CAP,
+        'co_purchase_unit': CO_PURCHASE_WEIGHT / CO_PURCHASE_CAP,
+        'owners': list(owner_ids or ()),
+        'limit': limit,
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        # one merge at a time (the upsert reads the lists it rewrites); readers are not blocked
+        cursor.execute(f"LOCK TABLE {tables['related']} IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(_merge_sql(tables, owner_filter), params)
+        return cursor.fetchone()[0]
+
+
+def refresh_for_product(product_id):
+    """
+    A product was created or its similarity fields changed: its own list is
+    rescored (one catalog query) and it is patched into the other lists (one
+    more), instead of rescoring its whole category.
+    """
+    product = Product.objects.filter(pk=product_id).only(*SCORED_FIELDS).first()
+    if product is None:
+        return
+    refresh_related([product.pk])
+    merge_into_lists(product)
+
+
+def refresh_for_order(product_ids):
+    """
+    A paid order only changes the co-purchase term between its own products:
+    each is rescored against the others (a few rows) and merged into their lists.
+    """
+    product_ids = set(product_ids)
+    for product in Product.objects.filter(pk__in=product_ids).only(*SCORED_FIELDS):
+        merge_into_lists(product, owner_ids=product_ids - {product.pk})
+
+
+def queue_refresh(product_ids):
+    """
+    Marks products for refresh_for_product; one INSERT, so saving a product
+    costs no scoring. Queuing again moves `queued_at`, which keeps a product
+    edited while the queue is drained from being dropped.
+    """
+    now = timezone.now()
+    RelatedRefreshQueue.objects.bulk_create(
+        [RelatedRefreshQueue(product_id=pk, queued_at=now) for pk in set(product_ids)],
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['queued_at'],
+    )
+
+
+def process_queue(batch_size=100):
+    """
+    Runs refresh_for_product for every queued product, oldest first.
+    Returns how many were refreshed.
+    """
+    refreshed = 0
+    while True:
+        batch = list(RelatedRefreshQueue.objects.values_list('product_id', 'queued_at')[:batch_size])
+        if not batch:
+            return refreshed
+        for product_id, queued_at in batch:
+            refresh_for_product(product_id)
+            # re-queued meanwhile -> stays for the next round
+            RelatedRefreshQueue.objects.filter(product_id=product_id, queued_at=queued_at).delete()
+            refreshed += 1
+
+
+def related_products(product, limit=RELATED_PRODUCTS_LIMIT):
+    """
+    Stored recommendations for the detail page: one lookup on
+    (product_id, position). Empty until the product has been refreshed.
+    """
+    return (
+        Product.objects
+        .filter(recommended_for__product=product)
+        .order_by('recommended_for__position')[:limit]
+    )
@@ -0,0 +1,139 @@
+import hashlib
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import translation
+
+from electry_art.products.models import Product, ProductType
+
+# Text search configuration per site language.
+# `bulgarian` is created by products migration 0015 (a copy of `simple`).
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'bg': 'bulgarian',
+}
+DEFAULT_SEARCH_CONFIG = 'english'
+
+
+# quotes, a leading '-' or OR: websearch syntax, searched as typed
+WEBSEARCH_SYNTAX = re.compile(r'"|(?:^|\s)-|\sor\s', re.IGNORECASE)
+
+
+def prefix_tsquery(text):
+    """
+    Plain words as a raw tsquery with the last one as a prefix:
+    'oak key' -> 'oak & key:*', so "key" finds "keychain" while it is typed.
+    Only \w runs reach the tsquery, so no operator can be injected.
+    None for websearch syntax or no words.
+    """
+    words = re.findall(r'\w+', text)
+    if not words or WEBSEARCH_SYNTAX.search(text):
+        return None
+    return ' & '.join([*words[:-1], f'{words[-1]}:*'])
+
+
+def build_search_query(text, language=None):
+    """
+    websearch-style query (quotes, OR, -exclude) parsed with the active language
+    config first, OR-ed with the other configs so a Bulgarian word typed on the
+    English site (and vice versa) still matches. Plain words also match as a
+    prefix (`prefix_tsquery`).
+    """
+    language = language or translation.get_language() or 'en'
+    primary = SEARCH_CONFIGS.get(language[:2], DEFAULT_SEARCH_CONFIG)
+    prefix = prefix_tsquery(text)
+
+    query = None
+    for config in [primary, *(config for config in SEARCH_CONFIGS.values() if config != primary)]:
+        parts = [SearchQuery(text, config=config, search_type='websearch')]
+        if prefix:
+            parts.append(SearchQuery(prefix, config=config, search_type='raw'))
+        for part in parts:
+            query = part if query is None else query | part
+    return query
+
+
+def search_products(qs, text, language=None):
+    """
+    Filters `qs` by the full-text index (GIN on `search_vector`) and annotates
+    `search_rank`. An exact serial number always matches (unique index).
+    """
+    text = (text or '').strip()
+    if not text:
+        return qs
+
+    query = build_search_query(text, language)
+    return (
+        qs
+        .filter(Q(search_vector=query) | Q(serial_number=text))
+        .annotate(search_rank=SearchRank(F('search_vector'), query))
+    )
+
+
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_CACHE_TIMEOUT = 60 * 5
+
+
+def _suggest_cache_key(language, term, limit):
+    digest = hashlib.md5(term.lower().encode('utf-8')).hexdigest()
+    return f"products:suggest:{language}:{limit}:{digest}"
+
+
+def suggest(term, language=None, limit=SUGGEST_DEFAULT_LIMIT):
+    """
+    Autocomplete data for the search box: product names, product types and
+    serial numbers matching a prefix or a misspelling of it.
+
+    Names use pg_trgm word similarity (GIN trigram indexes on name_en / name_bg),
+    serials a left-anchored LIKE (varchar_pattern_ops index).
+    Results are cached per language + term.
+    """
+    term = (term or '').strip()
+    if len(term) < SUGGEST_MIN_LENGTH:
+        return {'products': [], 'types': [], 'serials': []}
+
+    language = (language or translation.get_language() or 'en')[:2]
+    if language not in SEARCH_CONFIGS:
+        language = 'en'
+
+    cache_key = _suggest_cache_key(language, term, limit)
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    name_field = f'name_{language}'
+
+    products = (
+        Product.objects
+        .filter(**{f'{name_field}__trigram_word_similar': term})
+        .annotate(similarity=TrigramWordSimilarity(term, name_field))
+        .order_by('-similarity', '-likes_count')
+        .values_list(name_field, 'slug')[:limit]
+    )
+
+    types = (
+        ProductType.objects
+        .filter(**{f'{name_field}__trigram_word_similar': term})
+        .annotate(similarity=TrigramWordSimilarity(term, name_field))
+        .order_by('-similarity')
+        .values_list(name_field, 'slug')[:limit]
+    )
+
+    serials = (
+        Product.objects
+        .filter(Q(serial_number__startswith=term) | Q(serial_number__startswith=term.upper()))
+        .order_by('serial_number')
+        .values_list('serial_number', 'slug')[:limit]
+    )
+
+    result = {
+        'products': [{'name': name, 'slug': slug} for name, slug in products if name],
+        'types': [{'name': name, 'slug': slug} for name, slug in types if name],
+        'serials': [{'serial_number': serial, 'slug': slug} for serial, slug in serials],
+    }
+    cache.set(cache_key, result, SUGGEST_CACHE_TIMEOUT)
+    return result
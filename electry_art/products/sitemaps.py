@@ -0,0 +1,221 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Max
+from django.urls import reverse
+from django.utils import translation
+
+from electry_art.products.models import Product, ProductType
+
+# Sitemap files are built by streaming a server-side cursor straight into the
+# response and, at the same time, into a file under SITEMAP_CACHE_DIR; later
+# requests are served from disk. Products are split into fixed pk buckets of
+# SITEMAP_CHUNK_SIZE (the protocol limit is 50k URLs per file), so a product
+# change only drops the one bucket file it lives in (products/receivers.py).
+SITEMAP_CHUNK_SIZE = getattr(settings, 'SITEMAP_CHUNK_SIZE', 50000)
+SITEMAP_CACHE_DIR = Path(getattr(settings, 'SITEMAP_CACHE_DIR', settings.BASE_DIR / 'sitemap_cache'))
+# regenerate anyway after this many seconds (updated_on is also bumped by queryset updates)
+SITEMAP_CACHE_TIMEOUT = getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 60 * 60 * 6)
+ITERATOR_CHUNK_SIZE = 2000
+
+INDEX_FILENAME = 'sitemap.xml'
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = (
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+    'xmlns:xhtml="http://www.w3.org/1999/xhtml">\n'
+)
+URLSET_CLOSE = '</urlset>\n'
+
+SLUG_PLACEHOLDER = 'sitemap-slug'
+
+
+def languages():
+    return [code for code, _ in settings.LANGUAGES]
+
+
+def site_root():
+    return f"{settings.SITE_PROTOCOL}://{settings.SITE_DOMAIN}"
+
+
+def w3c_date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def _url_templates(name, kwarg):
+    """
+    {'en': 'https://host/en/products/sitemap-slug/', 'bg': ...}, reversed once per file
+    instead of once per row.
+    """
+    templates = {}
+    for language in languages():
+        with translation.override(language):
+            templates[language] = site_root() + reverse(name, kwargs={kwarg: SLUG_PLACEHOLDER})
+    return templates
+
+
+def _url_entry(language, locations, lastmod=None):
+    """
+    <url> with hreflang alternates; `locations` maps language -> absolute URL.
+    """
+    lines = [f"<url><loc>{escape(locations[language])}</loc>"]
+    if lastmod:
+        lines.append(f"<lastmod>{lastmod}</lastmod>")
+    for alternate, href in locations.items():
+        lines.append(f'<xhtml:link rel="alternate" hreflang="{alternate}" href="{escape(href)}"/>')
+    lines.append("</url>\n")
+    return "".join(lines)
+
+
+def _slug_locations(templates, slug):
+    quoted = quote(slug)
+    return {language: template.replace(SLUG_PLACEHOLDER, quoted) for language, template in templates.items()}
+
+
+def product_buckets():
+    """
+    {chunk number: last updated_on} for every non-empty pk bucket, one aggregate query.
+    """
+    rows = (
+        Product.objects
+        .filter(slug__isnull=False)
+        .annotate(bucket=F('pk') / SITEMAP_CHUNK_SIZE)
+        .values('bucket')
+        .annotate(lastmod=Max('updated_on'))
+        .order_by('bucket')
+    )
+    return {row['bucket'] + 1: row['lastmod'] for row in rows}
+
+
+def chunk_for_pk(pk):
+    return pk // SITEMAP_CHUNK_SIZE + 1
+
+
+def iter_pages(language):
+    static = {}
+    for name in ('index', 'product list'):
+        locations = {}
+        for code in languages():
+            with translation.override(code):
+                locations[code] = site_root() + reverse(name)
+        static[name] = locations
+
+    yield XML_HEADER + URLSET_OPEN
+    for locations in static.values():
+        yield _url_entry(language, locations)
+
+    templates = _url_templates('product category', 'type_slug')
+    types = ProductType.objects.filter(slug__isnull=False).order_by('pk').values_list('slug', flat=True)
+    for slug in types.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield _url_entry(language, _slug_locations(templates, slug))
+    yield URLSET_CLOSE
+
+
+def iter_products(language, chunk):
+    """
+    One bucket of product URLs, read with a server-side cursor.
+    """
+    templates = _url_templates('product details', 'slug')
+    low = (chunk - 1) * SITEMAP_CHUNK_SIZE
+    rows = (
+        Product.objects
+        .filter(slug__isnull=False, pk__gte=low, pk__lt=low + SITEMAP_CHUNK_SIZE)
+        .order_by('pk')
+        .values_list('slug', 'updated_on')
+    )
+
+    yield XML_HEADER + URLSET_OPEN
+    buffer = []
+    for slug, updated_on in rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        buffer.append(_url_entry(language, _slug_locations(templates, slug), w3c_date(updated_on)))
+        if len(buffer) >= 500:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+    yield URLSET_CLOSE
+
+
+def section_filename(section, language, chunk=1):
+    return f"sitemap-{section}-{language}-{chunk}.xml"
+
+
+def iter_index():
+    yield XML_HEADER + '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    buckets = product_buckets()
+    for language in languages():
+        files = [(section_filename('pages', language), None)]
+        files += [(section_filename('products', language, chunk), lastmod) for chunk, lastmod in buckets.items()]
+        for filename, lastmod in files:
+            entry = f"<sitemap><loc>{escape(site_root())}/{filename}</loc>"
+            if lastmod:
+                entry += f"<lastmod>{w3c_date(lastmod)}</lastmod>"
+            yield entry + "</sitemap>\n"
+    yield '</sitemapindex>\n'
+
+
+def cache_path(filename):
+    return SITEMAP_CACHE_DIR / filename
+
+
+def cached_file(filename):
+    """
+    Path of a fresh cached file, or None.
+    """
+    path = cache_path(filename)
+    try:
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    return path if age < SITEMAP_CACHE_TIMEOUT else None
+
+
+def stream_and_cache(filename, parts):
+    """
+    Yields the encoded parts and writes them to a temp file, which replaces the
+    cached file only once the generator has run to completion.
+    """
+    SITEMAP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=SITEMAP_CACHE_DIR, prefix='.tmp-', suffix='.xml')
+    completed = False
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for part in parts:
+                data = part.encode('utf-8')
+                fh.write(data)
+                yield data
+        os.replace(tmp_name, cache_path(filename))
+        completed = True
+    finally:
+        if not completed:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+
+
+def build(filename, parts):
+    for _ in stream_and_cache(filename, parts):
+        pass
+    return cache_path(filename)
+
+
+def invalidate(*filenames):
+    for filename in filenames:
+        try:
+            cache_path(filename).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def invalidate_product(pk):
+    invalidate(INDEX_FILENAME, *(section_filename('products', language, chunk_for_pk(pk)) for language in languages()))
+
+
+def invalidate_pages():
+    invalidate(*(section_filename('pages', language) for language in languages()))
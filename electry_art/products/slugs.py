@@ -0,0 +1,118 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BigIntegerField, Count, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+# Slugs are allocated as base, base-2, base-3, ... The next free suffix is
+# read in ONE aggregate query (instead of one exists() per taken candidate),
+# and a transaction-level advisory lock per (table, base) makes two concurrent
+# saves of "keychain" take turns instead of both picking keychain-7.
+
+
+def slug_base(instance, fallback):
+    """
+    Slug source for a translated model: the first non-empty name in
+    settings.LANGUAGES order (name_en, then name_bg, ...), so products that
+    only have a Bulgarian name get a Cyrillic slug instead of the fallback.
+    """
+    candidates = [getattr(instance, f'name_{code}', None) for code, _ in settings.LANGUAGES]
+    candidates.append(getattr(instance, 'name', None))
+
+    for name in candidates:
+        base = slugify(name or '', allow_unicode=True)
+        if base:
+            return base
+    return fallback
+
+
+def lock_slug_base(model, base):
+    """
+    pg_advisory_xact_lock on (table, base); released at the end of the
+    surrounding transaction. Must be called inside transaction.atomic().
+    """
+    key = zlib.crc32(f"{model._meta.db_table}:{base}".encode())
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+
+# allocated suffixes stay far below this; a longer number ("lamp-20240101123456")
+# is part of a name, not a suffix, and must never reach the integer cast
+MAX_SUFFIX_DIGITS = 9
+
+
+def _suffix_pattern(bases):
+    return r'^(' + '|'.join(re.escape(base) for base in bases) + rf')-[0-9]{{1,{MAX_SUFFIX_DIGITS}}}$'
+
+
+def next_free_slug(model, base, field='slug', exclude_pk=None):
+    """
+    `base` if it is free, otherwise base-<highest taken suffix + 1>.
+    """
+    qs = model._default_manager.all()
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+
+    prefix = f"{base}-"
+    suffixed = Q(**{f'{field}__startswith': prefix, f'{field}__regex': _suffix_pattern([base])})
+
+    taken = qs.filter(Q(**{field: base}) | suffixed).aggregate(
+        exact=Count('pk', filter=Q(**{field: base})),
+        highest=Max(Cast(Substr(field, len(prefix) + 1), BigIntegerField()), filter=suffixed),
+    )
+
+    if not taken['exact']:
+        return base
+    return f"{base}-{max(taken['highest'] or 1, 1) + 1}"
+
+
+def assign_slug(instance, fallback, field='slug'):
+    """
+    Sets a free slug on `instance`. Call inside transaction.atomic() and
+    save in the same transaction, so the advisory lock covers the INSERT.
+    """
+    model = type(instance)
+    base = slug_base(instance, fallback)
+    lock_slug_base(model, base)
+    setattr(instance, field, next_free_slug(model, base, field=field, exclude_pk=instance.pk))
+
+
+class SlugBatch:
+    """
+    In-memory allocator for bulk runs (re-slug / import): the taken slugs of
+    a whole batch of bases are fetched in one query, later picks are
+    reserved locally. Hold lock_table() for the lifetime of the batch.
+    """
+
+    def __init__(self, model, field='slug'):
+        self.model = model
+        self.field = field
+        self.taken = set()
+        self.loaded = set()
+
+    def lock_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {connection.ops.quote_name(self.model._meta.db_table)} IN SHARE ROW EXCLUSIVE MODE"
+            )
+
+    def load(self, bases):
+        bases = set(bases) - self.loaded
+        if not bases:
+            return
+        field = self.field
+        query = Q(**{f'{field}__in': bases}) | Q(**{f'{field}__regex': _suffix_pattern(sorted(bases))})
+        self.taken.update(self.model._default_manager.filter(query).values_list(field, flat=True))
+        self.loaded |= bases
+
+    def allocate(self, base):
+        self.load([base])
+        slug, i = base, 1
+        while slug in self.taken:
+            i += 1
+            slug = f"{base}-{i}"
+        self.taken.add(slug)
+        return slug
@@ -0,0 +1,91 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.utils import translation
+
+from electry_art.products.models import ProductType, ProductMaterial, ProductColor
+
+# Types / materials / colors change a few times a year but are read on every
+# catalog request. They live in a per-process copy, backed by the shared cache
+# and stamped with a version number; saving or deleting any of them
+# (products/receivers.py) bumps the version, which every process notices on
+# its next lookup.
+TAXONOMY_VERSION_KEY = 'products:taxonomy:version'
+TAXONOMY_CACHE_TIMEOUT = 60 * 60 * 24
+
+_local = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Taxonomy:
+    types: list
+    materials: list
+    colors: list
+    type_by_slug: dict = field(default_factory=dict)
+
+
+def _current_version():
+    version = cache.get(TAXONOMY_VERSION_KEY)
+    if version is None:
+        # time based seed: an evicted version key never comes back as an old number
+        cache.add(TAXONOMY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(TAXONOMY_VERSION_KEY)
+    return version
+
+
+def taxonomy_version():
+    """
+    Changes whenever a type / material / color is saved or deleted.
+    """
+    return _current_version()
+
+
+def _load(language):
+    # names are translated -> ordering depends on the active language
+    with translation.override(language):
+        types = list(ProductType.objects.order_by('name'))
+        materials = list(ProductMaterial.objects.order_by('name'))
+        colors = list(ProductColor.objects.order_by('name'))
+
+    return Taxonomy(
+        types=types,
+        materials=materials,
+        colors=colors,
+        type_by_slug={t.slug: t for t in types if t.slug},
+    )
+
+
+def get_taxonomy(language=None):
+    """
+    Product types, materials and colors for `language` (default: active one).
+    Zero queries once warm.
+    """
+    language = (language or translation.get_language() or 'en')[:2]
+    version = _current_version()
+
+    local = _local.get(language)
+    if local is not None and local[0] == version:
+        return local[1]
+
+    shared_key = f'products:taxonomy:{version}:{language}'
+    taxonomy = cache.get(shared_key)
+    if taxonomy is None:
+        taxonomy = _load(language)
+        cache.set(shared_key, taxonomy, TAXONOMY_CACHE_TIMEOUT)
+
+    with _lock:
+        _local[language] = (version, taxonomy)
+    return taxonomy
+
+
+def invalidate_taxonomy():
+    try:
+        cache.incr(TAXONOMY_VERSION_KEY)
+    except ValueError:
+        # key missing / evicted
+        cache.set(TAXONOMY_VERSION_KEY, time.time_ns(), None)
+    with _lock:
+        _local.clear()
@@ -0,0 +1,64 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from electry_art.products.images import available_derivatives
+
+register = template.Library()
+
+
+def _srcset(candidates):
+    return ", ".join(f"{url} {width}w" for width, url in candidates)
+
+
+@register.simple_tag
+def responsive_image(image, alt="", sizes="100vw", css_class="", loading="lazy", **attrs):
+    """
+    <picture> with a WebP source and a JPEG srcset built from the derivatives
+    (products/images.py). Falls back to the original file while derivatives
+    are still being generated.
+
+    {% responsive_image obj.product_image alt=obj.name sizes="(max-width: 600px) 50vw, 300px" %}
+    """
+    if not image:
+        return ""
+
+    webp = available_derivatives(image.name, "webp")
+    jpeg = available_derivatives(image.name, "jpeg")
+
+    if css_class:
+        attrs["class"] = css_class
+    if jpeg:
+        attrs["srcset"] = _srcset(jpeg)
+        attrs["sizes"] = sizes
+
+    img = format_html(
+        '<img src="{}" alt="{}" loading="{}"{}>',
+        image.url,
+        alt,
+        loading,
+        format_html_join("", ' {}="{}"', attrs.items()),
+    )
+
+    if not webp:
+        return img
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+        _srcset(webp),
+        sizes,
+        img,
+    )
+
+
+@register.simple_tag
+def thumbnail_url(image, width=160):
+    """
+    URL of the smallest JPEG derivative at least `width` px wide
+    (or the original, when none is big enough / generated yet).
+    """
+    if not image:
+        return ""
+    for derived_width, url in available_derivatives(image.name, "jpeg"):
+        if derived_width >= width:
+            return url
+    return image.url
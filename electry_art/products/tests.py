@@ -1,8 +1,28 @@
 
-from django.test import TestCase
-from electry_art.products.models import Product, ProductType, ProductPhoto
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from electry_art.products.facets import compute_facets
+from electry_art.products.images import derivative_name
+from electry_art.products.likes import toggle_like, recount_likes
+from electry_art.products.models import Product, ProductType, ProductPhoto, ProductMaterial, ProductColor, Like
+from electry_art.products.taxonomy import get_taxonomy
 from django.urls import reverse
+from django.utils import timezone, translation
+from django.db import connection, transaction
 from django.db.utils import IntegrityError
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+import shutil
+import tempfile
+import threading
 
 
 class ProductModelTests(TestCase):
@@ -130,3 +150,1107 @@ class ProductViewTests(TestCase):
         self.assertContains(response, 'All Products')
         self.assertNotContains(response, 'Keychain Test')
 
+
+
+class ProductLikeCounterTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='liker01', email='liker@example.com', password='testpass123'
+        )
+        self.product = Product.objects.create(
+            name='Liked Product',
+            serial_number='LK0001',
+            type=ProductType.objects.create(name='Like Type'),
+            material=ProductMaterial.objects.create(name='Wood'),
+            color=ProductColor.objects.create(name='Natural'),
+            size='10x10',
+            weight=1.0,
+            price=10.00,
+        )
+
+    def test_toggle_like_updates_counter(self):
+        liked, count = toggle_like(self.user, self.product)
+        self.assertTrue(liked)
+        self.assertEqual(count, 1)
+
+        liked, count = toggle_like(self.user, self.product)
+        self.assertFalse(liked)
+        self.assertEqual(count, 0)
+
+    def test_like_count_reads_stored_column(self):
+        toggle_like(self.user, self.product)
+        product = Product.objects.get(pk=self.product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(product.like_count, 1)
+
+    def test_recount_likes_fixes_drift(self):
+        Like.objects.create(user=self.user, product=self.product)
+        self.assertEqual(recount_likes(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes_count, 1)
+        self.assertEqual(recount_likes(), 0)
+
+
+class ToggleLikeRaceTests(TransactionTestCase):
+    def test_losing_the_insert_race_reports_liked(self):
+        user = get_user_model().objects.create_user(username='racer01', email='racer@example.com', password='x')
+        product = Product.objects.create(
+            name='Raced Product', serial_number='RC0001', type=ProductType.objects.create(name='Race Type'),
+            material=ProductMaterial.objects.create(name='Clay'), color=ProductColor.objects.create(name='Red'),
+            size='10x10', weight=1.0, price=10.00,
+        )
+        inserted = threading.Event()
+
+        def concurrent_like():
+            # the other request's insert, committed while ours waits on the conflict
+            try:
+                with transaction.atomic():
+                    Like.objects.create(user=user, product=product)
+                    Product.objects.filter(pk=product.pk).update(likes_count=1)
+                    inserted.set()
+                    threading.Event().wait(0.5)
+            finally:
+                connection.close()
+
+        other = threading.Thread(target=concurrent_like)
+        other.start()
+        inserted.wait(5)
+        liked, count = toggle_like(user, product)
+        other.join()
+
+        self.assertTrue(liked)
+        self.assertEqual(count, 1)
+        self.assertEqual(Like.objects.filter(user=user, product=product).count(), 1)
+
+
+class SearchSuggestViewTests(TestCase):
+    EMPTY = {'products': [], 'types': [], 'serials': []}
+
+    def setUp(self):
+        cache.clear()
+        # a request leaves its language active, which would prefix later reverse() calls
+        translation.activate('en')
+        self.addCleanup(translation.deactivate)
+
+    def cached(self, language, term, limit, marker):
+        # a pre-seeded cache entry proves which key the request resolved to
+        from electry_art.products.search import SUGGEST_CACHE_TIMEOUT, _suggest_cache_key
+
+        result = {'products': [{'name': marker, 'slug': marker}], 'types': [], 'serials': []}
+        cache.set(_suggest_cache_key(language, term, limit), result, SUGGEST_CACHE_TIMEOUT)
+        return result
+
+    def test_short_term_returns_empty_lists(self):
+        response = self.client.get(reverse('search_suggest'), {'q': 'k'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.EMPTY)
+
+    def test_missing_or_blank_term_returns_empty_lists(self):
+        from electry_art.products.search import suggest
+
+        with self.assertNumQueries(0):
+            for term in (None, '', '   ', ' k '):
+                self.assertEqual(suggest(term), self.EMPTY)
+        self.assertEqual(self.client.get(reverse('search_suggest')).json(), self.EMPTY)
+
+    def test_cache_key_is_per_language_and_limit(self):
+        from electry_art.products.search import _suggest_cache_key
+
+        key = _suggest_cache_key('en', 'Lamp', 8)
+        self.assertEqual(key, _suggest_cache_key('en', 'lamp', 8))
+        self.assertNotEqual(key, _suggest_cache_key('bg', 'lamp', 8))
+        self.assertNotEqual(key, _suggest_cache_key('en', 'lamp', 5))
+
+        english = self.cached('en', 'lamp', 5, 'english')
+        bulgarian = self.cached('bg', 'lamp', 5, 'bulgarian')
+        self.assertEqual(self.client.get(reverse('search_suggest'), {'q': 'lamp', 'limit': 5}).json(), english)
+        with translation.override('bg'):
+            url = reverse('search_suggest')
+        self.assertEqual(self.client.get(url, {'q': 'lamp', 'limit': 5}).json(), bulgarian)
+
+    def test_limit_is_clamped_to_its_bounds(self):
+        from electry_art.products.search import SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
+
+        expected = {
+            '500': self.cached('en', 'lamp', SUGGEST_MAX_LIMIT, 'max'),
+            '0': self.cached('en', 'lamp', 1, 'min'),
+            '-3': self.cached('en', 'lamp', 1, 'min'),
+            'many': self.cached('en', 'lamp', SUGGEST_DEFAULT_LIMIT, 'default'),
+        }
+        for limit, result in expected.items():
+            response = self.client.get(reverse('search_suggest'), {'q': 'lamp', 'limit': limit})
+            self.assertEqual(response.json(), result, limit)
+
+    def test_names_match_misspellings_by_trigram(self):
+        product_type = ProductType.objects.create(name_en='Ceramic Lamps', name_bg='Керамични лампи')
+        material = ProductMaterial.objects.create(name='Clay')
+        color = ProductColor.objects.create(name='White')
+        for name, serial in (('Ceramic Lamp', 'CL0001'), ('Oak Table', 'OT0001')):
+            Product.objects.create(
+                name_en=name, name_bg=name, serial_number=serial, type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=10.00,
+            )
+
+        data = self.client.get(reverse('search_suggest'), {'q': 'ceramik'}).json()
+        self.assertEqual([p['name'] for p in data['products']], ['Ceramic Lamp'])
+        self.assertEqual([t['name'] for t in data['types']], ['Ceramic Lamps'])
+
+        data = self.client.get(reverse('search_suggest'), {'q': 'cl00'}).json()
+        self.assertEqual([s['serial_number'] for s in data['serials']], ['CL0001'])
+
+
+class SearchProductsTests(TestCase):
+    def setUp(self):
+        product_type = ProductType.objects.create(name='Accessories')
+        material = ProductMaterial.objects.create(name='Brass')
+        color = ProductColor.objects.create(name='Gold')
+        for name_en, name_bg, serial in (
+            ('Brass keychain', 'Месингов ключодържател', 'KC0001'),
+            ('Oak table', 'Дъбова маса', 'OT0001'),
+        ):
+            Product.objects.create(
+                name_en=name_en, name_bg=name_bg, serial_number=serial, type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=10.00,
+            )
+
+    def found(self, text, language='en'):
+        from electry_art.products.search import search_products
+
+        return sorted(search_products(Product.objects.all(), text, language).values_list('serial_number', flat=True))
+
+    def test_matches_either_language_column(self):
+        self.assertEqual(self.found('keychains'), ['KC0001'])
+        self.assertEqual(self.found('ключодържател', 'bg'), ['KC0001'])
+        # the other language's words match too
+        self.assertEqual(self.found('маса'), ['OT0001'])
+        self.assertEqual(self.found('table', 'bg'), ['OT0001'])
+
+    def test_last_word_matches_as_a_prefix(self):
+        from electry_art.products.search import prefix_tsquery
+
+        self.assertEqual(self.found('key'), ['KC0001'])
+        self.assertEqual(self.found('brass key'), ['KC0001'])
+        self.assertEqual(self.found('ключо', 'bg'), ['KC0001'])
+        self.assertEqual(self.found('key brass'), [])  # only the last word is a prefix
+        self.assertEqual(prefix_tsquery("oak & key:* | !x"), 'oak & key & x:*')
+        self.assertIsNone(prefix_tsquery('"oak table" -red'))
+
+    def test_empty_input_leaves_the_queryset_alone(self):
+        for text in (None, '', '   '):
+            self.assertEqual(self.found(text), ['KC0001', 'OT0001'])
+        self.assertEqual(self.found('!&|:*'), [])
+        self.assertEqual(self.found('ot0001'), ['OT0001'])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        product_type = ProductType.objects.create(name='Paging Type')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        for i in range(19):
+            Product.objects.create(
+                name=f'Paging {i}',
+                serial_number=f'PG{i:05d}',
+                type=product_type,
+                material=material,
+                color=color,
+                size='10x10',
+                weight=1.0,
+                price=10 + i % 3,  # plenty of ties on price
+            )
+
+    def _walk(self, sort):
+        seen, pages, cursor = [], [], None
+        while True:
+            params = {'sort': sort}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.client.get(reverse('product list'), params).context['page_obj']
+            pages.append(page)
+            seen.extend(p.pk for p in page)
+            if not page.has_next():
+                return seen, pages
+            cursor = page.next_cursor
+
+    def test_every_sort_visits_each_product_once(self):
+        for sort in ('new', 'old', 'price_asc', 'price_desc'):
+            seen, pages = self._walk(sort)
+            self.assertEqual(len(seen), 19, sort)
+            self.assertEqual(len(set(seen)), 19, sort)
+            self.assertEqual(len(pages), 3, sort)
+            self.assertFalse(pages[0].has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        seen, pages = self._walk('price_desc')
+        response = self.client.get(
+            reverse('product list'), {'sort': 'price_desc', 'cursor': pages[1].previous_cursor}
+        )
+        self.assertEqual([p.pk for p in response.context['page_obj']], [p.pk for p in pages[0]])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('product list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class ExplainCatalogQueriesTests(TestCase):
+    def setUp(self):
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        for i in range(3):
+            Product.objects.create(
+                name=f'Plan Lamp {i}', serial_number=f'PLAN0{i}', type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=10 + i, quantity=i,
+            )
+
+    def test_reports_every_combination_and_price_sorts_need_no_sort_step(self):
+        import re
+        from django.core.management import call_command
+        from electry_art.products.product_mixins.sorting_filtering import SORT_MAP
+
+        stdout = StringIO()
+        call_command('explain_catalog_queries', no_seqscan=True, show_plans=True, stdout=stdout)
+        output = stdout.getvalue()
+
+        # 6 filter sets (with a material and a color), unscoped and scoped to the type
+        self.assertIn(f"/{2 * 6 * len(SORT_MAP)} combination(s)", output)
+        plans = {block.splitlines()[0]: block for block in re.split(r'\n(?=INDEX |SEQ )', output)}
+        for sort in ('price_asc', 'price_desc'):
+            # both directions read product_price_idx in order (forward / backward), no Sort node
+            plan = plans[f"INDEX type=* sort={sort}  -> product_price_idx"]
+            self.assertNotIn('Sort', plan)
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        self.keychains = ProductType.objects.create(name='Keychains')
+        self.icons = ProductType.objects.create(name='Icons')
+        self.oak = ProductMaterial.objects.create(name='Oak')
+        self.pine = ProductMaterial.objects.create(name='Pine')
+        self.red = ProductColor.objects.create(name='Red')
+        rows = [
+            (self.keychains, self.oak, self.red, 10),
+            (self.keychains, self.pine, self.red, 30),
+            (self.icons, self.oak, self.red, 120),
+        ]
+        for i, (product_type, material, color, price) in enumerate(rows):
+            Product.objects.create(
+                name=f'Facet {i}', serial_number=f'FC{i:05d}', type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=price,
+            )
+
+    def test_facets_in_single_query(self):
+        materials = [self.oak, self.pine]
+        with self.assertNumQueries(1):
+            facets = compute_facets(
+                Product.objects.all(), {'material': str(self.oak.pk)}, materials, [self.red],
+                [self.icons, self.keychains],
+            )
+
+        self.assertEqual(facets['total'], 2)
+        # own facet ignores the material filter, the others respect it
+        self.assertEqual([f['count'] for f in facets['materials']], [2, 1])
+        self.assertEqual([f['count'] for f in facets['colors']], [2])
+        self.assertEqual([f['count'] for f in facets['types']], [1, 1])
+        self.assertEqual([b['count'] for b in facets['price_buckets']], [1, 0, 0, 1])
+
+
+class ProductCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='Cached Card',
+            serial_number='CC0001',
+            type=ProductType.objects.create(name='Card Type'),
+            material=ProductMaterial.objects.create(name='Wood'),
+            color=ProductColor.objects.create(name='Natural'),
+            size='10x10',
+            weight=1.0,
+            price=10.00,
+        )
+
+    def test_card_is_cached_and_dropped_on_delete(self):
+        self.client.get(reverse('product list'))
+        key = make_template_fragment_key('product_card', [self.product.pk, self.product.updated_on.timestamp(), 'en'])
+        self.assertIsNotNone(cache.get(key))
+
+        self.product.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_photo_change_moves_card_version(self):
+        before = self.product.updated_on
+        ProductPhoto.objects.create(photo_name='front', product=self.product)
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.updated_on, before)
+
+
+class TaxonomyRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product_type = ProductType.objects.create(name='Keychains')
+        ProductMaterial.objects.create(name='Oak')
+        ProductColor.objects.create(name='Red')
+
+    def test_warm_lookup_costs_no_queries(self):
+        get_taxonomy('en')
+        with self.assertNumQueries(0):
+            taxonomy = get_taxonomy('en')
+        self.assertEqual(taxonomy.type_by_slug['keychains'], self.product_type)
+
+    def test_crud_invalidates_after_commit(self):
+        get_taxonomy('en')
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductColor.objects.create(name='Blue')
+            # still inside the transaction: the version has not moved yet
+            self.assertEqual([c.name for c in get_taxonomy('en').colors], ['Red'])
+        self.assertEqual([c.name for c in get_taxonomy('en').colors], ['Blue', 'Red'])
+
+    def test_category_page_unknown_slug_is_404(self):
+        response = self.client.get(reverse('product category', kwargs={'type_slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVES_ASYNC=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+    @staticmethod
+    def make_upload(width=800, height=600):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'orange').save(buffer, 'PNG')
+        return SimpleUploadedFile('lamp.png', buffer.getvalue(), content_type='image/png')
+
+    def make_product(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name='Lamp',
+                serial_number='IMG001',
+                type=ProductType.objects.create(name='Lamps'),
+                material=ProductMaterial.objects.create(name='Brass'),
+                color=ProductColor.objects.create(name='Gold'),
+                size='10x10',
+                weight=1.0,
+                price=10.00,
+                product_image=self.make_upload(),
+            )
+
+    def test_upload_generates_derivatives_and_srcset(self):
+        product = self.make_product()
+
+        name = product.product_image.name
+        self.assertTrue(default_storage.exists(derivative_name(name, 320, 'webp')))
+        self.assertTrue(default_storage.exists(derivative_name(name, 640, 'jpeg')))
+        # never upscaled past the 800px original
+        self.assertFalse(default_storage.exists(derivative_name(name, 1024, 'jpeg')))
+
+        # the widths were recorded when the job finished: rendering does not stat storage
+        with mock.patch('electry_art.products.images.scan_derivatives') as scan:
+            html = Template(
+                '{% load product_images %}{% responsive_image image alt="Lamp" sizes="300px" %}'
+            ).render(Context({'image': product.product_image}))
+        scan.assert_not_called()
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('-320w.jpg 320w', html)
+        self.assertIn(f'src="{product.product_image.url}"', html)
+
+    def test_unrelated_save_does_not_decode_and_photos_touch_product(self):
+        product = self.make_product()
+
+        with mock.patch('PIL.ImageOps.exif_transpose') as transpose, self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        transpose.assert_not_called()
+
+        with mock.patch('electry_art.products.cache.touch_product') as touch, \
+                self.captureOnCommitCallbacks(execute=True):
+            ProductPhoto.objects.create(photo_name='side', product=product, product_image=self.make_upload())
+        touch.assert_called_once_with(product.pk)
+
+
+class RelatedProductsTests(TestCase):
+    def setUp(self):
+        self.lamps = ProductType.objects.create(name='Lamps')
+        self.vases = ProductType.objects.create(name='Vases')
+        self.wood = ProductMaterial.objects.create(name='Wood')
+        self.glass = ProductMaterial.objects.create(name='Glass')
+        self.red = ProductColor.objects.create(name='Red')
+
+        self.base = self.make('REL001', self.lamps, self.wood, 20)
+        self.same_kind = self.make('REL002', self.lamps, self.wood, 22)
+        self.same_type = self.make('REL003', self.lamps, self.glass, 90)
+        self.other = self.make('REL004', self.vases, self.glass, 90)
+        self.drain_queue()
+
+    @staticmethod
+    def drain_queue():
+        from django.core.management import call_command
+        call_command('rebuild_related_products', '--queued', stdout=StringIO())
+
+    def make(self, serial, product_type, material, price):
+        return Product.objects.create(
+            name=serial, serial_number=serial, type=product_type, material=material, color=self.red,
+            size='10x10', weight=1.0, price=price, quantity=1,
+        )
+
+    def related_serials(self, product):
+        from electry_art.products.related import related_products
+        return [p.serial_number for p in related_products(product)]
+
+    def test_lists_are_precomputed_by_similarity(self):
+        self.assertEqual(self.related_serials(self.base), ['REL002', 'REL003', 'REL004'])
+
+    def test_co_purchase_lifts_other_category(self):
+        from electry_art.cart.signals import checkout_completed
+        from electry_art.orders.models import Order, OrderItem
+
+        for i in range(5):
+            order = Order.objects.create(
+                order_serial_number=f'ORDREL{i}', full_name='Test', address='Sofia', phone='123', is_paid=True,
+            )
+            for product in (self.base, self.other):
+                OrderItem.objects.create(order=order, product=product, product_name=product.name, quantity=1, price=product.price)
+            checkout_completed.send(sender=None, order=order)
+
+        self.assertEqual(self.related_serials(self.base)[:2], ['REL002', 'REL004'])
+
+    def test_edit_patches_lists_like_a_full_rebuild(self):
+        from electry_art.products.models import RelatedProduct
+        from electry_art.products.related import refresh_related
+
+        def stored():
+            return list(RelatedProduct.objects.order_by('product_id', 'position').values_list(
+                'product_id', 'related_id', 'position'))
+
+        from electry_art.products.models import RelatedRefreshQueue
+
+        with mock.patch('electry_art.products.related.refresh_related', wraps=refresh_related) as full:
+            self.same_type.material = self.wood
+            self.same_type.price = 19
+            self.same_type.save()
+            # the save only queues the product
+            full.assert_not_called()
+            self.assertEqual(list(RelatedRefreshQueue.objects.values_list('product_id', flat=True)), [self.same_type.pk])
+            self.drain_queue()
+        # only the edited product's own list is rescored from scratch
+        full.assert_called_once_with([self.same_type.pk])
+        self.assertFalse(RelatedRefreshQueue.objects.exists())
+        self.assertEqual(self.related_serials(self.base)[:2], ['REL003', 'REL002'])
+
+        incremental = stored()
+        refresh_related(Product.objects.values_list('pk', flat=True))
+        self.assertEqual(incremental, stored())
+
+    def test_merge_only_touches_lists_the_product_enters(self):
+        from electry_art.products.models import RelatedProduct
+        from electry_art.products.related import merge_into_lists
+
+        fillers = [self.make(f'REL1{i}', self.vases, self.glass, 90) for i in range(4)]
+        self.drain_queue()
+        vase_list = list(RelatedProduct.objects.filter(product=self.other).values_list('related_id', 'score'))
+
+        # a lamp nothing like the vases: their full lists keep their rows
+        newcomer = self.make('REL020', self.lamps, self.wood, 21)
+        self.assertEqual(merge_into_lists(newcomer), 3)  # the three lamps' lists
+        self.assertEqual(
+            list(RelatedProduct.objects.filter(product=self.other).values_list('related_id', 'score')), vase_list,
+        )
+        self.assertIn(newcomer, list(Product.objects.filter(recommended_for__product=self.base)))
+        self.assertFalse(RelatedProduct.objects.filter(product__in=fillers, related=newcomer).exists())
+
+    def test_detail_page_reads_stored_list(self):
+        response = self.client.get(reverse('product details', kwargs={'slug': self.base.slug}))
+        self.assertEqual([p.serial_number for p in response.context['new_products']], ['REL002', 'REL003', 'REL004'])
+
+
+class SlugAllocationTests(TestCase):
+    def setUp(self):
+        self.product_type = ProductType.objects.create(name='Keychains')
+        self.material = ProductMaterial.objects.create(name='Wood')
+        self.color = ProductColor.objects.create(name='Red')
+
+    def make(self, serial, **names):
+        return Product.objects.create(
+            serial_number=serial, type=self.product_type, material=self.material, color=self.color,
+            size='10x10', weight=1.0, price=10.00, **names,
+        )
+
+    def test_next_suffix_in_one_query(self):
+        from electry_art.products.slugs import next_free_slug
+
+        for i in range(5):
+            self.make(f'KEY00{i}', name='Keychain')
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)),
+            ['keychain', 'keychain-2', 'keychain-3', 'keychain-4', 'keychain-5'],
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(next_free_slug(Product, 'keychain'), 'keychain-6')
+
+    def test_numbers_in_names_are_not_mistaken_for_long_suffixes(self):
+        from electry_art.products.slugs import next_free_slug
+
+        self.make('LAMP01', name='Lamp')
+        self.make('LAMP02', name='Lamp 20240101123456')  # longer than any suffix: part of the name
+        self.assertEqual(next_free_slug(Product, 'lamp'), 'lamp-2')
+
+        self.make('LAMP03', name='Lamp 2024')  # a year reads as a suffix, the next one follows it
+        self.assertEqual(next_free_slug(Product, 'lamp'), 'lamp-2025')
+        self.make('LAMP04', name='Lamp 999999999')
+        self.assertEqual(next_free_slug(Product, 'lamp'), 'lamp-1000000000')
+
+    def test_bulgarian_only_name(self):
+        product = self.make('KEY100', name_bg='Ключодържател')
+        self.assertEqual(product.slug, 'ключодържател')
+        response = self.client.get(reverse('product details', kwargs={'slug': product.slug}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_reslug_command_keeps_current_slugs(self):
+        from django.core.management import call_command
+
+        kept = self.make('KEY200', name='Keychain')
+        renamed = self.make('KEY201', name='Keychain')
+        Product.objects.filter(pk=renamed.pk).update(name_en='Bottle opener', name='Bottle opener')
+
+        call_command('reslug_catalog', model=['product'], stdout=StringIO())
+        renamed.refresh_from_db()
+        self.assertEqual(renamed.slug, 'keychain-2')  # live URLs are only rewritten on request
+
+        updated_on = renamed.updated_on
+        with mock.patch('electry_art.products.sitemaps.invalidate_product') as invalidate:
+            call_command('reslug_catalog', model=['product'], stale=True, stdout=StringIO())
+
+        kept.refresh_from_db()
+        renamed.refresh_from_db()
+        self.assertEqual(kept.slug, 'keychain')
+        self.assertEqual(renamed.slug, 'bottle-opener')
+        self.assertGreater(renamed.updated_on, updated_on)
+        invalidate.assert_called_once_with(renamed.pk)
+
+
+class ProductImportExportTests(TestCase):
+    CSV = (
+        "serial_number,name_en,name_bg,type,material,color,size,weight,price,quantity\n"
+        "IMP001,Oak lamp,Дъбова лампа,Lamps,Oak,Red,20x20,1.5,49.90,3\n"
+        "IMP002,Oak lamp,,лампи,oak,Red,20x20,1.5,39.90,0\n"
+        "IMP003,Broken,,Vases,Oak,Red,20x20,1.5,abc,1\n"
+    )
+
+    def setUp(self):
+        ProductType.objects.create(name_en='Lamps', name_bg='Лампи')
+        ProductMaterial.objects.create(name='Oak')
+        ProductColor.objects.create(name='Red')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def write(self, name, content):
+        path = f"{self.tmp}/{name}"
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(content)
+        return path
+
+    def test_import_creates_and_reports_errors(self):
+        from django.core.management import call_command
+
+        errors = f"{self.tmp}/errors.csv"
+        call_command('import_products', self.write('p.csv', self.CSV), errors=errors, stdout=StringIO())
+
+        lamp = Product.objects.get(serial_number='IMP001')
+        self.assertEqual((lamp.name_bg, lamp.slug, lamp.is_available), ('Дъбова лампа', 'oak-lamp', True))
+        self.assertEqual(Product.objects.get(serial_number='IMP002').slug, 'oak-lamp-2')
+        self.assertEqual(Product.objects.filter(name='Oak lamp').count(), 2)
+        self.assertFalse(Product.objects.filter(serial_number='IMP003').exists())
+
+        with open(errors, encoding='utf-8') as fh:
+            report = fh.read()
+        self.assertIn('4,IMP003', report)
+        self.assertIn('price: not a number', report)
+
+    def test_non_finite_numbers_fail_the_row_only_and_caches_move(self):
+        from django.core.management import call_command
+        from electry_art.products.cache import catalog_version
+        from electry_art.products.related import related_products
+
+        csv_text = self.CSV + "IMP004,Nan lamp,,Lamps,Oak,Red,20x20,NaN,10,1\nIMP005,Inf lamp,,Lamps,Oak,Red,20x20,1,Infinity,1\n"
+        version = catalog_version()
+        stderr = StringIO()
+        call_command('import_products', self.write('p.csv', csv_text), stdout=StringIO(), stderr=stderr)
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertIn('weight: not a number', stderr.getvalue())
+        self.assertIn('price: not a number', stderr.getvalue())
+        self.assertNotEqual(catalog_version(), version)
+        lamp = Product.objects.get(serial_number='IMP001')
+        # queued by the import, filled in by the worker
+        self.assertFalse(lamp.related_entries.exists())
+        call_command('rebuild_related_products', '--queued', stdout=StringIO())
+        self.assertEqual([p.serial_number for p in related_products(lamp)], ['IMP002'])
+
+    def test_dry_run_writes_nothing(self):
+        from django.core.management import call_command
+
+        call_command('import_products', self.write('p.csv', self.CSV), dry_run=True, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(Product.objects.exists())
+
+    def test_export_round_trip_updates(self):
+        from django.core.management import call_command
+
+        call_command('import_products', self.write('p.csv', self.CSV), stdout=StringIO(), stderr=StringIO())
+        exported = f"{self.tmp}/catalog.jsonl"
+        call_command('export_products', output=exported, stdout=StringIO())
+
+        with open(exported, encoding='utf-8') as fh:
+            lines = fh.read().replace('"49.90"', '"59.90"')
+        call_command('import_products', self.write('catalog.jsonl', lines), stdout=StringIO())
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(str(Product.objects.get(serial_number='IMP001').price), '59.90')
+
+    def test_export_to_stdout_goes_through_the_command_stream(self):
+        from django.core.management import call_command
+
+        call_command('import_products', self.write('p.csv', self.CSV), stdout=StringIO(), stderr=StringIO())
+        stdout = StringIO()
+        call_command('export_products', stdout=stdout)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('serial_number,'))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        from electry_art.products.related import refresh_related
+
+        cache.clear()
+        self.color = ProductColor.objects.create(name='Natural')
+        self.product, self.neighbour = [
+            Product.objects.create(
+                name=f'Etag Lamp {i}',
+                serial_number=f'ETAG0{i}',
+                type=ProductType.objects.create(name=f'Lamps {i}'),
+                material=ProductMaterial.objects.create(name=f'Wood {i}'),
+                color=self.color,
+                size='10x10',
+                weight=1.0,
+                price=10.00,
+                quantity=2,
+            )
+            for i in range(2)
+        ]
+        refresh_related([self.product.pk, self.neighbour.pk])
+        self.url = reverse('product details', kwargs={'slug': self.product.slug})
+
+    def test_detail_not_modified_until_product_changes(self):
+        self.client.get(self.url)  # first visit sets the CSRF cookie
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('max-age=60', response['Cache-Control'])
+        # stock / like writes move no date: ETag only
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # stock changes are saved without updated_on (webhook) and still count
+        Product.objects.filter(pk=self.product.pk).update(quantity=1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_validator_covers_taxonomy_and_related_list(self):
+        from electry_art.products.models import RelatedProduct
+
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+
+        # the page shows the color's name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.color.name = 'Walnut'
+            self.color.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # an older product joins the list: the newest related updated_on stays the same
+        older = Product.objects.create(
+            name='Etag Older', serial_number='ETAG09', type=self.product.type, material=self.product.material,
+            color=self.color, size='10x10', weight=1.0, price=10.00,
+        )
+        Product.objects.filter(pk=older.pk).update(updated_on=self.neighbour.updated_on - timedelta(days=1))
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        RelatedProduct.objects.create(product=self.product, related=older, position=1, score=0.5)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # no stored list yet: the fallback query is not validated
+        RelatedProduct.objects.filter(product=self.product).delete()
+        self.assertFalse(self.client.get(self.url).has_header('ETag'))
+
+    @override_settings(SHARED_CACHE=True)
+    def test_liked_state_is_part_of_the_validator(self):
+        user = get_user_model().objects.create_user(username='etag', password='pass12345')
+        self.client.force_login(user)
+
+        etag = self.client.get(self.url)['ETag']
+        toggle_like(user, self.product)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_removed_like_moves_the_validator(self):
+        user = get_user_model().objects.create_user(username='etag', password='pass12345')
+        self.client.force_login(user)
+        toggle_like(user, self.product)
+
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.filter(user=user).delete()  # e.g. an admin bulk action
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_personal_pages_not_conditional_without_shared_cache(self):
+        user = get_user_model().objects.create_user(username='etag', password='pass12345')
+        self.client.force_login(user)
+        self.assertFalse(self.client.get(self.url).has_header('ETag'))
+
+    def test_csrf_cookie_is_part_of_the_validator(self):
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 32
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_listing_not_modified(self):
+        url = reverse('product list')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url + '?sort=price_asc', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # the webhook's stock decrement saves with update_fields -> new catalog version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.quantity = 1
+            self.product.save(update_fields=['quantity'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_listing_without_shared_cache_is_not_conditional(self):
+        self.assertFalse(self.client.get(reverse('product list')).has_header('ETag'))
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        from electry_art.products import sitemaps
+        patcher = mock.patch.object(sitemaps, 'SITEMAP_CACHE_DIR', Path(self.cache_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.product = Product.objects.create(
+            name='Sitemap Lamp',
+            serial_number='MAP001',
+            type=ProductType.objects.create(name='Lamps'),
+            material=ProductMaterial.objects.create(name='Wood'),
+            color=ProductColor.objects.create(name='Natural'),
+            size='10x10',
+            weight=1.0,
+            price=10.00,
+        )
+
+    @staticmethod
+    def content(response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_index_lists_both_languages(self):
+        body = self.content(self.client.get('/sitemap.xml'))
+        self.assertIn('/sitemap-products-en-1.xml', body)
+        self.assertIn('/sitemap-pages-bg-1.xml', body)
+
+    def test_products_file_is_cached_and_invalidated(self):
+        from electry_art.products import sitemaps
+
+        body = self.content(self.client.get('/sitemap-products-bg-1.xml'))
+        self.assertIn('/bg/products/sitemap-lamp/', body)
+        self.assertIn('hreflang="en"', body)
+        self.assertIsNotNone(sitemaps.cached_file('sitemap-products-bg-1.xml'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertIsNone(sitemaps.cached_file('sitemap-products-bg-1.xml'))
+
+    def test_photo_change_drops_the_products_file(self):
+        from electry_art.products import sitemaps
+
+        self.content(self.client.get('/sitemap-products-en-1.xml'))
+        self.assertIsNotNone(sitemaps.cached_file('sitemap-products-en-1.xml'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductPhoto.objects.create(product=self.product, photo_name='sitemap_view')
+        self.assertIsNone(sitemaps.cached_file('sitemap-products-en-1.xml'))
+
+    def test_empty_chunk_is_404(self):
+        self.assertEqual(self.client.get('/sitemap-products-en-99.xml').status_code, 404)
+
+
+class CatalogApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        for i in range(3):
+            Product.objects.create(
+                name_en=f'Lamp {i}', name_bg=f'Лампа {i}', serial_number=f'API00{i}',
+                type=product_type, material=material, color=color,
+                size='10x10', weight=1.0, price=10 + i, quantity=1,
+            )
+        self.url = reverse('api_products')
+
+    def test_sparse_fields_and_cursor(self):
+        response = self.client.get(self.url, {'fields': 'name,price', 'sort': 'price_asc', 'limit': 2})
+        data = response.json()
+        self.assertEqual(data['results'], [{'name': 'Lamp 0', 'price': '10.00'}, {'name': 'Lamp 1', 'price': '11.00'}])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([row['name'] for row in data['results']], ['Lamp 2'])
+        self.assertIsNone(data['next'])
+
+    def test_warm_request_is_cached_and_etagged(self):
+        first = self.client.get(self.url, {'fields': 'id,name'})
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        product = Product.objects.get(serial_number='API000')
+        product.name_en = 'Renamed lamp'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.client.get(self.url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_translated_detail_and_unknown_field(self):
+        with translation.override('bg'):
+            url = reverse('api_product_detail', kwargs={'slug': 'lamp-0'})
+        self.assertEqual(self.client.get(url, {'fields': 'name'}).json(), {'name': 'Лампа 0'})
+        self.assertEqual(self.client.get(self.url, {'fields': 'password'}).status_code, 400)
+
+
+class LikedStateTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='heavyliker', password='pass12345')
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        self.products = [
+            Product.objects.create(
+                name=f'Liked {i}', serial_number=f'LIKE0{i}', type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=10, quantity=1,
+            )
+            for i in range(10)
+        ]
+        for product in self.products:
+            Like.objects.create(user=self.user, product=product)
+
+    def test_liked_ids_cover_only_the_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('product list'))
+        page_ids = {product.pk for product in response.context['products']}
+        self.assertEqual(len(page_ids), 8)
+        self.assertEqual(response.context['liked_ids'], page_ids)
+
+    def test_shared_api(self):
+        from electry_art.products.likes import is_liked, liked_product_ids
+
+        with self.assertNumQueries(1):
+            self.assertEqual(liked_product_ids(self.user, [self.products[0].pk, 0]), {self.products[0].pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(liked_product_ids(self.user, []), set())
+        self.assertTrue(is_liked(self.user, self.products[1]))
+
+
+class LikeJsonTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='ajaxliker', password='pass12345')
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        self.products = [
+            Product.objects.create(
+                name=f'Ajax {i}', serial_number=f'AJAX0{i}', type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=10, quantity=1,
+            )
+            for i in range(3)
+        ]
+        self.client.force_login(self.user)
+
+    def test_toggle_returns_json(self):
+        url = reverse('toggle_like', kwargs={'pk': self.products[0].pk})
+        data = self.client.post(url, HTTP_ACCEPT='application/json').json()
+        self.assertEqual((data['liked'], data['likes_count']), (True, 1))
+        data = self.client.post(url, HTTP_ACCEPT='application/json').json()
+        self.assertEqual((data['liked'], data['likes_count']), (False, 0))
+
+    def test_batch_is_idempotent(self):
+        first, second, third = self.products
+        Like.objects.create(user=self.user, product=third)
+        Product.objects.filter(pk=third.pk).update(likes_count=1)
+
+        payload = {'likes': {str(first.pk): True, str(second.pk): True, str(third.pk): False}}
+        for _ in range(2):
+            response = self.client.post(reverse('like_batch'), data=payload, content_type='application/json')
+            self.assertEqual(response.json()['likes'], {
+                str(first.pk): {'liked': True, 'likes_count': 1},
+                str(second.pk): {'liked': True, 'likes_count': 1},
+                str(third.pk): {'liked': False, 'likes_count': 0},
+            })
+        self.assertEqual(recount_likes(), 0)
+
+    def test_batch_requires_login(self):
+        self.client.logout()
+        response = self.client.post(reverse('like_batch'), data={'likes': {}}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_like_keeps_catalog_caches_and_counts_are_fetched_separately(self):
+        from electry_art.products.cache import catalog_version
+
+        cache.clear()
+        api_url = reverse('api_products')
+        plain = self.client.get(api_url, {'fields': 'id'})
+        counted = self.client.get(api_url, {'fields': 'id,likes_count'})
+        version = catalog_version()
+
+        self.client.post(reverse('toggle_like', kwargs={'pk': self.products[0].pk}), HTTP_ACCEPT='application/json')
+
+        self.assertEqual(catalog_version(), version)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(api_url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=plain['ETag']).status_code, 304)
+        response = self.client.get(api_url, {'fields': 'id,likes_count'}, HTTP_IF_NONE_MATCH=counted['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+        ids = ','.join(str(product.pk) for product in self.products[:2])
+        self.client.logout()
+        response = self.client.get(reverse('like_counts'), {'ids': ids})
+        self.assertEqual(response.json(), {'likes_count': {str(self.products[0].pk): 1, str(self.products[1].pk): 0}})
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get(reverse('like_counts'), {'ids': 'x'}).status_code, 400)
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        from electry_art.orders.models import Order, OrderItem
+
+        product_type = ProductType.objects.create(name='Lamps')
+        material = ProductMaterial.objects.create(name='Wood')
+        color = ProductColor.objects.create(name='Natural')
+        self.liked, self.sold, self.fresh = [
+            Product.objects.create(
+                name=f'Rank {i}', serial_number=f'RANK0{i}', type=product_type, material=material,
+                color=color, size='10x10', weight=1.0, price=10, quantity=5,
+            )
+            for i in range(3)
+        ]
+        self.users = [
+            get_user_model().objects.create_user(username=f'ranker{i}', email=f'ranker{i}@example.com', password='pass12345') for i in range(4)
+        ]
+        now = timezone.now()
+
+        # two month-old likes, one paid sale today, one like today
+        for user in self.users[:2]:
+            Like.objects.create(user=user, product=self.liked)
+        Like.objects.filter(product=self.liked).update(created_at=now - timedelta(days=30))
+        order = Order.objects.create(
+            order_serial_number='RANK-ORDER', full_name='Buyer', address='Street 1', phone='123',
+            is_paid=True, paid_at=now,
+        )
+        OrderItem.objects.create(order=order, product=self.sold, product_name='Rank 1', quantity=1, price=10)
+        Like.objects.create(user=self.users[0], product=self.fresh)
+
+    def ranked(self, sort):
+        response = self.client.get(reverse('product list'), {'sort': sort})
+        return [product.pk for product in response.context['products']]
+
+    def test_full_refresh_orders_by_decayed_scores(self):
+        from electry_art.products.ranking import refresh_rankings
+
+        run = refresh_rankings()
+        self.assertTrue(run.full)
+        self.assertEqual(self.ranked('popular'), [self.sold.pk, self.liked.pk, self.fresh.pk])
+        self.assertEqual(self.ranked('trending'), [self.sold.pk, self.fresh.pk, self.liked.pk])
+
+    def test_incremental_refresh_matches_full(self):
+        from electry_art.products.ranking import refresh_rankings
+
+        start = timezone.now()
+        refresh_rankings(now=start)
+        for user in self.users[1:]:
+            Like.objects.create(user=user, product=self.fresh)
+
+        later = timezone.now() + timedelta(days=1)
+        run = refresh_rankings(now=later)
+        self.assertFalse(run.full)
+        self.assertEqual(run.products_updated, 1)
+        self.assertEqual(self.ranked('trending')[0], self.fresh.pk)
+
+        incremental = dict(Product.objects.values_list('pk', 'trending_score'))
+        refresh_rankings(full=True, now=later)
+        for pk, score in Product.objects.values_list('pk', 'trending_score'):
+            self.assertAlmostEqual(score, incremental[pk], places=6)
+
+    def test_incremental_refresh_handles_unlikes_and_late_commits(self):
+        from electry_art.products.ranking import refresh_rankings
+
+        start = timezone.now()
+        refresh_rankings(now=start)
+
+        # unliked after the run; a like stamped just before the run, committed after it
+        Like.objects.filter(product=self.liked, user=self.users[0]).delete()
+        late = Like.objects.create(user=self.users[3], product=self.fresh)
+        Like.objects.filter(pk=late.pk).update(created_at=start - timedelta(minutes=1))
+
+        later = start + timedelta(hours=1)
+        refresh_rankings(now=later)
+        refresh_rankings(now=later + timedelta(seconds=1))  # the overlap is not counted twice
+
+        incremental = dict(Product.objects.values_list('pk', 'popularity_score'))
+        refresh_rankings(full=True, now=later + timedelta(seconds=1))
+        for pk, score in Product.objects.values_list('pk', 'popularity_score'):
+            self.assertAlmostEqual(score, incremental[pk], places=6)
+
+    def test_removals_are_logged_and_the_ledger_only_keeps_the_window(self):
+        from electry_art.orders.models import Order
+        from electry_art.products.likes import toggle_like
+        from electry_art.products.models import RankingEvent, RankingRemoval
+        from electry_art.products.ranking import EVENT_OVERLAP, refresh_rankings
+
+        start = timezone.now()
+        refresh_rankings(now=start)
+        # the month-old likes are folded into the scores, not kept
+        self.assertFalse(RankingEvent.objects.filter(happened_at__lte=start - EVENT_OVERLAP).exists())
+
+        toggle_like(self.users[1], self.liked)  # counted, already pruned
+        toggle_like(self.users[0], self.fresh)  # counted, still in the window
+        toggle_like(self.users[2], self.fresh)  # liked and unliked between the runs: never counted
+        toggle_like(self.users[2], self.fresh)
+        Order.objects.get(order_serial_number='RANK-ORDER').delete()  # ORM cascade to the paid line
+        self.assertEqual(RankingRemoval.objects.count(), 4)
+
+        later = start + timedelta(hours=1)
+        refresh_rankings(now=later)
+        self.assertFalse(RankingRemoval.objects.exists())
+        self.assertFalse(RankingEvent.objects.filter(happened_at__lte=later - EVENT_OVERLAP).exists())
+
+        incremental = dict(Product.objects.values_list('pk', 'popularity_score'))
+        self.assertAlmostEqual(incremental[self.fresh.pk], 0, places=6)
+        self.assertAlmostEqual(incremental[self.sold.pk], 0, places=6)
+        refresh_rankings(full=True, now=later)
+        for pk, score in Product.objects.values_list('pk', 'popularity_score'):
+            self.assertAlmostEqual(score, incremental[pk], places=6)
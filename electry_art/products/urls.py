@@ -1,17 +1,22 @@
-from django.urls import path, include
+from django.urls import path, include, register_converter
+
+from electry_art.products.converters import UnicodeSlugConverter
 from electry_art.products.views import (
     IndexView,
     ProductCreateView, ProductListView, ProductDetailsView, ProductEditView,
     PhotoCreateView, PhotoDetailsView, PhotoEditView, PhotoDeleteView,
     ToggleLikeView, WishlistView,
-    ProductCategoryListView, SearchView,
+    ProductCategoryListView, SearchView, SearchSuggestView,
     ProductTypeCreateView, ProductMaterialCreateView, ProductColorCreateView,
     ProductPropsListView, ProductTypeEditView, ProductTypeDeleteView,
     ProductColorEditView, ProductColorDeleteView,
     ProductMaterialEditView, ProductMaterialDeleteView,
     ProductDetailsRedirectView, ProductCategoryRedirectView, ProductSerialSearchView,
+    CatalogApiView, ProductApiDetailView, LikeBatchView, LikeCountsView,
 )
 
+register_converter(UnicodeSlugConverter, 'uslug')
+
 urlpatterns = [
     path('', IndexView.as_view(), name='index'),
     path('wishlist/', WishlistView.as_view(), name='wishlist'),
@@ -20,6 +25,11 @@ urlpatterns = [
         # Public
         path('', ProductListView.as_view(), name='product list'),
         path('search/', SearchView.as_view(), name='search'),
+        path('search/suggest/', SearchSuggestView.as_view(), name='search_suggest'),
+        # Read-only JSON catalog
+        path('api/products/', CatalogApiView.as_view(), name='api_products'),
+        path('api/products/<uslug:slug>/', ProductApiDetailView.as_view(), name='api_product_detail'),
+
         path('serial-number-serch', ProductSerialSearchView.as_view(), name='product_serial_search'),
 
 
@@ -48,19 +58,21 @@ urlpatterns = [
         path('<int:product_pk>/photo/delete/<int:pk>/', PhotoDeleteView.as_view(), name='photo delete'),
 
         # Category (SEO)
-        path('category/<slug:type_slug>/', ProductCategoryListView.as_view(), name='product category'),
+        path('category/<uslug:type_slug>/', ProductCategoryListView.as_view(), name='product category'),
 
         # Category (LEGACY name) -> 301 to SEO
         path('category/<str:category>/', ProductCategoryRedirectView.as_view(), name='product category legacy'),
 
         # Like
         path('<int:pk>/like/', ToggleLikeView.as_view(), name='toggle_like'),
+        path('likes/batch/', LikeBatchView.as_view(), name='like_batch'),
+        path('likes/counts/', LikeCountsView.as_view(), name='like_counts'),
 
         # Product details (LEGACY by pk) -> 301 to SEO
         path('details/<int:pk>/', ProductDetailsRedirectView.as_view(), name='product details legacy'),
 
         # Product details (SEO by slug)  ✅ keep near the bottom
-        path('<slug:slug>/', ProductDetailsView.as_view(), name='product details'),
+        path('<uslug:slug>/', ProductDetailsView.as_view(), name='product details'),
 
 
 
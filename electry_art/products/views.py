@@ -1,17 +1,32 @@
+import json
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from django.http import Http404
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, get_object_or_404, render
 from django.urls import reverse_lazy, reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.text import slugify
+from django.utils.translation import get_language
 from django.views import generic, View
 
+from electry_art.products.facets import compute_facets
+from electry_art.products.cache import catalog_version
 from electry_art.products.forms import ProductCreateForm, ProductEditForm, PhotoCreateForm, TypeCreateForm, \
     MaterialCreateForm, ColorCreateForm
-from electry_art.products.models import Product, ProductPhoto, Like, ProductType, ProductMaterial, ProductColor
+from electry_art.products.likes import is_liked, like_counts, set_likes, toggle_like
+from electry_art.products.models import Product, ProductPhoto, ProductType, ProductMaterial, ProductColor, RelatedProduct
+from electry_art.products.product_mixins.conditional import ConditionalGetMixin
+from electry_art.products.product_mixins.keyset_pagination import KeysetPaginationMixin
 from electry_art.products.product_mixins.product_mixins import LikedIdsContextMixin, PropsContextMixin, \
     SuperuserRequiredMixin
 from electry_art.products.product_mixins.sorting_filtering import apply_filters, apply_sort
+from electry_art.products.related import related_products
+from electry_art.products.taxonomy import get_taxonomy, taxonomy_version
+from electry_art.products import api, sitemaps
+from electry_art.products.search import search_products, suggest, SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
 
 
 class IndexView(generic.ListView):
@@ -20,11 +35,11 @@ class IndexView(generic.ListView):
     queryset = Product.objects.order_by('-date_created')[:3]
 
 
-class FilteredProductsBaseView(LikedIdsContextMixin, generic.ListView):
+class FilteredProductsBaseView(ConditionalGetMixin, KeysetPaginationMixin, LikedIdsContextMixin, generic.ListView):
     template_name = 'products/get_all_products.html'
     model = Product
     context_object_name = 'products'
-
+    keyset_approximate_count = True
 
     locked_type_slug = None
 
@@ -39,6 +54,14 @@ class FilteredProductsBaseView(LikedIdsContextMixin, generic.ListView):
         qs = apply_sort(qs, self.request.GET.get("sort"))
         return qs
 
+    def get_validator_parts(self):
+        # No query: catalog_version moves on every product save, stock decrement
+        # and ranking refresh (like counts are patched in by likes.js).
+        # Only trusted when every worker shares the cache.
+        if not settings.SHARED_CACHE:
+            return None
+        return [taxonomy_version(), catalog_version()]
+
     def get_filters_context(self):
         """
         Filters dict.
@@ -49,6 +72,7 @@ class FilteredProductsBaseView(LikedIdsContextMixin, generic.ListView):
             "min_price": self.request.GET.get("min_price", ""),
             "max_price": self.request.GET.get("max_price", ""),
             "available": self.request.GET.get("available", ""),
+            "type": self.request.GET.get("type", ""),
             "sort": self.request.GET.get("sort", "new"),
         }
 
@@ -57,10 +81,23 @@ class FilteredProductsBaseView(LikedIdsContextMixin, generic.ListView):
 
         context['type'] = self.page_title
 
-        context["materials"] = ProductMaterial.objects.all().order_by("name")
-        context["colors"] = ProductColor.objects.all().order_by("name")
+        taxonomy = get_taxonomy()
+        materials = taxonomy.materials
+        colors = taxonomy.colors
+        types = [] if self.get_locked_type_slug() else taxonomy.types
+
+        context["materials"] = materials
+        context["colors"] = colors
 
         context["filters"] = self.get_filters_context()
+        context["facets"] = compute_facets(
+            Product.objects.all(),
+            self.request.GET,
+            materials,
+            colors,
+            types,
+            locked_type_slug=self.get_locked_type_slug(),
+        )
         return context
 
 
@@ -194,26 +231,55 @@ class ProductCreateView(SuperuserRequiredMixin, generic.CreateView):
     success_url = reverse_lazy('photo create')
 
 
-class ProductDetailsView(generic.DetailView):
+class ProductDetailsView(ConditionalGetMixin, generic.DetailView):
     template_name = 'products/product_details.html'
     model = Product
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
 
+    def get_validator_parts(self):
+        # one row: the product, its photo set and the stored related list (ids in
+        # order + their last edit); type / material / color names via the taxonomy version
+        related_ids = (
+            RelatedProduct.objects
+            .filter(product=OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(ids=ArrayAgg('related_id', ordering='position'))
+            .values('ids')
+        )
+        self.validator_row = (
+            Product.objects
+            .filter(slug=self.kwargs['slug'])
+            .values('pk', 'updated_on', 'quantity', 'is_available', 'likes_count')
+            .annotate(
+                photo_count=Count('productphoto', distinct=True),
+                last_photo=Max('productphoto__pk'),
+                related_ids=Subquery(related_ids),
+                related_updated=Max('related_entries__related__updated_on'),
+            )
+            .first()
+        )
+        if self.validator_row is None:
+            return None  # 404 path renders normally
+        if not self.validator_row['related_ids']:
+            return None  # no stored list yet: the fallback query below is not covered
+        return [taxonomy_version(), *self.validator_row.values()]
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        new_products = Product.objects.filter(type=self.object.type).exclude(pk=self.object.pk).order_by('date_created')[:6]
+        new_products = list(related_products(self.object))
+        if not new_products:
+            # not refreshed yet (see products/related.py)
+            new_products = Product.objects.filter(type=self.object.type).exclude(pk=self.object.pk).order_by('date_created')[:6]
         photos = ProductPhoto.objects.filter(product_id=self.object.pk).order_by('pk')
 
         context["product"] = self.object
         context["photos"] = photos
         context["new_products"] = new_products
 
-        if self.request.user.is_authenticated:
-            context["user_liked"] = self.object.likes.filter(user=self.request.user).exists()
-        else:
-            context["user_liked"] = False
+        context["user_liked"] = is_liked(self.request.user, self.object)
 
         return context
 
@@ -242,7 +308,9 @@ class ProductCategoryListView(FilteredProductsBaseView):
         self.type_obj = None
 
     def dispatch(self, request, *args, **kwargs):
-        self.type_obj = get_object_or_404(ProductType, slug=self.kwargs['type_slug'])
+        self.type_obj = get_taxonomy().type_by_slug.get(self.kwargs['type_slug'])
+        if self.type_obj is None:
+            raise Http404
         return super().dispatch(request, *args, **kwargs)
 
     def get_locked_type_slug(self):
@@ -272,22 +340,92 @@ class ProductCategoryRedirectView(View):
         return redirect('product category', type_slug=type_obj.slug, permanent=True)
 
 
+def wants_json(request):
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+
 class ToggleLikeView(LoginRequiredMixin, View):
+    """
+    Form POST -> redirect back (no-JS fallback); AJAX -> {"liked", "likes_count"}.
+    """
+    def handle_no_permission(self):
+        if wants_json(self.request):
+            return JsonResponse({'error': 'login required'}, status=401)
+        return super().handle_no_permission()
+
     @staticmethod
     def post(request, *args, **kwargs):
-        product = get_object_or_404(Product, pk=kwargs['pk'])
-        like, created = Like.objects.get_or_create(user=request.user, product=product)
-        if not created:
-            like.delete()  # Unlike
+        product = get_object_or_404(Product.objects.only('pk'), pk=kwargs['pk'])
+        liked, likes_count = toggle_like(request.user, product)
+        if wants_json(request):
+            return JsonResponse({'product': product.pk, 'liked': liked, 'likes_count': likes_count})
         return redirect(request.META.get('HTTP_REFERER', reverse('product list')))
 
 
-class WishlistView(LoginRequiredMixin, generic.ListView):
+class LikeBatchView(LoginRequiredMixin, View):
+    """
+    Several like states in one request (js_core/likes.js queues clicks):
+    POST {"likes": {"<product id>": true|false, ...}}
+    -> {"likes": {"<product id>": {"liked": bool, "likes_count": int}, ...}}
+    """
+    max_batch = 50
+
+    def handle_no_permission(self):
+        return JsonResponse({'error': 'login required'}, status=401)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            payload = json.loads(request.body or b'{}')
+            states = {int(pk): bool(liked) for pk, liked in payload['likes'].items()}
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return JsonResponse({'error': 'expected {"likes": {"<product id>": true|false}}'}, status=400)
+
+        if len(states) > self.max_batch:
+            return JsonResponse({'error': f'at most {self.max_batch} products per batch'}, status=400)
+
+        result = set_likes(request.user, states)
+        return JsonResponse({
+            'likes': {
+                str(pk): {'liked': liked, 'likes_count': likes_count}
+                for pk, (liked, likes_count) in result.items()
+            }
+        })
+
+
+class LikeCountsView(View):
+    """
+    Current like counts for the cards of a (possibly 304-revalidated) listing:
+    GET ?ids=1,2,3 -> {"likes_count": {"<product id>": int, ...}}
+    """
+    max_ids = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            return JsonResponse({'error': 'expected ?ids=<product id>,...'}, status=400)
+        if len(ids) > self.max_ids:
+            return JsonResponse({'error': f'at most {self.max_ids} products'}, status=400)
+
+        counts = like_counts(ids)
+        response = JsonResponse({'likes_count': {str(pk): count for pk, count in counts.items()}})
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class WishlistView(LoginRequiredMixin, LikedIdsContextMixin, generic.ListView):
     model = Product
     template_name = 'products/wishlist.html'
     context_object_name = 'wishlist'
     paginate_by = 8
 
+    def get_liked_ids(self, products):
+        # everything on the wishlist is liked by definition
+        return {product.pk for product in products}
+
     def get_queryset(self):
         return Product.objects.filter(likes__user=self.request.user).order_by('-pk')
 
@@ -299,9 +437,9 @@ class SearchView(generic.ListView):
     paginate_by = 12  # (optional)
 
     def get_queryset(self):
-        query = self.request.GET.get('q')
+        query = (self.request.GET.get('q') or '').strip()
         if query:
-            return Product.objects.filter(name__icontains=query)
+            return search_products(Product.objects.all(), query).order_by('-search_rank', '-date_created')
         return Product.objects.none()
 
     def get_context_data(self, **kwargs):
@@ -310,6 +448,22 @@ class SearchView(generic.ListView):
         return context
 
 
+class SearchSuggestView(View):
+    """
+    JSON autocomplete for the search box: ?q=<prefix or misspelling>&limit=<n>
+    """
+    @staticmethod
+    def get(request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            limit = SUGGEST_DEFAULT_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+        data = suggest(request.GET.get('q'), language=get_language(), limit=limit)
+        return JsonResponse(data)
+
+
 class ProductSerialSearchView(SuperuserRequiredMixin, View):
     template_name = 'products/product_serial_search.html'
 
@@ -333,3 +487,100 @@ class ProductSerialSearchView(SuperuserRequiredMixin, View):
         return render(request, self.template_name, {
             'searched': False,
         })
+
+
+class SitemapMixin:
+    content_type = 'application/xml; charset=utf-8'
+
+    def sitemap_response(self, filename, parts):
+        """
+        From the disk cache if fresh, otherwise streamed while being cached.
+        """
+        path = sitemaps.cached_file(filename)
+        if path is not None:
+            response = FileResponse(open(path, 'rb'), content_type=self.content_type)
+        else:
+            response = StreamingHttpResponse(sitemaps.stream_and_cache(filename, parts), content_type=self.content_type)
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
+
+class SitemapIndexView(SitemapMixin, View):
+    def get(self, request, *args, **kwargs):
+        return self.sitemap_response(sitemaps.INDEX_FILENAME, sitemaps.iter_index())
+
+
+class SitemapSectionView(SitemapMixin, View):
+    def get(self, request, *args, **kwargs):
+        section, language, chunk = kwargs['section'], kwargs['language'], int(kwargs['chunk'])
+        if language not in sitemaps.languages() or chunk < 1:
+            raise Http404
+
+        if section == 'pages':
+            if chunk != 1:
+                raise Http404
+            parts = sitemaps.iter_pages(language)
+        else:
+            parts = sitemaps.iter_products(language, chunk)
+
+        filename = sitemaps.section_filename(section, language, chunk)
+        if sitemaps.cached_file(filename) is None and section == 'products':
+            low = (chunk - 1) * sitemaps.SITEMAP_CHUNK_SIZE
+            if not Product.objects.filter(pk__gte=low, pk__lt=low + sitemaps.SITEMAP_CHUNK_SIZE).exists():
+                raise Http404
+
+        return self.sitemap_response(filename, parts)
+
+
+class CatalogApiMixin:
+    """
+    Read-only JSON over products/api.py: ?fields=, the catalog filters and
+    sort, ?cursor= / ?limit=. Answers from the cache with an ETag.
+    """
+    max_age = api.API_CACHE_TIMEOUT
+
+    def json_response(self, request, parts):
+        etag, body = parts
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
+
+    @staticmethod
+    def error_response(message, status):
+        return JsonResponse({'error': message}, status=status)
+
+
+class CatalogApiView(CatalogApiMixin, View):
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = api.parse_fields(request.GET.get('fields'))
+        except ValueError as exc:
+            return self.error_response(str(exc), 400)
+
+        language = get_language()
+        parts = api.cached_response_parts(
+            api.cache_key('list', language, request.GET, fields),
+            lambda: api.build_list(request.path, request.GET, fields, language),
+        )
+        return self.json_response(request, parts)
+
+
+class ProductApiDetailView(CatalogApiMixin, View):
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = api.parse_fields(request.GET.get('fields'))
+        except ValueError as exc:
+            return self.error_response(str(exc), 400)
+
+        language = get_language()
+        slug = kwargs['slug']
+        parts = api.cached_response_parts(
+            api.cache_key(f'detail:{slug}', language, request.GET, fields),
+            lambda: api.build_detail(slug, fields, language),
+        )
+        if parts is None:
+            return self.error_response('not found', 404)
+        return self.json_response(request, parts)
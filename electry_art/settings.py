@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'modeltranslation',
 
@@ -56,6 +57,7 @@ MIDDLEWARE = [
     'electry_art.core.middleware.ErrorBoundaryMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
+    'electry_art.core.static_middleware.StaticAssetsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,6 +107,30 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared Redis cache when REDIS_URL is set (needs the `redis` package),
+# otherwise a per-process memory cache (dev).
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'electryart',
+        }
+    }
+
+# True when every worker process sees the same cache (Redis): versions kept in
+# the cache are then safe to use in HTTP validators (ETags).
+SHARED_CACHE = bool(REDIS_URL)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -150,10 +176,39 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = (
     BASE_DIR / 'staticfiles',
 )
+# build step: `python manage.py collectstatic` -> content-hashed names + .gz/.br siblings
+STATIC_ROOT = BASE_DIR / 'static_root'
+# Production opt-in (STATIC_MANIFEST=True, after collectstatic): hashed names,
+# the bundled stylesheet and StaticAssetsMiddleware. Off by default, so tests,
+# CI and fresh clones render pages without a built static_root/.
+STATIC_MANIFEST = os.getenv('STATIC_MANIFEST') == 'True'
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": (
+            "electry_art.core.static_storage.CompressedManifestStaticFilesStorage" if STATIC_MANIFEST
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        ),
+    },
+}
+
+# {% css_bundle 'base' %}: one stylesheet in production, the separate files in development
+STATIC_CSS_BUNDLES = {
+    'base': ['css/reset.css', 'css/nav/nav.css', 'css/site_cookies/site_cookies.css'],
+}
+STATIC_CSS_BUNDLING = STATIC_MANIFEST
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media_files'
 
+# Product image derivatives (products/images.py): generated after commit in a
+# pool of spawned worker processes; False generates them inline in the request.
+IMAGE_DERIVATIVES_ASYNC = True
+IMAGE_DERIVATIVE_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
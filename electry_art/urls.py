@@ -16,17 +16,26 @@ Including another URLconf
 """
 from django.conf.urls.i18n import i18n_patterns
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
 from electry_art.orders.views import StripeWebhookView
+from electry_art.products.views import SitemapIndexView, SitemapSectionView
 
 urlpatterns = [
     # URL for language change
     path("i18n/", include("django.conf.urls.i18n")),
 
     path("stripe/webhook/", StripeWebhookView.as_view(), name="stripe_webhook"),
+
+    # sitemaps are language independent (both prefixes listed inside)
+    path("sitemap.xml", SitemapIndexView.as_view(), name="sitemap_index"),
+    re_path(
+        r"^sitemap-(?P<section>pages|products)-(?P<language>[a-z]{2})-(?P<chunk>[0-9]+)\.xml$",
+        SitemapSectionView.as_view(),
+        name="sitemap_section",
+    ),
 ]
 
 urlpatterns += i18n_patterns(
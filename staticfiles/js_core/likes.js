@@ -0,0 +1,86 @@
+// Like buttons without a page reload: clicks are applied optimistically and
+// sent as one batch (LikeBatchView) after a short pause, so a burst of clicks
+// costs one request. Without JS the forms still POST to ToggleLikeView.
+// Likes do not invalidate the listing's ETag, so the counts of a revalidated
+// page are refreshed from LikeCountsView once it is loaded.
+document.addEventListener("DOMContentLoaded", function () {
+    const forms = document.querySelectorAll(".js-like-form");
+    const labels = document.querySelectorAll(".js-like-count");
+    const container = document.querySelector("[data-counts-url]");
+    const pending = {};
+    let timer = null;
+
+    if (container && (forms.length || labels.length)) {
+        const ids = [...forms, ...labels].map(element => element.dataset.productId);
+        fetch(`${container.dataset.countsUrl}?ids=${ids.join(",")}`, {headers: {"Accept": "application/json"}})
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (!data) return;
+                forms.forEach(form => {
+                    const count = data.likes_count[form.dataset.productId];
+                    // a click in the meantime already rendered a newer count
+                    if (count !== undefined && !form.dataset.sent) {
+                        render(form, form.dataset.liked === "1", count);
+                    }
+                });
+                labels.forEach(label => {
+                    const count = data.likes_count[label.dataset.productId];
+                    if (count !== undefined) label.textContent = `🤍 ${count}`;
+                });
+            });
+    }
+    if (!forms.length) return;
+
+    function render(form, liked, count) {
+        const button = form.querySelector("button");
+        button.classList.toggle("liked", liked);
+        button.textContent = `${liked ? "❤️" : "🤍"} ${count}`;
+        form.dataset.liked = liked ? "1" : "0";
+        form.dataset.count = count;
+    }
+
+    function flush() {
+        const likes = Object.assign({}, pending);
+        Object.keys(pending).forEach(key => delete pending[key]);
+
+        const first = forms[0];
+        fetch(first.dataset.batchUrl, {
+            method: "POST",
+            headers: {
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+                "X-CSRFToken": first.querySelector('input[name="csrfmiddlewaretoken"]').value,
+            },
+            body: JSON.stringify({likes}),
+        })
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (!data) return;
+                forms.forEach(form => {
+                    const state = data.likes[form.dataset.productId];
+                    // a newer click is already queued -> keep the optimistic state
+                    if (state && !(form.dataset.productId in pending)) {
+                        render(form, state.liked, state.likes_count);
+                    }
+                });
+            });
+    }
+
+    forms.forEach(form => {
+        const button = form.querySelector("button");
+        form.dataset.liked = button.classList.contains("liked") ? "1" : "0";
+        form.dataset.count = parseInt(button.textContent.replace(/\D+/g, ""), 10) || 0;
+
+        form.addEventListener("submit", event => {
+            event.preventDefault();
+            const liked = form.dataset.liked !== "1";
+            const count = Math.max(parseInt(form.dataset.count, 10) + (liked ? 1 : -1), 0);
+            render(form, liked, count);
+
+            pending[form.dataset.productId] = liked;
+            form.dataset.sent = "1";
+            clearTimeout(timer);
+            timer = setTimeout(flush, 400);
+        });
+    });
+});
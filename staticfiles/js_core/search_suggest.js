@@ -0,0 +1,38 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const form = document.querySelector(".js-search-suggest");
+    if (!form) return;
+
+    const input = form.querySelector('input[name="q"]');
+    const list = form.querySelector("datalist");
+    const url = form.dataset.suggestUrl;
+    let timer = null;
+    let lastTerm = "";
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        const term = input.value.trim();
+        if (term.length < 2 || term === lastTerm) return;
+
+        // small debounce, the endpoint itself is cached per language + term
+        timer = setTimeout(() => {
+            lastTerm = term;
+            fetch(`${url}?q=${encodeURIComponent(term)}`, {headers: {"Accept": "application/json"}})
+                .then(response => response.ok ? response.json() : null)
+                .then(data => {
+                    if (!data) return;
+                    list.innerHTML = "";
+                    [...data.products, ...data.types].forEach(item => {
+                        const option = document.createElement("option");
+                        option.value = item.name;
+                        list.appendChild(option);
+                    });
+                    data.serials.forEach(item => {
+                        const option = document.createElement("option");
+                        option.value = item.serial_number;
+                        list.appendChild(option);
+                    });
+                })
+                .catch(() => {});
+        }, 150);
+    });
+});